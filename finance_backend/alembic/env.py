@@ -6,13 +6,15 @@ from sqlmodel import SQLModel
 from alembic import context
 
 from app.models.account import Account
-from app.models.transaction import Transaction
+from app.models.transaction import Transaction, TransactionMessage
 from app.models.user import User
 from app.models.category import Category
 from app.models.budget import Budget
+from app.models.rollup import TransactionDailyRollup
 from app.models.enums import Provider, AccountType, CategoryType, BudgetPeriod, TransactionType
 
 from app.core.settings import settings
+from app.db.partitions import PARENT, DEFAULT_PARTITION
 
 
 # this is the Alembic Config object, which provides
@@ -33,6 +35,17 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = SQLModel.metadata
 
+
+def include_name(name, type_, parent_names):
+    """Leave the transactions partitions to app/db/partitions.py.
+
+    They aren't in the metadata, autogenerate would otherwise drop them.
+    """
+    if type_ == "table":
+        return not (name == DEFAULT_PARTITION or name.startswith(f"{PARENT}_y"))
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -55,6 +68,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -78,7 +92,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,34 @@
+"""add keyset pagination index to transactions
+
+Revision ID: 3f9a1c7d2b60
+Revises: e05e3e24ec8a
+Create Date: 2026-01-12 09:41:27.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2b60'
+down_revision: Union[str, Sequence[str], None] = 'e05e3e24ec8a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_transactions_user_occurred_at_id',
+        'transactions',
+        ['user_id', sa.text('occurred_at DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_transactions_user_occurred_at_id', table_name='transactions')
@@ -0,0 +1,33 @@
+"""add data_version to users
+
+Revision ID: 5d7e2a9c4b18
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-18 10:12:44.201937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d7e2a9c4b18'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a constant default, so existing rows are filled without a table rewrite
+    op.add_column(
+        'users',
+        sa.Column('data_version', sa.Integer(), server_default='0', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'data_version')
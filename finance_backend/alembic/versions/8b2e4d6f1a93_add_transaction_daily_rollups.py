@@ -0,0 +1,67 @@
+"""add transaction daily rollups
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f9a1c7d2b60
+Create Date: 2026-01-19 14:05:52.310447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a93'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c7d2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'transaction_daily_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column(
+            'type',
+            postgresql.ENUM('INCOME', 'EXPENSE', 'TRANSFER', name='transactiontype', create_type=False),
+            nullable=False,
+        ),
+        sa.Column('total', sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'user_id', 'day', 'account_id', 'category_id', 'type',
+            name='uq_transaction_daily_rollups_key',
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+    # backfill from the existing rows, buckets use the same ::date cast as the service
+    op.execute(
+        """
+        INSERT INTO transaction_daily_rollups
+            (user_id, day, account_id, category_id, type, total, count)
+        SELECT user_id, occurred_at::date, account_id, category_id, type,
+               sum(amount), count(*)
+        FROM transactions
+        GROUP BY user_id, occurred_at::date, account_id, category_id, type
+        """
+    )
+    # for the ON DELETE CASCADE from accounts and categories
+    op.create_index('ix_transaction_daily_rollups_account_id', 'transaction_daily_rollups', ['account_id'])
+    op.create_index('ix_transaction_daily_rollups_category_id', 'transaction_daily_rollups', ['category_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transaction_daily_rollups')
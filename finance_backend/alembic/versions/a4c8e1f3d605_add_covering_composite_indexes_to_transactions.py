@@ -0,0 +1,92 @@
+"""add covering composite indexes to transactions
+
+Revision ID: a4c8e1f3d605
+Revises: 5d7e2a9c4b18
+Create Date: 2026-10-18 11:02:19.640218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e1f3d605'
+down_revision: Union[str, Sequence[str], None] = '5d7e2a9c4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, INCLUDE columns)
+INDEXES = [
+    (
+        'ix_transactions_user_account_occurred_at_id',
+        'transactions',
+        ['user_id', 'account_id', sa.text('occurred_at DESC'), sa.text('id DESC')],
+        ['amount', 'type'],
+    ),
+    (
+        'ix_transactions_user_category_occurred_at_id',
+        'transactions',
+        ['user_id', 'category_id', sa.text('occurred_at DESC'), sa.text('id DESC')],
+        ['amount', 'type'],
+    ),
+    (
+        'ix_transactions_user_type_occurred_at_id',
+        'transactions',
+        ['user_id', 'type', sa.text('occurred_at DESC'), sa.text('id DESC')],
+        ['amount'],
+    ),
+    (
+        'ix_transaction_daily_rollups_user_day',
+        'transaction_daily_rollups',
+        ['user_id', 'day'],
+        ['type', 'account_id', 'category_id', 'total', 'count'],
+    ),
+]
+
+# single-column indexes the composites make redundant
+REDUNDANT = [
+    ('ix_transactions_user_id', 'transactions', ['user_id']),
+    ('ix_transactions_occurred_at', 'transactions', ['occurred_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction; writes keep flowing while
+    # the indexes build. A build that fails leaves an INVALID index behind,
+    # dropping first lets the migration simply be run again.
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.create_index(
+                name, table, columns,
+                postgresql_include=include,
+                postgresql_concurrently=True,
+            )
+        # only once the replacements are in place
+        for name, table, _ in REDUNDANT:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        # accounts and categories belong to one user, without these the planner
+        # multiplies the two selectivities, expects a handful of rows for
+        # `user_id = ? AND category_id = ?` and sorts instead of walking the
+        # composite in order
+        op.execute(
+            'CREATE STATISTICS IF NOT EXISTS st_transactions_user_account_category '
+            '(dependencies) ON user_id, account_id, category_id FROM transactions'
+        )
+        op.execute('ANALYZE transactions')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute('DROP STATISTICS IF EXISTS st_transactions_user_account_category')
+        for name, table, columns in REDUNDANT:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+        for name, table, _, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,175 @@
+"""partition transactions by month
+
+Revision ID: c7f3b9e2d814
+Revises: a4c8e1f3d605
+Create Date: 2026-10-18 14:37:52.118406
+
+The rows are copied into the new partitioned table inside the migration's
+transaction, which holds an exclusive lock on `transactions` throughout: plan
+a maintenance window sized to the table.
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7f3b9e2d814'
+down_revision: Union[str, Sequence[str], None] = 'a4c8e1f3d605'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 3
+
+FOREIGN_KEYS = [
+    ('fk_transactions_user_id_users', 'users', 'user_id'),
+    ('fk_transactions_account_id_accounts', 'accounts', 'account_id'),
+    ('fk_transactions_category_id_categories', 'categories', 'category_id'),
+]
+
+# (name, columns, INCLUDE columns)
+INDEXES = [
+    ('ix_transactions_account_id', ['account_id'], None),
+    ('ix_transactions_category_id', ['category_id'], None),
+    ('ix_transactions_transfer_group_id', ['transfer_group_id'], None),
+    ('ix_transactions_user_occurred_at_id', ['user_id', sa.text('occurred_at DESC'), sa.text('id DESC')], None),
+    (
+        'ix_transactions_user_account_occurred_at_id',
+        ['user_id', 'account_id', sa.text('occurred_at DESC'), sa.text('id DESC')],
+        ['amount', 'type'],
+    ),
+    (
+        'ix_transactions_user_category_occurred_at_id',
+        ['user_id', 'category_id', sa.text('occurred_at DESC'), sa.text('id DESC')],
+        ['amount', 'type'],
+    ),
+    (
+        'ix_transactions_user_type_occurred_at_id',
+        ['user_id', 'type', sa.text('occurred_at DESC'), sa.text('id DESC')],
+        ['amount'],
+    ),
+]
+
+STATISTICS = (
+    'CREATE STATISTICS {name} (dependencies) ON user_id, account_id, category_id FROM {table}'
+)
+
+RELEASE_MESSAGES_FUNCTION = """
+CREATE OR REPLACE FUNCTION release_transaction_messages() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM transaction_messages m
+    USING released r
+    WHERE m.user_id = r.user_id AND m.message_id = r.message_id;
+    RETURN NULL;
+END
+$$
+"""
+RELEASE_MESSAGES_TRIGGER = """
+CREATE TRIGGER transactions_release_messages
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS released
+FOR EACH STATEMENT EXECUTE FUNCTION release_transaction_messages()
+"""
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_indexes(table: str):
+    for name, columns, include in INDEXES:
+        op.create_index(name, table, columns, postgresql_include=include or [])
+    for name, target, column in FOREIGN_KEYS:
+        op.create_foreign_key(name, table, target, [column], ['id'], ondelete='CASCADE')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    sequence = conn.execute(sa.text("SELECT pg_get_serial_sequence('transactions', 'id')")).scalar_one()
+    first, last = conn.execute(
+        sa.text("SELECT min(occurred_at)::date, max(occurred_at)::date FROM transactions")
+    ).one()
+
+    # the old heap is only read once more, its indexes would just be dropped with it
+    op.execute('DROP STATISTICS IF EXISTS st_transactions_user_account_category')
+    op.drop_index('uniq_transactions_user_message', table_name='transactions')
+    for name, _, _ in INDEXES:
+        op.drop_index(name, table_name='transactions')
+    op.rename_table('transactions', 'transactions_unpartitioned')
+
+    op.execute(
+        'CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS) '
+        'PARTITION BY RANGE (occurred_at)'
+    )
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY transactions.id')
+    op.execute('CREATE TABLE transactions_default PARTITION OF transactions DEFAULT')
+    this_month = date.today().replace(day=1)
+    month = min(first, this_month).replace(day=1) if first else this_month
+    end = max(last.replace(day=1) if last else this_month, add_months(this_month, MONTHS_AHEAD))
+    while month <= end:
+        name = f'transactions_y{month.year}m{month.month:02d}'
+        op.execute(
+            f"CREATE TABLE {name} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        op.execute(STATISTICS.format(name=f'{name}_user_account_category', table=name))
+        month = add_months(month, 1)
+
+    # copy before indexing, building each partition's indexes once is much
+    # cheaper than maintaining them row by row
+    op.execute('INSERT INTO transactions SELECT * FROM transactions_unpartitioned')
+
+    op.create_table(
+        'transaction_messages',
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('message_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'message_id', name='uniq_transactions_user_message'),
+    )
+    # unique per user already, the old index saw to that
+    op.execute(
+        'INSERT INTO transaction_messages (user_id, message_id) '
+        'SELECT user_id, message_id FROM transactions_unpartitioned WHERE message_id IS NOT NULL'
+    )
+
+    op.create_primary_key('transactions_pkey', 'transactions', ['id', 'occurred_at'])
+    create_indexes('transactions')
+    op.execute(STATISTICS.format(name='st_transactions_user_account_category', table='transactions'))
+    op.execute(RELEASE_MESSAGES_FUNCTION)
+    op.execute(RELEASE_MESSAGES_TRIGGER)
+
+    op.drop_table('transactions_unpartitioned')
+    # autovacuum analyzes the partitions but never the parent itself
+    op.execute('ANALYZE transactions')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    sequence = conn.execute(sa.text("SELECT pg_get_serial_sequence('transactions', 'id')")).scalar_one()
+
+    op.execute('CREATE TABLE transactions_unpartitioned (LIKE transactions INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO transactions_unpartitioned SELECT * FROM transactions')
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY transactions_unpartitioned.id')
+    # takes every partition, their statistics and the trigger along
+    op.drop_table('transactions')
+    op.drop_table('transaction_messages')
+    op.execute('DROP FUNCTION IF EXISTS release_transaction_messages()')
+    op.rename_table('transactions_unpartitioned', 'transactions')
+
+    op.create_primary_key('transaction_pkey', 'transactions', ['id'])
+    create_indexes('transactions')
+    op.create_index(
+        'uniq_transactions_user_message', 'transactions', ['user_id', 'message_id'],
+        unique=True, postgresql_where=sa.text('message_id IS NOT NULL'),
+    )
+    op.execute(STATISTICS.format(name='st_transactions_user_account_category', table='transactions'))
+    op.execute('ANALYZE transactions')
@@ -1,6 +1,7 @@
 from typing import List, Optional, Tuple
 from sqlmodel import select, Session
-from sqlalchemy import func
+from sqlalchemy import func, update
+from decimal import Decimal
 from ..models.account import Account
 from ..models.transaction import Transaction
 
@@ -37,6 +38,34 @@ class AccountRepository:
             select(Account).where(Account.id == account_id, Account.user_id == user_id)
         ).first()
 
+    def get_accounts_for_user(
+        self, session: Session, account_ids, user_id
+    ) -> List[Account]:
+        return session.exec(
+            select(Account).where(
+                Account.id.in_(list(account_ids)), Account.user_id == user_id
+            )
+        ).all()
+
+    def change_balance(
+        self, session: Session, account_id, user_id, delta: Decimal
+    ) -> Optional[Decimal]:
+        """Add `delta` to the balance in a single conditional UPDATE.
+
+        A debit only applies while the balance covers it, so concurrent writers
+        can't overdraw the account and nothing is read beforehand. Returns the
+        new balance, or None when no row matched: the account is missing, not
+        the user's, or short of funds.
+        """
+        stmt = update(Account).where(
+            Account.id == account_id, Account.user_id == user_id
+        )
+        if delta < 0:
+            stmt = stmt.where(Account.balance >= -delta)
+        return session.exec(
+            stmt.values(balance=Account.balance + delta).returning(Account.balance)
+        ).scalar_one_or_none()
+
     def get_account_balances(self, session: Session, user_id):
         return session.exec(
             select(Account.id, Account.name, Account.balance).where(
@@ -47,7 +76,6 @@ class AccountRepository:
     def save_account(self, session: Session, account: Account) -> Account:
         session.add(account)
         session.flush()
-        session.refresh(account)
         return account
 
     def get_account_by_id(self, session: Session, id) -> Optional[Account]:
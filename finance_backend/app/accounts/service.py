@@ -1,6 +1,7 @@
 from typing import List, Tuple, Optional
 from sqlmodel import Session
 from sqlalchemy.exc import IntegrityError
+from app.db.errors import is_missing_user
 from fastapi import Depends
 
 from ..models.account import Account
@@ -12,11 +13,13 @@ from ..accounts.exceptions import (
     CouldnotDeleteAccount,
 )
 from ..accounts.repo import AccountRepository, get_account_repo
+from ..auth.repo import UserRepository, get_user_repo
 
 
 class AccountService:
-    def __init__(self, repo: AccountRepository):
+    def __init__(self, repo: AccountRepository, user_repo: Optional[UserRepository] = None):
         self.repo = repo
+        self.user_repo = user_repo or UserRepository()
 
     def get_user_accounts(self, session: Session, user_id, limit: int, offset: int, active: Optional[bool]) -> Tuple[List[Account], int]:
         return self.repo.list_user_accounts(session, user_id, limit, offset, active)
@@ -25,10 +28,13 @@ class AccountService:
         account = Account(user_id=user_id, name=name, type=type, currency=currency)
         try:
             refreshed_account = self.repo.save_account(session, account)
+            self.user_repo.bump_data_version(session, user_id)
             session.commit()
             return refreshed_account
-        except IntegrityError:
+        except IntegrityError as e:
             session.rollback()
+            if is_missing_user(e):
+                raise
             raise AccountNameAlreadyTaken("please use a different Account name")
 
     def get_account(self, session: Session, id, user_id) -> Account:
@@ -46,10 +52,13 @@ class AccountService:
                 if value is not None:
                     setattr(account, field, value)
             updated_account = self.repo.save_account(session, account)
+            self.user_repo.bump_data_version(session, user_id)
             session.commit()
             return updated_account
-        except IntegrityError:
+        except IntegrityError as e:
             session.rollback()
+            if is_missing_user(e):
+                raise
             raise AccountNameAlreadyTaken("please use a different Account name")
 
     def delete_account(self, session: Session, id, user_id):
@@ -59,6 +68,7 @@ class AccountService:
         if self.repo.count_transactions_for_account(session, id) > 0:
             raise CouldnotDeleteAccount("Cannot hard-delete account with transactions. Consider deactivating.")
         self.repo.delete_account(session, account)
+        self.user_repo.bump_data_version(session, user_id)
         session.commit()
 
     def deactivate_account(self, session: Session, id, user_id) -> Account:
@@ -68,6 +78,7 @@ class AccountService:
 
         account.active = False
         deactivated_account = self.repo.save_account(session, account)
+        self.user_repo.bump_data_version(session, user_id)
         session.commit()
         return deactivated_account
 
@@ -78,10 +89,14 @@ class AccountService:
 
         account.active = True
         restored_account = self.repo.save_account(session, account)
+        self.user_repo.bump_data_version(session, user_id)
         session.commit()
         return restored_account
 
 
 # FastAPI provider
-def get_account_service(repo: AccountRepository = Depends(get_account_repo)) -> AccountService:
-    return AccountService(repo)
+def get_account_service(
+    repo: AccountRepository = Depends(get_account_repo),
+    user_repo: UserRepository = Depends(get_user_repo),
+) -> AccountService:
+    return AccountService(repo, user_repo)
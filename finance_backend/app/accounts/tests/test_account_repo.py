@@ -1,9 +1,13 @@
+import threading
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from sqlmodel import Session
 from app.models.account import Account
 from app.models.user import User
 from app.models.enums import AccountType
 from app.accounts.repo import AccountRepository
-from app.tests.conftest import db_session, create_test_database, create_test_user
+from app.tests.conftest import db_session, create_test_database, create_test_user, test_engine
 
 # Tests
 def test_save_and_get_account(db_session):
@@ -61,4 +65,53 @@ def test_delete_account(db_session):
     db_session.commit()
 
     fetched = repo.get_account_for_user(db_session, acc.id, user.id)
-    assert fetched is None
\ No newline at end of file
+    assert fetched is None
+
+def test_prefetch_accounts_and_change_balance(db_session):
+    repo = AccountRepository()
+    user = create_test_user(db_session)
+    other = create_test_user(db_session, "other@example.com")
+
+    acc = repo.save_account(db_session, Account(user_id=user.id, name="Wallet", type=AccountType.WALLET, currency="USD", balance=100))
+    foreign = repo.save_account(db_session, Account(user_id=other.id, name="Wallet", type=AccountType.WALLET, currency="USD"))
+
+    # accounts of other users are filtered out
+    accounts = repo.get_accounts_for_user(db_session, {acc.id, foreign.id}, user.id)
+    assert [a.id for a in accounts] == [acc.id]
+
+    assert repo.change_balance(db_session, acc.id, user.id, Decimal("-40")) == 60
+    # a debit larger than the balance matches no row
+    assert repo.change_balance(db_session, acc.id, user.id, Decimal("-61")) is None
+    # neither does another user's account
+    assert repo.change_balance(db_session, foreign.id, user.id, Decimal("5")) is None
+    assert repo.change_balance(db_session, acc.id, user.id, Decimal("15")) == 75
+    db_session.refresh(acc)
+    assert acc.balance == 75
+
+
+def test_concurrent_debits_never_overdraw():
+    repo = AccountRepository()
+    with Session(test_engine) as session:
+        user = create_test_user(session, "concurrent@example.com")
+        acc = repo.save_account(session, Account(user_id=user.id, name="Shared", type=AccountType.BANK, currency="USD", balance=100))
+        session.commit()
+        account_id, user_id = acc.id, user.id
+
+    barrier = threading.Barrier(8)
+
+    def debit():
+        with Session(test_engine) as session:
+            barrier.wait()
+            balance = repo.change_balance(session, account_id, user_id, Decimal("-30"))
+            session.commit()
+            return balance
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: debit(), range(8)))
+        assert sorted(r for r in results if r is not None) == [10, 40, 70]
+        assert results.count(None) == 5
+    finally:
+        with Session(test_engine) as session:
+            session.delete(session.get(User, user_id))
+            session.commit()
@@ -4,6 +4,7 @@ from unittest.mock import Mock
 from uuid import UUID
 from finance_backend.app.main import app
 from app.accounts.service import AccountService, get_account_service
+from app.auth.repo import UserRepository, get_user_repo
 from app.models.account import Account
 from app.models.enums import AccountType
 from app.accounts.exceptions import AccountNameAlreadyTaken, AccountNotFound
@@ -26,8 +27,13 @@ def client():
 @pytest.fixture
 def client_with_mocked_service(client, mock_account_service):
     app.dependency_overrides[get_account_service] = lambda: mock_account_service
+    # conditional GETs read the data version, kept off the database here
+    user_repo = Mock(spec=UserRepository)
+    user_repo.get_data_version.return_value = 0
+    app.dependency_overrides[get_user_repo] = lambda: user_repo
     yield client
     app.dependency_overrides.pop(get_account_service, None)
+    app.dependency_overrides.pop(get_user_repo, None)
 
 # Tests
 def test_get_accounts_router(client_with_mocked_service, mock_account_service, override_get_current_user):
@@ -0,0 +1,50 @@
+import hashlib
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from app.auth.dependencies import get_current_user_id
+from app.auth.repo import UserRepository, get_user_repo
+from app.db.session import AsyncSession, get_async_session
+
+
+def make_etag(user_id, version: int, request: Request) -> str:
+    """Weak ETag for a user's data at `version`, as seen through this URL.
+
+    Query params are sorted so the same filters in another order still match.
+    """
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    raw = f"{user_id}:{version}:{request.url.path}?{query}"
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison: W/ prefixes don't matter
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    user_id: UUID = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_async_session),
+    user_repo: UserRepository = Depends(get_user_repo),
+) -> str:
+    """Answer If-None-Match with a 304 before the endpoint queries anything.
+
+    Every write to the user's accounts, categories or transactions bumps their
+    data version, so an unchanged version means an unchanged response.
+    """
+    version = await session.run_sync(user_repo.get_data_version, user_id)
+    etag = make_etag(user_id, version, request)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    # clients may keep the body but have to revalidate before reusing it
+    response.headers["Cache-Control"] = "private, no-cache"
+    return etag
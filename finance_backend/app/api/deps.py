@@ -1,2 +1,2 @@
-from app.auth.dependencies import get_current_user, Depends
-from app.db.session import get_session
\ No newline at end of file
+from app.auth.dependencies import get_current_user, get_current_user_id, Depends
+from app.db.session import get_session, get_async_session, get_async_session_factory
\ No newline at end of file
@@ -1,21 +1,43 @@
+from uuid import UUID
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from app.auth.jwt import verify_access_token
-from app.db.session import get_session, Session
-from sqlmodel import select
+from app.auth.repo import UserRepository, get_user_repo
+from app.auth.user_cache import user_cache
+from app.db.session import AsyncSession, get_async_session
 from app.models.user import User
 
 oauth2shceme = OAuth2PasswordBearer(tokenUrl="/v1/auth/login_form")
 
-def get_current_user(
-    session: Session = Depends(get_session),
-    token: str = Depends(oauth2shceme),
-) -> User:
+async def get_current_user_id(token: str = Depends(oauth2shceme)) -> UUID:
+    """The authenticated user's id from the JWT alone, no database access."""
     payload = verify_access_token(token)
     if not payload or "id" not in payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    try:
+        return UUID(str(payload["id"]))
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+
+async def get_current_user(
+    user_id: UUID = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_async_session),
+    user_repo: UserRepository = Depends(get_user_repo),
+) -> User:
+    if user_cache.is_remote:
+        current_user = await run_in_threadpool(user_cache.get, user_id)
+    else:
+        current_user = user_cache.get(user_id)
+    if current_user:
+        return current_user
 
-    current_user = session.exec(select(User).where(User.id == payload.get("id"))).first()
+    current_user = await session.run_sync(user_repo.get_user_by_id, user_id)
     if not current_user:
         raise HTTPException(status_code=404, detail="User not found")
+    if user_cache.is_remote:
+        await run_in_threadpool(user_cache.set, current_user)
+    else:
+        user_cache.set(current_user)
     return current_user
@@ -36,4 +36,7 @@ class InvalidAccessToken(AuthError):
     pass
 
 class InvalidRefreshToken(AuthError):
-    pass
\ No newline at end of file
+    pass
+
+class PasswordHashingBusy(AuthError):
+    pass
@@ -0,0 +1,159 @@
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import jwt
+import requests
+from jwt.algorithms import RSAAlgorithm
+
+from app.auth.exceptions import GoogleTokenInvalid
+
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+TOKENINFO_URL = "https://oauth2.googleapis.com/tokeninfo"
+
+# used when the key source sends no usable Cache-Control
+DEFAULT_MAX_AGE = 3600
+# an unknown `kid` triggers a refetch at most this often (Google rotates keys
+# ahead of use, so a miss right after a refetch means a bad token, not new keys)
+MIN_REFRESH_INTERVAL = 60
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleKeysUnavailable(Exception):
+    """The JWKS could not be loaded, tokens can't be checked locally."""
+
+
+def _max_age(cache_control: Optional[str]) -> int:
+    cache_control = cache_control or ""
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    match = _MAX_AGE.search(cache_control)
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+class GoogleKeySet:
+    """Google's ID token signing keys, cached for as long as Cache-Control allows.
+
+    `source` is an https URL or a local file (path or file:// URL), the latter
+    lets tests and offline setups stand in their own keys.
+    """
+
+    def __init__(self, source: str, http: requests.Session, timeout: float):
+        self.source = source
+        self.http = http
+        self.timeout = timeout
+        self._keys: Dict[str, object] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, kid: str):
+        now = time.monotonic()
+        key = self._keys.get(kid)
+        if key is not None and now < self._expires_at:
+            return key
+        with self._lock:
+            stale = time.monotonic() >= self._expires_at
+            unknown = kid not in self._keys
+            if stale or (unknown and time.monotonic() - self._fetched_at >= MIN_REFRESH_INTERVAL):
+                self._refresh()
+        return self._keys.get(kid)
+
+    def _refresh(self) -> None:
+        document, max_age = self._load()
+        try:
+            keys = {
+                jwk["kid"]: RSAAlgorithm.from_jwk(json.dumps(jwk))
+                for jwk in document["keys"]
+                if jwk.get("kty") == "RSA"
+            }
+        except (KeyError, TypeError, ValueError) as e:
+            raise GoogleKeysUnavailable(f"malformed JWKS from {self.source}") from e
+        now = time.monotonic()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + max_age
+
+    def _load(self):
+        parsed = urlparse(self.source)
+        if parsed.scheme in ("http", "https"):
+            try:
+                resp = self.http.get(self.source, timeout=self.timeout)
+                resp.raise_for_status()
+                return resp.json(), _max_age(resp.headers.get("Cache-Control"))
+            except (requests.RequestException, ValueError) as e:
+                raise GoogleKeysUnavailable(str(e)) from e
+        path = parsed.path if parsed.scheme == "file" else self.source
+        try:
+            return json.loads(Path(path).read_text()), DEFAULT_MAX_AGE
+        except (OSError, ValueError) as e:
+            raise GoogleKeysUnavailable(str(e)) from e
+
+
+class GoogleTokenVerifier:
+    """Checks Google ID tokens locally: signature, audience, issuer and expiry.
+
+    tokeninfo is only asked when the key set can't be loaded at all.
+    """
+
+    def __init__(
+        self,
+        jwks_source: str,
+        timeout: float = 5.0,
+        tokeninfo_fallback: bool = True,
+        http: Optional[requests.Session] = None,
+    ):
+        # one pooled session for the key fetches and the fallback
+        self.http = http or requests.Session()
+        self.timeout = timeout
+        self.tokeninfo_fallback = tokeninfo_fallback
+        self.keys = GoogleKeySet(jwks_source, self.http, timeout)
+
+    def verify(self, id_token: str, client_id: str) -> Dict:
+        try:
+            kid = jwt.get_unverified_header(id_token).get("kid")
+        except jwt.InvalidTokenError:
+            raise GoogleTokenInvalid("Invalid Google token")
+
+        try:
+            key = self.keys.get(kid)
+        except GoogleKeysUnavailable:
+            if not self.tokeninfo_fallback:
+                raise GoogleTokenInvalid("Google signing keys unavailable")
+            return self._tokeninfo(id_token, client_id)
+        if key is None:
+            raise GoogleTokenInvalid("Invalid Google token")
+
+        try:
+            return jwt.decode(
+                id_token,
+                key=key,
+                algorithms=["RS256"],
+                audience=client_id,
+                issuer=GOOGLE_ISSUERS,
+            )
+        except jwt.InvalidAudienceError:
+            raise GoogleTokenInvalid("Token audience mismatch")
+        except jwt.InvalidTokenError:
+            raise GoogleTokenInvalid("Invalid Google token")
+
+    def _tokeninfo(self, id_token: str, client_id: str) -> Dict:
+        try:
+            resp = self.http.get(
+                TOKENINFO_URL, params={"id_token": id_token}, timeout=self.timeout
+            )
+        except requests.RequestException:
+            raise GoogleTokenInvalid("Could not reach Google to verify the token")
+        if resp.status_code != 200:
+            raise GoogleTokenInvalid("Invalid Google token")
+
+        info = resp.json()
+        if info.get("aud") != client_id:
+            raise GoogleTokenInvalid("Token audience mismatch")
+        return info
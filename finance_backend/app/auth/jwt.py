@@ -1,40 +1,146 @@
+import hashlib
+import threading
+import time
 import jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+from jwt.algorithms import get_default_algorithms, has_crypto
 from app.core.settings import settings
 
 SECRET_KEY = settings.SECRET_KEY
 REFRESH_SECRET_KEY = settings.REFRESH_SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 
+ASYMMETRIC_PREFIXES = ("RS", "ES", "PS")
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    return algorithm.upper().startswith(ASYMMETRIC_PREFIXES)
+
+
+@lru_cache(maxsize=None)
+def load_key(algorithm: str, key: str):
+    """A PEM key (inline or a path to a .pem file) parsed once per process.
+
+    Parsing is what makes RS/ES verification slow, jwt.decode reuses the
+    prepared key object as is.
+    """
+    if not key.lstrip().startswith("-----BEGIN"):
+        key = Path(key).read_text()
+    return get_default_algorithms()[algorithm].prepare_key(key)
+
+
+def _signing_key():
+    if not is_asymmetric(ALGORITHM):
+        return SECRET_KEY
+    if not settings.JWT_PRIVATE_KEY:
+        raise RuntimeError(f"ALGORITHM={ALGORITHM} needs JWT_PRIVATE_KEY to issue tokens")
+    return load_key(ALGORITHM, settings.JWT_PRIVATE_KEY)
+
+
+def _verifying_key():
+    if not is_asymmetric(ALGORITHM):
+        return SECRET_KEY
+    if not settings.JWT_PUBLIC_KEY:
+        raise RuntimeError(f"ALGORITHM={ALGORITHM} needs JWT_PUBLIC_KEY to verify tokens")
+    return load_key(ALGORITHM, settings.JWT_PUBLIC_KEY)
+
+
+# Refresh tokens are only ever read back by this API, they stay on the shared
+# secret even when access tokens are signed with a key pair.
+REFRESH_ALGORITHM = "HS256" if is_asymmetric(ALGORITHM) else ALGORITHM
+
+if is_asymmetric(ALGORITHM) and not has_crypto:
+    raise RuntimeError(f"ALGORITHM={ALGORITHM} needs the `cryptography` package")
+
+
+class VerifiedTokenCache:
+    """LRU of payloads of tokens that already passed verification.
+
+    Keyed by a digest of the token so raw bearer tokens are not kept around;
+    an entry is dropped once the token's `exp` has passed. Tokens without `exp`
+    are never cached.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            exp, payload = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return dict(payload)
+
+    def set(self, token: str, payload: Dict) -> None:
+        exp = payload.get("exp")
+        if not self.max_size or not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (exp, dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+verified_tokens = VerifiedTokenCache(settings.JWT_VERIFY_CACHE_SIZE)
+
+
 def create_access_token(user_data: dict, delta: timedelta) -> str:
     encode = user_data.copy()
     expire_date = datetime.now() + delta
     encode.update({"exp": expire_date})
-    jw_token = jwt.encode(payload=encode, key=SECRET_KEY, algorithm=ALGORITHM)
+    jw_token = jwt.encode(payload=encode, key=_signing_key(), algorithm=ALGORITHM)
     return jw_token
 
 def create_refresh_token(user_data: dict, delta: timedelta) -> str:
     encode = user_data.copy()
     expire_date = datetime.now() + delta
     encode.update({"exp": expire_date})
-    ref_jwt = jwt.encode(payload=encode, key=REFRESH_SECRET_KEY, algorithm=ALGORITHM)
+    ref_jwt = jwt.encode(payload=encode, key=REFRESH_SECRET_KEY, algorithm=REFRESH_ALGORITHM)
     return ref_jwt
 
 def verify_access_token(jw_token: str) -> Dict:
-    try:
-        payload = jwt.decode(jwt=jw_token, key=SECRET_KEY, algorithms=[ALGORITHM])
+    payload = verified_tokens.get(jw_token)
+    if payload is not None:
         return payload
+    try:
+        payload = jwt.decode(jwt=jw_token, key=_verifying_key(), algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    verified_tokens.set(jw_token, payload)
+    return payload
 
 def verify_refresh_token(ref_jwt: str) -> Dict:
     try:
-        payload = jwt.decode(jwt=ref_jwt, key=REFRESH_SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(jwt=ref_jwt, key=REFRESH_SECRET_KEY, algorithms=[REFRESH_ALGORITHM])
         return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,89 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from passlib.context import CryptContext
+
+from app.auth.exceptions import PasswordHashingBusy
+from app.core.metrics import registry
+
+
+# bcrypt work runs in worker processes, this module is what they import, so it
+# stays free of settings and database imports.
+
+@lru_cache(maxsize=None)
+def crypt_context(rounds: int) -> CryptContext:
+    # hashes with any other cost are reported by needs_update
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def _hash(password: str, rounds: int) -> str:
+    return crypt_context(rounds).hash(password)
+
+
+def _verify(password: str, hashed: str, rounds: int) -> bool:
+    return crypt_context(rounds).verify(password, hashed)
+
+
+password_wait = registry.histogram(
+    "password_hash_seconds", "Queue wait plus bcrypt time per password operation"
+)
+password_rejected = registry.counter(
+    "password_hash_rejected_total", "Password operations refused because the queue was full"
+)
+password_pending = registry.gauge(
+    "password_hash_pending", "Password operations queued or running", labels=("pool",)
+)
+
+
+class PasswordPool:
+    """Bounded process pool for bcrypt, sized apart from the request threadpool.
+
+    `run` is awaited on the event loop: the bcrypt work runs in a worker process
+    and no request thread waits for it. At most `max_pending` operations wait or
+    run at once; past that callers get PasswordHashingBusy right away instead of
+    queueing up. `workers=0` hashes inline on the loop (tests, one-off scripts).
+    """
+
+    def __init__(self, workers: int, max_pending: int, name: str = "bcrypt"):
+        self.workers = workers
+        self.max_pending = max_pending
+        # only ever acquired when free, so it never waits and isn't tied to a loop
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        password_pending.track(lambda: self._pending, pool=name)
+
+    async def run(self, fn, *args):
+        if self._slots.locked():
+            password_rejected.inc()
+            raise PasswordHashingBusy("too many password operations in flight")
+        async with self._slots:
+            self._pending += 1
+            start = time.perf_counter()
+            try:
+                if not self.workers:
+                    return fn(*args)
+                return await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+            finally:
+                password_wait.observe(time.perf_counter() - start)
+                self._pending -= 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # created on first use so importing the app never forks
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,11 +1,15 @@
 from sqlmodel import select, Session
-from sqlalchemy import or_
+from sqlalchemy import or_, update
 from ..models.user import User
 from ..models.enums import Provider
 from fastapi import Depends
 from ..db.session import get_session
 
 
+# session.info key of the per-session data version memo
+DATA_VERSIONS = "data_versions"
+
+
 class UserRepository:
     def get_user_by_email(self, session: Session, email: str) -> User | None:
         return session.exec(select(User).where(User.email == email)).first()
@@ -38,14 +42,39 @@ class UserRepository:
     def get_user_by_id(self, session: Session, user_id: str) -> User | None:
         return session.exec(select(User).where(User.id == user_id)).first()
 
+    def get_data_version(self, session: Session, user_id) -> int:
+        # read at most once per session, a write through bump_data_version
+        # drops the memo
+        versions = session.info.setdefault(DATA_VERSIONS, {})
+        key = str(user_id)
+        if key not in versions:
+            versions[key] = session.exec(
+                select(User.data_version).where(User.id == user_id)
+            ).one_or_none() or 0
+        return versions[key]
+
+    def bump_data_version(self, session: Session, user_id) -> None:
+        """Mark the user's data as changed, in the caller's transaction.
+
+        Called last before commit: the users row is locked after the
+        transaction, account and rollup rows every write path takes first.
+        """
+        session.exec(
+            update(User)
+            .where(User.id == user_id)
+            # a data change, not a profile change
+            .values(data_version=User.data_version + 1, updated_at=User.updated_at)
+        )
+        session.info.get(DATA_VERSIONS, {}).pop(str(user_id), None)
+
     def save_user(self, session: Session, user: User):
         session.add(user)
         session.commit()
-        session.refresh(user)
         return user
 
     def delete_user(self, session: Session, user: User):
-        session.delete(user)
+        # `user` may be a detached copy from the user cache
+        session.delete(session.merge(user))
         session.commit()
 
 
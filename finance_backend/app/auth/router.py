@@ -1,7 +1,7 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
-from ..db.session import Session, get_session
+from ..db.session import AsyncSession, Session, get_async_session, get_session
 from ..auth.service import get_user_service, UserService
 from ..auth.dependencies import get_current_user
 from ..auth.emailer import send_verification_email
@@ -28,6 +28,7 @@ from ..auth.exceptions import (
     AccountAlreadyVerified,
     RateLimitExceeded,
     InvalidRefreshToken,
+    PasswordHashingBusy,
 )
 from ..core.settings import settings
 
@@ -40,14 +41,14 @@ GOOGLE_CLIENT_ID = settings.GOOGLE_SERVER_CLIENT_ID_WEB
 
 
 @router.post("/register", response_model=TokenOut)
-def register(
+async def register(
     user_data: UserCreate,
     background: BackgroundTasks,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     service: UserService = Depends(get_user_service),
 ):
     try:
-        access, refresh = service.register_user(
+        access, refresh = await service.register_user(
             session,
             user_data.email,
             user_data.password,
@@ -65,24 +66,37 @@ def register(
         return TokenOut(acc_jwt=access, ref_jwt=refresh, token_type="bearer")
     except UserAlreadyExists as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts right now, please retry",
+            headers={"Retry-After": "1"},
+        )
 
 
 @router.post("/login_form")
-def login_form(data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session), service: UserService = Depends(get_user_service)):
-    access, refresh = service.login_local(
-        session,
-        data.username,
-        data.password,
-        ACCESS_TOKEN_EXPIRE_MINUTES,
-        REFRESH_TOKEN_EXPIRE_DAYS,
-    )
+async def login_form(data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_async_session), service: UserService = Depends(get_user_service)):
+    try:
+        access, refresh = await service.login_local(
+            session,
+            data.username,
+            data.password,
+            ACCESS_TOKEN_EXPIRE_MINUTES,
+            REFRESH_TOKEN_EXPIRE_DAYS,
+        )
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts right now, please retry",
+            headers={"Retry-After": "1"},
+        )
     return {"access_token": access, "token_type": "bearer"}
 
 
 @router.post("/login", response_model=TokenOut)
-def login_local(user_data: LoginIn, session: Session = Depends(get_session), service: UserService = Depends(get_user_service)):
+async def login_local(user_data: LoginIn, session: AsyncSession = Depends(get_async_session), service: UserService = Depends(get_user_service)):
     try:
-        access, refresh = service.login_local(
+        access, refresh = await service.login_local(
             session,
             user_data.email,
             user_data.password,
@@ -97,6 +111,12 @@ def login_local(user_data: LoginIn, session: Session = Depends(get_session), ser
             status_code=403,
             detail="Email not verified! please verify your email before you login",
         )
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts right now, please retry",
+            headers={"Retry-After": "1"},
+        )
 
 
 @router.post("/login/google", response_model=TokenOut)
@@ -177,11 +197,12 @@ def get_me(user: User = Depends(get_current_user), service: UserService = Depend
     return service.get_current_user_info(user)
 
 
+# runs on the session get_current_user loaded the user with
 @router.delete("/me")
-def delete_my_account(
+async def delete_my_account(
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     service: UserService = Depends(get_user_service),
 ):
-    message = service.delete_current_user(session, current_user)
+    message = await session.run_sync(service.delete_current_user, current_user)
     return {"detail": message}
\ No newline at end of file
@@ -4,6 +4,7 @@ from typing import Tuple
 from jose import JWTError
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import Depends
 
 from ..models.user import User
@@ -25,32 +26,36 @@ from ..auth.utils import (
     create_tokens_for_user,
     hash_password,
     verify_password,
+    password_needs_rehash,
     validate_google_token,
 )
 from ..auth.jwt import create_access_token, verify_access_token, verify_refresh_token
 from ..auth.repo import UserRepository, get_user_repo
+from ..auth.user_cache import user_cache as default_user_cache
 
 
 class UserService:
-    def __init__(self, repo: UserRepository):
+    def __init__(self, repo: UserRepository, user_cache=None):
         self.repo = repo
+        self.user_cache = user_cache or default_user_cache
 
-    def register_user(
+    async def register_user(
         self,
-        session: Session,
+        session: AsyncSession,
         email: str,
         password: str,
         access_min: int,
         refresh_days: int,
     ) -> Tuple[str, str]:
         email = email.strip().lower()
-        existing_local = self.repo.get_local_user_by_email(session, email)
+        # bcrypt runs in the password pool; the repo calls go through run_sync
+        existing_local = await session.run_sync(self.repo.get_local_user_by_email, email)
         if existing_local:
             raise UserAlreadyExists(email)
 
-        hashed = hash_password(password)
+        hashed = await hash_password(password)
 
-        existing_google = self.repo.get_google_only_user_by_email(session, email)
+        existing_google = await session.run_sync(self.repo.get_google_only_user_by_email, email)
 
         # Case 1 existing google user
         if existing_google:
@@ -60,11 +65,11 @@ class UserService:
             # auto verify all user's (until i get a domain to send email's via servie's)
             existing_google.is_verified = True
             try:
-                session.commit()
-                session.refresh(existing_google)
+                await session.commit()
             except IntegrityError:
-                session.rollback()
+                await session.rollback()
                 raise
+            self.user_cache.invalidate(existing_google.id)
             return create_tokens_for_user(
                 str(existing_google.id), existing_google.email, access_min, refresh_days
             )
@@ -73,16 +78,16 @@ class UserService:
         # auto verify all user's (is_verified = True) (until i get a domain to send email's via servie's)
         user = User(email=email, password_hash=hashed, provider=Provider.LOCAL, is_verified=True)
         try:
-            self.repo.save_user(session, user)
+            await session.run_sync(self.repo.save_user, user)
         except IntegrityError:
-            session.rollback()
+            await session.rollback()
             raise UserAlreadyExists(email)
 
         return create_tokens_for_user(str(user.id), user.email, access_min, refresh_days)
 
-    def login_local(
+    async def login_local(
         self,
-        session: Session,
+        session: AsyncSession,
         email: str,
         password: str,
         access_min: int,
@@ -91,20 +96,25 @@ class UserService:
         email = email.strip().lower()
 
         # check if user already registerd
-        user = self.repo.get_local_user_by_email(session, email)
+        user = await session.run_sync(self.repo.get_local_user_by_email, email)
         if not user:
-            google_only = self.repo.get_google_only_user_by_email(session, email)
+            google_only = await session.run_sync(self.repo.get_google_only_user_by_email, email)
             # if logged in with google before, suggest the user to do it again
             if google_only:
                 raise InvalidCredentials("Use Google Sign-In for this account or register with the email")
             raise InvalidCredentials("Incorrect email or password")
 
-        if not user.password_hash or not verify_password(password, user.password_hash):
+        if not user.password_hash or not await verify_password(password, user.password_hash):
             raise InvalidCredentials("Incorrect email or password")
 
         if not user.is_verified:
             raise AccountNotVerified()
 
+        # the configured bcrypt cost changed since this hash was made
+        if password_needs_rehash(user.password_hash):
+            user.password_hash = await hash_password(password)
+            await session.run_sync(self.repo.save_user, user)
+
         return create_tokens_for_user(str(user.id), user.email, access_min, refresh_days)
 
     def login_google(
@@ -134,6 +144,7 @@ class UserService:
                 existing_local.provider = Provider.LOCAL_GOOGLE
                 existing_local.provider_id = google_sub
                 self.repo.save_user(session, existing_local)
+                self.user_cache.invalidate(existing_local.id)
                 return create_tokens_for_user(
                     str(existing_local.id), existing_local.email, access_min, refresh_days
                 )
@@ -164,6 +175,7 @@ class UserService:
 
         user.is_verified = True
         self.repo.save_user(session, user)
+        self.user_cache.invalidate(user.id)
 
         return "Email verified successfully"
 
@@ -205,6 +217,7 @@ class UserService:
 
     def delete_current_user(self, session: Session, user: User) -> str:
         self.repo.delete_user(session, user)
+        self.user_cache.invalidate(user.id)
         return "Your account has been deleted"
 
 
@@ -0,0 +1,153 @@
+import json
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+import requests
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from app.auth.exceptions import GoogleTokenInvalid
+from app.auth.google import DEFAULT_MAX_AGE, GoogleTokenVerifier, _max_age
+
+
+CLIENT_ID = "client.apps.googleusercontent.com"
+
+
+def make_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def write_jwks(path, keys):
+    jwks = []
+    for kid, key in keys.items():
+        jwk = json.loads(RSAAlgorithm.to_jwk(key.public_key()))
+        jwk.update(kid=kid, alg="RS256", use="sig")
+        jwks.append(jwk)
+    path.write_text(json.dumps({"keys": jwks}))
+
+
+def sign(key, kid, **claims):
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": "google123",
+        "email": "g@test.com",
+        "exp": int(time.time()) + 300,
+    }
+    payload.update(claims)
+    return jwt.encode(payload, key, algorithm="RS256", headers={"kid": kid})
+
+
+class FakeHttp:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def key():
+    return make_key()
+
+
+@pytest.fixture
+def jwks_file(tmp_path, key):
+    path = tmp_path / "certs.json"
+    write_jwks(path, {"k1": key})
+    return path
+
+
+def test_verifies_token_locally(jwks_file, key):
+    http = FakeHttp()
+    verifier = GoogleTokenVerifier(str(jwks_file), http=http)
+
+    info = verifier.verify(sign(key, "k1"), CLIENT_ID)
+    assert (info["sub"], info["email"]) == ("google123", "g@test.com")
+    # both issuer spellings Google uses are accepted
+    assert verifier.verify(sign(key, "k1", iss="accounts.google.com"), CLIENT_ID)
+    assert http.calls == []
+
+
+@pytest.mark.parametrize(
+    "claims, message",
+    [
+        ({"aud": "someone-else"}, "Token audience mismatch"),
+        ({"exp": int(time.time()) - 60}, "Invalid Google token"),
+        ({"iss": "https://evil.example.com"}, "Invalid Google token"),
+    ],
+)
+def test_rejects_bad_claims(jwks_file, key, claims, message):
+    verifier = GoogleTokenVerifier(f"file://{jwks_file}", http=FakeHttp())
+    with pytest.raises(GoogleTokenInvalid, match=message):
+        verifier.verify(sign(key, "k1", **claims), CLIENT_ID)
+
+
+def test_rejects_foreign_signature(jwks_file):
+    verifier = GoogleTokenVerifier(str(jwks_file), http=FakeHttp())
+    with pytest.raises(GoogleTokenInvalid):
+        verifier.verify(sign(make_key(), "k1"), CLIENT_ID)
+    with pytest.raises(GoogleTokenInvalid):
+        verifier.verify("not a jwt", CLIENT_ID)
+
+
+def test_unknown_kid_refetches_once(jwks_file, key):
+    verifier = GoogleTokenVerifier(str(jwks_file), http=FakeHttp())
+    verifier.verify(sign(key, "k1"), CLIENT_ID)
+
+    # keys rotated after the first fetch
+    rotated = make_key()
+    write_jwks(jwks_file, {"k1": key, "k2": rotated})
+    verifier.keys._fetched_at -= 3600
+    assert verifier.verify(sign(rotated, "k2"), CLIENT_ID)["sub"] == "google123"
+
+    # a kid that's still unknown right after a refetch doesn't fetch again
+    write_jwks(jwks_file, {"k3": make_key()})
+    with pytest.raises(GoogleTokenInvalid):
+        verifier.verify(sign(make_key(), "k3"), CLIENT_ID)
+
+
+def test_keys_follow_cache_control(key):
+    jwks = {"keys": [dict(json.loads(RSAAlgorithm.to_jwk(key.public_key())), kid="k1")]}
+    response = SimpleNamespace(
+        json=lambda: jwks,
+        headers={"Cache-Control": "public, max-age=19845, must-revalidate"},
+        raise_for_status=lambda: None,
+    )
+    http = FakeHttp(response, response)
+    verifier = GoogleTokenVerifier("https://example.com/certs", http=http)
+
+    for _ in range(3):
+        verifier.verify(sign(key, "k1"), CLIENT_ID)
+    assert len(http.calls) == 1
+
+    verifier.keys._expires_at = time.monotonic() - 1
+    verifier.verify(sign(key, "k1"), CLIENT_ID)
+    assert len(http.calls) == 2
+
+    assert _max_age("public, max-age=19845") == 19845
+    assert _max_age("no-store") == 0
+    assert _max_age(None) == DEFAULT_MAX_AGE
+
+
+def test_falls_back_to_tokeninfo_without_keys(key):
+    tokeninfo = SimpleNamespace(status_code=200, json=lambda: {"aud": CLIENT_ID, "sub": "google123"})
+    http = FakeHttp(requests.ConnectionError("down"), tokeninfo)
+    verifier = GoogleTokenVerifier("https://example.com/certs", http=http)
+
+    assert verifier.verify(sign(key, "k1"), CLIENT_ID)["sub"] == "google123"
+    assert http.calls[1].endswith("/tokeninfo")
+
+    strict = GoogleTokenVerifier(
+        "https://example.com/certs", tokeninfo_fallback=False,
+        http=FakeHttp(requests.ConnectionError("down")),
+    )
+    with pytest.raises(GoogleTokenInvalid, match="keys unavailable"):
+        strict.verify(sign(key, "k1"), CLIENT_ID)
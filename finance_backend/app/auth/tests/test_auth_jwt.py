@@ -0,0 +1,88 @@
+import time
+from datetime import timedelta
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+import app.auth.jwt as jwt_module
+from app.auth.jwt import VerifiedTokenCache, create_access_token, verify_access_token
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = VerifiedTokenCache(max_size=2)
+    monkeypatch.setattr(jwt_module, "verified_tokens", cache)
+    return cache
+
+
+def count_decodes(monkeypatch):
+    calls = []
+    decode = jwt_module.jwt.decode
+    monkeypatch.setattr(jwt_module.jwt, "decode", lambda *a, **kw: calls.append(1) or decode(*a, **kw))
+    return calls
+
+
+def test_verified_token_is_served_from_cache(monkeypatch, fresh_cache):
+    calls = count_decodes(monkeypatch)
+    token = create_access_token({"id": "u1"}, timedelta(minutes=5))
+
+    first = verify_access_token(token)
+    first["id"] = "tampered"
+    assert verify_access_token(token)["id"] == "u1"
+    assert len(calls) == 1
+
+    # rejected tokens are not remembered
+    assert verify_access_token(token + "x") is None
+    assert verify_access_token(token + "x") is None
+    assert len(calls) == 3 and len(fresh_cache) == 1
+
+
+def test_cache_expires_at_token_exp_and_evicts_lru(fresh_cache):
+    fresh_cache.set("old", {"id": "a", "exp": time.time() - 1})
+    assert fresh_cache.get("old") is None
+
+    fresh_cache.set("a", {"exp": time.time() + 60})
+    fresh_cache.set("b", {"exp": time.time() + 60})
+    fresh_cache.get("a")
+    fresh_cache.set("c", {"exp": time.time() + 60})
+    assert fresh_cache.get("b") is None
+    assert fresh_cache.get("a") and fresh_cache.get("c")
+
+    # no exp, nothing to bound the entry by
+    fresh_cache.set("forever", {"id": "x"})
+    assert fresh_cache.get("forever") is None
+
+
+def test_asymmetric_tokens_verify_with_public_key_only(monkeypatch, tmp_path):
+    private = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_path = tmp_path / "jwt_public.pem"
+    public_path.write_bytes(
+        private.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+    )
+    monkeypatch.setattr(jwt_module, "ALGORITHM", "ES256")
+    monkeypatch.setattr(jwt_module.settings, "JWT_PRIVATE_KEY", private_pem)
+    monkeypatch.setattr(jwt_module.settings, "JWT_PUBLIC_KEY", str(public_path))
+
+    token = create_access_token({"id": "u1"}, timedelta(minutes=5))
+    assert jwt_module.jwt.get_unverified_header(token)["alg"] == "ES256"
+
+    # a verifier without the private key
+    monkeypatch.setattr(jwt_module.settings, "JWT_PRIVATE_KEY", None)
+    jwt_module.load_key.cache_clear()
+    assert verify_access_token(token)["id"] == "u1"
+    jwt_module.verified_tokens.clear()
+    assert verify_access_token(token)["id"] == "u1"
+    # the public key was read and parsed once
+    assert jwt_module.load_key.cache_info().misses == 1
+
+    # an HMAC token signed with the shared secret is not accepted
+    monkeypatch.setattr(jwt_module, "ALGORITHM", "HS256")
+    forged = create_access_token({"id": "u1"}, timedelta(minutes=5))
+    monkeypatch.setattr(jwt_module, "ALGORITHM", "ES256")
+    assert verify_access_token(forged) is None
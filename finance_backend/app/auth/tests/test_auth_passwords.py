@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth.exceptions import PasswordHashingBusy
+from app.auth.passwords import PasswordPool, crypt_context, _hash, _verify, password_rejected
+from app.main import app
+
+
+def test_pool_hashes_in_worker_processes():
+    pool = PasswordPool(workers=1, max_pending=2, name="test-process")
+    try:
+        hashed = asyncio.run(pool.run(_hash, "secret", 4))
+        assert hashed.startswith("$2b$04$")
+        assert asyncio.run(pool.run(_verify, "secret", hashed, 4)) is True
+        assert asyncio.run(pool.run(_verify, "wrong", hashed, 4)) is False
+    finally:
+        pool.shutdown()
+
+
+def test_app_shutdown_stops_the_pool(monkeypatch):
+    pool = PasswordPool(workers=1, max_pending=2, name="test-lifespan")
+    monkeypatch.setattr("app.main.password_pool", pool)
+    with TestClient(app) as c:
+        c.portal.call(pool.run, _hash, "secret", 4)
+        assert pool._executor is not None
+    assert pool._executor is None
+
+
+def test_pool_rejects_past_max_pending():
+    pool = PasswordPool(workers=1, max_pending=1, name="test-bounded")
+
+    async def scenario():
+        slow = asyncio.create_task(pool.run(time.sleep, 0.5))
+        await asyncio.sleep(0)  # let it take the only slot
+
+        rejected_before = password_rejected.value()
+        with pytest.raises(PasswordHashingBusy):
+            await pool.run(time.sleep, 0)
+        assert password_rejected.value() == rejected_before + 1
+
+        # the loop stays free while the worker process sleeps
+        ticks = 0
+        while not slow.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        await slow
+        assert ticks > 1
+        # the slot is free again
+        await pool.run(time.sleep, 0)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+
+def test_needs_update_follows_configured_cost():
+    cheap = _hash("secret", 4)
+    assert crypt_context(5).needs_update(cheap)
+    assert not crypt_context(4).needs_update(cheap)
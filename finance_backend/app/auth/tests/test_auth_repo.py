@@ -2,6 +2,7 @@ import pytest
 from sqlmodel import Session
 from uuid import UUID
 from app.auth.repo import UserRepository
+from app.auth.user_cache import InMemoryUserCache
 from app.models.user import User
 from app.models.enums import Provider
 from app.tests.conftest import db_session, create_test_database
@@ -119,3 +120,17 @@ def test_delete_user_removes_from_db(db_session: Session):
     repo.delete_user(db_session, user)
 
     assert db_session.get(User, user.id) is None
+
+
+def test_delete_user_accepts_detached_copy(db_session: Session):
+    user = User(email="gone@example.com", provider=Provider.LOCAL)
+    db_session.add(user)
+    db_session.commit()
+    # the cache hands out the same row, not attached to the session
+    cache = InMemoryUserCache(max_size=1, ttl=60)
+    cache.set(user)
+    copy = cache.get(user.id)
+
+    repo.delete_user(db_session, copy)
+
+    assert repo.get_user_by_email(db_session, "gone@example.com") is None
@@ -4,6 +4,7 @@ from fastapi.testclient import TestClient
 from app.tests.conftest import override_get_current_user
 from finance_backend.app.main import app
 from app.auth import service
+from app.auth.exceptions import PasswordHashingBusy
 
 client = TestClient(app)
 
@@ -14,9 +15,10 @@ def _clear_override(dep):
 # Tests
 def test_register_success(monkeypatch):
     # fake service instance exposing register_user(...)
-    fake_service = SimpleNamespace(
-        register_user=lambda session, email, password, access_exp, refresh_exp: ("fake_access", "fake_refresh")
-    )
+    async def register_user(session, email, password, access_exp, refresh_exp):
+        return "fake_access", "fake_refresh"
+
+    fake_service = SimpleNamespace(register_user=register_user)
     # override the DI provider used by router
     app.dependency_overrides[service.get_user_service] = lambda: fake_service
 
@@ -40,7 +42,7 @@ def test_register_success(monkeypatch):
 
 def test_register_user_already_exists():
     # fake service that raises the same exception the real service would
-    def _raise(*a, **k):
+    async def _raise(*a, **k):
         raise service.UserAlreadyExists("duplicate@example.com", "User already exists")
 
     fake_service = SimpleNamespace(register_user=_raise)
@@ -57,9 +59,10 @@ def test_register_user_already_exists():
 
 
 def test_login_success():
-    fake_service = SimpleNamespace(
-        login_local=lambda session, email, password, access_exp, refresh_exp: ("access123", "refresh123")
-    )
+    async def login_local(session, email, password, access_exp, refresh_exp):
+        return "access123", "refresh123"
+
+    fake_service = SimpleNamespace(login_local=login_local)
     app.dependency_overrides[service.get_user_service] = lambda: fake_service
 
     payload = {"email": "user@example.com", "password": "pw"}
@@ -75,7 +78,7 @@ def test_login_success():
 
 
 def test_login_invalid_credentials():
-    def _raise(*a, **k):
+    async def _raise(*a, **k):
         raise service.InvalidCredentials("Invalid credentials")
 
     fake_service = SimpleNamespace(login_local=_raise)
@@ -90,8 +93,23 @@ def test_login_invalid_credentials():
     assert response.json()["detail"] == "Invalid credentials"
 
 
+def test_login_password_pool_busy():
+    async def _raise(*a, **k):
+        raise PasswordHashingBusy("too many password operations in flight")
+
+    fake_service = SimpleNamespace(login_local=_raise)
+    app.dependency_overrides[service.get_user_service] = lambda: fake_service
+
+    response = client.post("/v1/auth/login", json={"email": "busy@example.com", "password": "pw"})
+
+    _clear_override(service.get_user_service)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
 def test_login_account_not_verified():
-    def _raise(*a, **k):
+    async def _raise(*a, **k):
         raise service.AccountNotVerified()
 
     fake_service = SimpleNamespace(login_local=_raise)
@@ -1,4 +1,6 @@
+import asyncio
 import pytest
+from unittest.mock import Mock
 from types import SimpleNamespace
 from datetime import datetime, timedelta
 from jose import JWTError
@@ -46,6 +48,24 @@ class FakeRepo:
         fn = self._fns.get("delete_user")
         return fn(session, user) if fn else None
 
+class FakeAsyncSession:
+    """Stands in for the AsyncSession the register/login routes use."""
+
+    async def run_sync(self, fn, *args):
+        return fn(None, *args)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def _returns(value):
+    async def fn(*args):
+        return value
+    return fn
+
 # Tests
 def test_register_user_success(monkeypatch):
     fake_repo = FakeRepo(
@@ -54,11 +74,11 @@ def test_register_user_success(monkeypatch):
         save_user=lambda s, u: None,
     )
 
-    monkeypatch.setattr(service_module, "hash_password", lambda pw: "hashed_pw")
+    monkeypatch.setattr(service_module, "hash_password", _returns("hashed_pw"))
     monkeypatch.setattr(service_module, "create_tokens_for_user", lambda uid, em, a, r: ("acc", "ref"))
 
     svc = UserService(fake_repo)
-    acc, ref = svc.register_user(None, "user@example.com", "pw", 15, 30)
+    acc, ref = asyncio.run(svc.register_user(FakeAsyncSession(), "user@example.com", "pw", 15, 30))
 
     assert acc == "acc"
     assert ref == "ref"
@@ -69,43 +89,63 @@ def test_register_user_user_already_exists():
     svc = UserService(fake_repo)
 
     with pytest.raises(UserAlreadyExists):
-        svc.register_user(None, "exists@example.com", "pw", 15, 30)
+        asyncio.run(svc.register_user(FakeAsyncSession(), "exists@example.com", "pw", 15, 30))
 
 
 def test_login_local_success(monkeypatch):
     fake_user = User(id=1, email="x@test.com", password_hash="hashed", is_verified=True)
     fake_repo = FakeRepo(get_local_user_by_email=lambda s, e: fake_user)
 
-    monkeypatch.setattr(service_module, "verify_password", lambda p, h: True)
+    monkeypatch.setattr(service_module, "verify_password", _returns(True))
     monkeypatch.setattr(service_module, "create_tokens_for_user", lambda *a, **kw: ("a", "r"))
 
     svc = UserService(fake_repo)
-    acc, ref = svc.login_local(None, "x@test.com", "pw", 15, 30)
+    acc, ref = asyncio.run(svc.login_local(FakeAsyncSession(), "x@test.com", "pw", 15, 30))
 
     assert acc == "a"
     assert ref == "r"
 
 
+def test_login_local_rehashes_outdated_cost(monkeypatch):
+    fake_user = User(id=1, email="x@test.com", password_hash="$2b$04$old", is_verified=True)
+    saved = []
+    fake_repo = FakeRepo(get_local_user_by_email=lambda s, e: fake_user, save_user=lambda s, u: saved.append(u))
+
+    monkeypatch.setattr(service_module, "verify_password", _returns(True))
+    monkeypatch.setattr(service_module, "password_needs_rehash", lambda h: h == "$2b$04$old")
+    monkeypatch.setattr(service_module, "hash_password", _returns("$2b$12$new"))
+    monkeypatch.setattr(service_module, "create_tokens_for_user", lambda *a, **kw: ("a", "r"))
+
+    svc = UserService(fake_repo)
+    asyncio.run(svc.login_local(FakeAsyncSession(), "x@test.com", "pw", 15, 30))
+    assert fake_user.password_hash == "$2b$12$new"
+    assert saved == [fake_user]
+
+    # the next login finds a current hash and leaves it alone
+    asyncio.run(svc.login_local(FakeAsyncSession(), "x@test.com", "pw", 15, 30))
+    assert len(saved) == 1
+
+
 def test_login_local_invalid_password(monkeypatch):
     fake_user = User(id=1, email="x@test.com", password_hash="hashed", is_verified=True)
     fake_repo = FakeRepo(get_local_user_by_email=lambda s, e: fake_user)
 
-    monkeypatch.setattr(service_module, "verify_password", lambda p, h: False)
+    monkeypatch.setattr(service_module, "verify_password", _returns(False))
 
     svc = UserService(fake_repo)
     with pytest.raises(InvalidCredentials):
-        svc.login_local(None, "x@test.com", "wrong", 15, 30)
+        asyncio.run(svc.login_local(FakeAsyncSession(), "x@test.com", "wrong", 15, 30))
 
 
 def test_login_local_unverified_account(monkeypatch):
     fake_user = User(id=1, email="x@test.com", password_hash="h", is_verified=False)
     fake_repo = FakeRepo(get_local_user_by_email=lambda s, e: fake_user)
 
-    monkeypatch.setattr(service_module, "verify_password", lambda p, h: True)
+    monkeypatch.setattr(service_module, "verify_password", _returns(True))
 
     svc = UserService(fake_repo)
     with pytest.raises(AccountNotVerified):
-        svc.login_local(None, "x@test.com", "pw", 15, 30)
+        asyncio.run(svc.login_local(FakeAsyncSession(), "x@test.com", "pw", 15, 30))
 
 
 def test_verify_email_success(monkeypatch):
@@ -118,11 +158,26 @@ def test_verify_email_success(monkeypatch):
 
     monkeypatch.setattr(service_module, "verify_access_token", lambda jw_token: {"sub": "u@test.com"})
 
-    svc = UserService(fake_repo)
+    fake_cache = Mock()
+    svc = UserService(fake_repo, fake_cache)
     msg = svc.verify_email(None, "fake_token")
 
     assert msg == "Email verified successfully"
     assert fake_user.is_verified is True
+    # the cached row still says unverified
+    fake_cache.invalidate.assert_called_once_with(1)
+
+
+def test_delete_current_user_invalidates_cache():
+    fake_user = User(id=1, email="u@test.com")
+    deleted = []
+    fake_cache = Mock()
+    svc = UserService(FakeRepo(delete_user=lambda s, u: deleted.append(u)), fake_cache)
+
+    svc.delete_current_user(None, fake_user)
+
+    assert deleted == [fake_user]
+    fake_cache.invalidate.assert_called_once_with(1)
 
 
 def test_verify_email_invalid_token(monkeypatch):
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import fakeredis
+import pytest
+from unittest.mock import Mock
+from uuid import uuid4
+from fastapi import HTTPException
+
+from app.auth import user_cache as user_cache_module
+from app.auth.dependencies import get_current_user, get_current_user_id
+from app.auth.jwt import create_access_token
+from app.auth.user_cache import InMemoryUserCache, RedisUserCache, _row, _row_from_json
+from app.models.user import User
+from app.models.enums import Provider
+from datetime import datetime, timedelta
+
+
+def make_user(email="cached@test.com"):
+    return User(id=uuid4(), email=email, provider=Provider.LOCAL, is_verified=True)
+
+
+class FakeSession:
+    """run_sync without a database, counts how often it is used."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def run_sync(self, fn, *args):
+        self.calls += 1
+        return fn(self, *args)
+
+
+# Tests
+def test_memory_cache_returns_detached_copies():
+    cache = InMemoryUserCache(max_size=10, ttl=60)
+    user = make_user()
+    cache.set(user)
+
+    cached = cache.get(user.id)
+    assert cached is not user
+    assert (cached.id, cached.email, cached.provider) == (user.id, user.email, Provider.LOCAL)
+
+    cache.invalidate(user.id)
+    assert cache.get(user.id) is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = InMemoryUserCache(max_size=2, ttl=60)
+    a, b, c = make_user("a@t.com"), make_user("b@t.com"), make_user("c@t.com")
+    cache.set(a)
+    cache.set(b)
+    cache.get(a.id)     # b is now the oldest
+    cache.set(c)
+
+    assert cache.get(b.id) is None
+    assert cache.get(a.id) is not None and cache.get(c.id) is not None
+
+
+def test_memory_cache_entries_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(user_cache_module.time, "monotonic", lambda: clock[0])
+    cache = InMemoryUserCache(max_size=10, ttl=30)
+    user = make_user()
+    cache.set(user)
+
+    clock[0] += 29
+    assert cache.get(user.id) is not None
+    clock[0] += 2
+    assert cache.get(user.id) is None
+
+
+def test_redis_payload_round_trips():
+    user = make_user()
+    user.password_hash = "$2b$12$secret"
+    user.created_at = datetime(2025, 1, 2, 3, 4, 5)
+    restored = User(**_row_from_json(json.loads(json.dumps(_row(user), default=str))))
+
+    assert restored.id == user.id
+    assert restored.provider is Provider.LOCAL
+    assert restored.created_at == datetime(2025, 1, 2, 3, 4, 5)
+    # the hash stays out of the cache
+    assert "password_hash" not in _row(user)
+    assert restored.password_hash is None
+
+
+@pytest.fixture
+def redis_cache():
+    # the real client, talking to an in-process server instead of a socket
+    cache = RedisUserCache("redis://localhost:6379/0", ttl=60)
+    server = fakeredis.FakeServer()
+    cache.client = fakeredis.FakeRedis(server=server)
+    return cache, server
+
+
+def test_redis_cache_round_trips_through_the_client(redis_cache):
+    cache, _ = redis_cache
+    user = make_user()
+    user.password_hash = "$2b$12$secret"
+    cache.set(user)
+
+    assert cache.client.ttl(cache.prefix + str(user.id)) == 60
+    assert b"secret" not in cache.client.get(cache.prefix + str(user.id))
+    cached = cache.get(user.id)
+    assert (cached.id, cached.email, cached.password_hash) == (user.id, user.email, None)
+
+    cache.invalidate(user.id)
+    assert cache.get(user.id) is None
+    cache.set(user)
+    cache.clear()
+    assert cache.client.keys("user:*") == []
+
+
+def test_redis_cache_errors_fall_back_to_the_database(redis_cache, monkeypatch):
+    cache, server = redis_cache
+    server.connected = False
+    monkeypatch.setattr("app.auth.dependencies.user_cache", cache)
+    user = make_user()
+    repo = Mock()
+    repo.get_user_by_id.return_value = user
+    session = FakeSession()
+
+    # get misses, set is dropped: every request reads the database
+    assert asyncio.run(get_current_user(user.id, session, repo)) is user
+    assert asyncio.run(get_current_user(user.id, session, repo)) is user
+    assert session.calls == 2
+    cache.invalidate(user.id)
+    cache.clear()
+
+
+def test_get_current_user_hits_the_database_once(monkeypatch):
+    cache = InMemoryUserCache(max_size=10, ttl=60)
+    monkeypatch.setattr("app.auth.dependencies.user_cache", cache)
+    user = make_user()
+    repo = Mock()
+    repo.get_user_by_id.side_effect = lambda session, user_id: user if user_id == user.id else None
+    session = FakeSession()
+
+    first = asyncio.run(get_current_user(user.id, session, repo))
+    second = asyncio.run(get_current_user(user.id, session, repo))
+
+    assert first.email == second.email == user.email
+    assert session.calls == 1
+
+    # a missing user is not cached
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(get_current_user(uuid4(), session, repo))
+    assert e.value.status_code == 404
+
+
+def test_get_current_user_id_reads_only_the_token():
+    user_id = uuid4()
+    token = create_access_token({"id": str(user_id)}, timedelta(minutes=1))
+
+    assert asyncio.run(get_current_user_id(token)) == user_id
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(get_current_user_id("not-a-token"))
+    assert e.value.status_code == 401
@@ -0,0 +1,149 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from app.core.settings import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Users handed out by the cache are detached copies: good for reading fields,
+# code that changes or deletes the row has to go through a session first.
+# The password hash is never cached, login reads it from the database.
+CACHED_COLUMNS = tuple(c for c in User.__table__.columns if c.name != "password_hash")
+
+
+def _row(user: User) -> dict:
+    return {column.name: getattr(user, column.name, None) for column in CACHED_COLUMNS}
+
+
+def _row_from_json(data: dict) -> dict:
+    row = {}
+    for column in CACHED_COLUMNS:
+        value = data.get(column.name)
+        try:
+            kind = column.type.python_type
+        except NotImplementedError:  # sqlmodel's AutoString, already a str
+            kind = str
+        if value is not None:
+            value = kind.fromisoformat(value) if kind is datetime else kind(value)
+        row[column.name] = value
+    return row
+
+class InMemoryUserCache:
+    """Per-process LRU of user rows, each entry valid for `ttl` seconds."""
+
+    is_remote = False
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> Optional[User]:
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return User(**data)
+
+    def set(self, user: User) -> None:
+        key = str(user.id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, _row(user))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id) -> None:
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisUserCache:
+    """Shared across workers, entries expire through Redis' own TTL."""
+
+    is_remote = True
+
+    def __init__(self, url: str, ttl: int, prefix: str = "user:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("USER_CACHE_BACKEND=redis needs the `redis` package") from e
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.errors = redis.RedisError
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, user_id) -> Optional[User]:
+        # an unreachable cache sends the lookup to the database
+        try:
+            raw = self.client.get(self.prefix + str(user_id))
+        except self.errors:
+            logger.warning("user cache get failed for %s", user_id, exc_info=True)
+            return None
+        return User(**_row_from_json(json.loads(raw))) if raw else None
+
+    def set(self, user: User) -> None:
+        try:
+            self.client.set(
+                self.prefix + str(user.id), json.dumps(_row(user), default=str), ex=self.ttl
+            )
+        except self.errors:
+            logger.warning("user cache set failed for %s", user.id, exc_info=True)
+
+    def invalidate(self, user_id) -> None:
+        # a failed delete leaves the old row readable until its TTL runs out
+        try:
+            self.client.delete(self.prefix + str(user_id))
+        except self.errors:
+            logger.warning("user cache invalidate failed for %s", user_id, exc_info=True)
+
+    def clear(self) -> None:
+        try:
+            for key in self.client.scan_iter(self.prefix + "*"):
+                self.client.delete(key)
+        except self.errors:
+            logger.warning("user cache clear failed", exc_info=True)
+
+
+class NullUserCache:
+    is_remote = False
+
+    def get(self, user_id) -> Optional[User]:
+        return None
+
+    def set(self, user: User) -> None:
+        pass
+
+    def invalidate(self, user_id) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+def build_user_cache(settings):
+    if settings.USER_CACHE_BACKEND == "redis":
+        return RedisUserCache(settings.REDIS_URL, settings.USER_CACHE_TTL_SECONDS)
+    if settings.USER_CACHE_BACKEND == "none":
+        return NullUserCache()
+    return InMemoryUserCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+user_cache = build_user_cache(settings)
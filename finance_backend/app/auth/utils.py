@@ -1,18 +1,36 @@
 from datetime import timedelta
 
-import requests
 from ..auth.jwt import create_access_token, create_refresh_token
-from passlib.context import CryptContext
+from passlib.exc import UnknownHashError
 from typing import Dict
-from ..auth.exceptions import GoogleTokenInvalid
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+from ..auth.google import GoogleTokenVerifier
+from ..auth.passwords import PasswordPool, crypt_context, _hash, _verify
+from ..core.settings import settings
+
+BCRYPT_ROUNDS = settings.BCRYPT_ROUNDS
+password_pool = PasswordPool(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING
+)
+pwd_context = crypt_context(BCRYPT_ROUNDS)
+google_verifier = GoogleTokenVerifier(
+    settings.GOOGLE_JWKS_URL,
+    timeout=settings.GOOGLE_HTTP_TIMEOUT_SECONDS,
+    tokeninfo_fallback=settings.GOOGLE_TOKENINFO_FALLBACK,
+)
+
+async def hash_password(password: str) -> str:
+    return await password_pool.run(_hash, password, BCRYPT_ROUNDS)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run(_verify, plain_password, hashed_password, BCRYPT_ROUNDS)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with another bcrypt cost than BCRYPT_ROUNDS.
+    Cheap, only parses the hash."""
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except (UnknownHashError, ValueError):
+        return False
 
 ACCESS_MIN = 15  # defaults (or import from settings)
 
@@ -23,14 +41,4 @@ def create_tokens_for_user(user_id: str, email: str, access_minutes: int, refres
     return access, refresh
 
 def validate_google_token(id_token: str, google_client_id: str) -> Dict:
-    resp = requests.get(f"https://oauth2.googleapis.com/tokeninfo?id_token={id_token}")
-
-    if resp.status_code != 200:
-        raise GoogleTokenInvalid("Invalid Google token")
-
-    info = resp.json()
-
-    if info.get("aud") != google_client_id:
-        raise GoogleTokenInvalid("Token audience mismatch")
-
-    return info
\ No newline at end of file
+    return google_verifier.verify(id_token, google_client_id)
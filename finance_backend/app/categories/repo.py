@@ -44,7 +44,6 @@ class CategoriesRepo:
     def save_category(self, session: Session, category: Category) -> Category:
         session.add(category)
         session.flush()
-        session.refresh(category)
 
         return category
 
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, Path, Query, HTTPException, status
-from app.api.deps import get_current_user, get_session
-from app.models.user import User
+from app.api.conditional import conditional_get
+from app.api.deps import get_current_user_id, get_async_session
+from uuid import UUID
 from app.models.enums import CategoryType
 from app.categories.service import CategoriesService, get_categories_service
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.categories.schemas import CategoryCreate, CategoryOut, CategoriesOut, CategoryUpdate
 from typing import Annotated, Optional
 from app.categories.exceptions import (
@@ -16,8 +17,8 @@ from app.categories.exceptions import (
 
 router = APIRouter(prefix="/categories", tags=["category"])
 
-@router.get("/", response_model=CategoriesOut)
-def get_user_categories(
+@router.get("/", response_model=CategoriesOut, dependencies=[Depends(conditional_get)])
+async def get_user_categories(
     limit: int = Query(
         50, ge=1, le=500, title="limit", description="amount of result per page"
     ),
@@ -32,11 +33,11 @@ def get_user_categories(
     type: Optional[CategoryType] = Query(
         None, title="Category Type", description="Type of the category i.e INCOME, EXPENSE or BOTH"
     ),
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     service: CategoriesService = Depends(get_categories_service),
 ):
-    categories, total = service.get_user_categories(session, current_user.id, limit, offset, type, active)
+    categories, total = await session.run_sync(service.get_user_categories, user_id, limit, offset, type, active)
 
     category_outs = []
     for category in categories:
@@ -46,16 +47,16 @@ def get_user_categories(
     return categories_out
 
 @router.post("/", response_model=CategoryOut, status_code=status.HTTP_201_CREATED)
-def create_category(
+async def create_category(
     category_data: CategoryCreate,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     service: CategoriesService = Depends(get_categories_service),
     ):
     try:
-        category = service.create_category(
-            session,
-            current_user.id,
+        category = await session.run_sync(
+            service.create_category,
+            user_id,
             **category_data.model_dump()
         )
         category_out = CategoryOut.model_validate(category)
@@ -65,7 +66,7 @@ def create_category(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
 @router.get("/{id}", response_model=CategoryOut)
-def get_category(
+async def get_category(
     id: Annotated[
         int,
         Path(
@@ -75,19 +76,19 @@ def get_category(
             examples=[1, 2, 3, 4, 5, 6, 7],
         ),
     ],
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     service: CategoriesService = Depends(get_categories_service),
 ):
     try:
-        category = service.get_category(session, id, current_user.id)
+        category = await session.run_sync(service.get_category, id, user_id)
         category_out = CategoryOut.model_validate(category)
         return category_out
     except CategoryNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 @router.patch("/{id}", response_model=CategoryOut)
-def update_category(
+async def update_category(
     id: Annotated[
         int,
         Path(
@@ -98,13 +99,13 @@ def update_category(
         ),
     ],
     category_data: CategoryUpdate,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     service: CategoriesService = Depends(get_categories_service),
 ):
     try:
         update_data = category_data.model_dump(exclude_unset=True)
-        updated_category = service.update_category(session, id, current_user.id, update_data)
+        updated_category = await session.run_sync(service.update_category, id, user_id, update_data)
         
         category_out = CategoryOut.model_validate(updated_category)
         return category_out
@@ -117,7 +118,7 @@ def update_category(
 @router.patch(
     "/{id}/deactivate", response_model=CategoryOut, status_code=status.HTTP_200_OK
 )
-def deactivate_category(
+async def deactivate_category(
     id: Annotated[
         int,
         Path(
@@ -127,12 +128,12 @@ def deactivate_category(
             examples=[1, 2, 3, 4, 5, 6, 7],
         ),
     ],
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     service: CategoriesService = Depends(get_categories_service),
 ):
     try:
-        deactivated_category = service.deactivate_category(session, id, current_user.id)
+        deactivated_category = await session.run_sync(service.deactivate_category, id, user_id)
         category_out = CategoryOut.model_validate(deactivated_category)
         return category_out
     except CategoryNotFound as e:
@@ -140,7 +141,7 @@ def deactivate_category(
 
 
 @router.patch("/{id}/restore", response_model=CategoryOut)
-def restore_category(
+async def restore_category(
     id: Annotated[
         int,
         Path(
@@ -150,13 +151,13 @@ def restore_category(
             examples=[1, 2, 3, 4, 5, 6, 7],
         ),
     ],
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     service: CategoriesService = Depends(get_categories_service),
 ):
 
     try:
-        restored_category = service.restore_category(session, id, current_user.id)
+        restored_category = await session.run_sync(service.restore_category, id, user_id)
         category_out = CategoryOut.model_validate(restored_category)
         return category_out
     except CategoryNotFound as e:
@@ -164,7 +165,7 @@ def restore_category(
     
 
 @router.delete("/{id}", response_model=None, status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(
+async def delete_category(
     id: Annotated[
         int,
         Path(
@@ -174,12 +175,12 @@ def delete_category(
             exampes=[1, 2, 3, 4, 5, 6, 7],
         ),
     ],
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     service: CategoriesService = Depends(get_categories_service),
 ):
     try:
-        service.delete_category(session, id, current_user.id)
+        await session.run_sync(service.delete_category, id, user_id)
     except CategoryNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except CouldnotDeleteCategory as e:
@@ -1,9 +1,11 @@
 from fastapi import Depends
 from app.models.category import Category
 from app.categories.repo import CategoriesRepo, get_category_repo
+from app.auth.repo import UserRepository, get_user_repo
 from sqlmodel import Session
 from sqlalchemy.exc import IntegrityError
-from typing import Tuple, List
+from app.db.errors import is_missing_user
+from typing import Optional, Tuple, List
 from app.categories.exceptions import (
     CategoryNameAlreadyTaken,
     CategoryError,
@@ -12,8 +14,9 @@ from app.categories.exceptions import (
 )
 
 class CategoriesService():
-    def __init__(self, repo: CategoriesRepo):
+    def __init__(self, repo: CategoriesRepo, user_repo: Optional[UserRepository] = None):
         self.repo = repo
+        self.user_repo = user_repo or UserRepository()
 
     def get_user_categories(
         self, session: Session, user_id, limit, offset, type, active
@@ -25,10 +28,13 @@ class CategoriesService():
         category = Category(user_id=user_id, name=name, type=type, description=description)
         try:
             refreshed_category = self.repo.save_category(session, category)
+            self.user_repo.bump_data_version(session, user_id)
             session.commit()
             return refreshed_category
-        except IntegrityError:
+        except IntegrityError as e:
             session.rollback()
+            if is_missing_user(e):
+                raise
             raise CategoryNameAlreadyTaken(
                 "This Category name has already been taken please use another name"
             )
@@ -52,10 +58,13 @@ class CategoriesService():
 
         try:
             refreshed_category = self.repo.save_category(session, category)
+            self.user_repo.bump_data_version(session, user_id)
             session.commit()
             return refreshed_category
-        except IntegrityError:
+        except IntegrityError as e:
             session.rollback()
+            if is_missing_user(e):
+                raise
             raise CategoryNameAlreadyTaken(
                 "This Category name has already been taken please use another name"
             )
@@ -68,6 +77,7 @@ class CategoriesService():
         
         category.active = False
         deactivated_category = self.repo.save_category(session, category)
+        self.user_repo.bump_data_version(session, user_id)
         session.commit()
         return deactivated_category
 
@@ -78,6 +88,7 @@ class CategoriesService():
         
         category.active = True
         restored_category = self.repo.save_category(session, category)
+        self.user_repo.bump_data_version(session, user_id)
         session.commit()
         return restored_category
 
@@ -89,8 +100,12 @@ class CategoriesService():
         if self.repo.count_transactions_for_categories(session, id) > 0:
             raise CouldnotDeleteCategory("Cannot hard-delete category with transactions. Consider deactivating.")
         self.repo.delete_category(session, Category)
+        self.user_repo.bump_data_version(session, user_id)
         session.commit()
 
 # Fast Api Dependency provider
-def get_categories_service(repo: CategoriesRepo = Depends(get_category_repo)) -> CategoriesService:
-    return CategoriesService(repo)
\ No newline at end of file
+def get_categories_service(
+    repo: CategoriesRepo = Depends(get_category_repo),
+    user_repo: UserRepository = Depends(get_user_repo),
+) -> CategoriesService:
+    return CategoriesService(repo, user_repo)
\ No newline at end of file
@@ -4,6 +4,7 @@ from uuid import UUID
 from unittest.mock import Mock
 from finance_backend.app.main import app
 from app.categories.service import CategoriesService, get_categories_service
+from app.auth.repo import UserRepository, get_user_repo
 from app.models.category import Category
 from app.models.enums import CategoryType
 from app.tests.conftest import override_get_current_user
@@ -29,8 +30,13 @@ def client():
 @pytest.fixture
 def client_with_mock(client, mock_service):
     app.dependency_overrides[get_categories_service] = lambda: mock_service
+    # conditional GETs read the data version, kept off the database here
+    user_repo = Mock(spec=UserRepository)
+    user_repo.get_data_version.return_value = 0
+    app.dependency_overrides[get_user_repo] = lambda: user_repo
     yield client
     app.dependency_overrides.pop(get_categories_service, None)
+    app.dependency_overrides.pop(get_user_repo, None)
 
 # Tests
 def test_get_categories_query_params(client_with_mock, mock_service, override_get_current_user):
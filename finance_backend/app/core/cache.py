@@ -0,0 +1,191 @@
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Awaitable, Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.metrics import registry
+from app.core.settings import settings
+
+
+# Results of the analytics endpoints, keyed by their ETag. The ETag covers the
+# user, the user's data version, the path and the query, so a write makes every
+# earlier entry of that user unreachable at once: nothing has to be deleted,
+# old entries age out through the LRU or the Redis TTL.
+
+MISSING = object()
+
+cache_hits = registry.counter(
+    "result_cache_hits_total", "Analytics results served from the cache", labels=("endpoint",)
+)
+cache_misses = registry.counter(
+    "result_cache_misses_total", "Analytics results computed and stored", labels=("endpoint",)
+)
+cache_evictions = registry.counter(
+    "result_cache_evictions_total", "Entries dropped to stay under the size limit", labels=("backend",)
+)
+cache_entries = registry.gauge(
+    "result_cache_entries", "Entries held by the in-process result cache", labels=("backend",)
+)
+
+
+class ResultCache:
+    """get_or_compute and the hit/miss counters, backends provide get and set."""
+
+    is_remote = False
+
+    def get(self, key: str):
+        return MISSING
+
+    def set(self, key: str, value) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    async def get_or_compute(
+        self, endpoint: str, key: str, compute: Callable[[], Awaitable]
+    ):
+        # remote lookups go to a thread so a slow Redis never stalls the loop
+        if self.is_remote:
+            value = await run_in_threadpool(self.get, key)
+        else:
+            value = self.get(key)
+        if value is not MISSING:
+            cache_hits.inc(endpoint=endpoint)
+            return value
+
+        cache_misses.inc(endpoint=endpoint)
+        value = await compute()
+        if self.is_remote:
+            await run_in_threadpool(self.set, key, value)
+        else:
+            self.set(key, value)
+        return value
+
+
+class InMemoryResultCache(ResultCache):
+    """Per-process LRU holding at most `max_size` results.
+
+    Values are shared between requests, callers must not mutate them.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        cache_entries.track(lambda: len(self._entries), backend="memory")
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._entries.get(key, MISSING)
+            if value is not MISSING:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                cache_evictions.inc(backend="memory")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Redis entries are JSON, never pickle: anyone who can write to the shared
+# Redis could otherwise run code in every worker. The analytics results are
+# dicts, lists and tuples (read back as lists) of str, int, Decimal and dates;
+# Decimals and dates are tagged so they come back as themselves.
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return {"$decimal": str(value)}
+    # datetime first, it's a date too
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Type is not cacheable: {type(value).__name__}")
+
+
+def _decode(obj: dict):
+    if len(obj) == 1:
+        if "$decimal" in obj:
+            return Decimal(obj["$decimal"])
+        if "$datetime" in obj:
+            return datetime.fromisoformat(obj["$datetime"])
+        if "$date" in obj:
+            return date.fromisoformat(obj["$date"])
+    return obj
+
+
+def encode_result(value) -> bytes:
+    return json.dumps(value, default=_encode, separators=(",", ":")).encode()
+
+
+def decode_result(raw: bytes):
+    return json.loads(raw, object_hook=_decode)
+
+
+class RedisResultCache(ResultCache):
+    """Shared across workers; Redis' TTL and maxmemory policy do the evicting.
+
+    Results are stored through encode_result, see above.
+    """
+
+    is_remote = True
+
+    def __init__(self, url: str, ttl: int, prefix: str = "result:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RESULT_CACHE_BACKEND=redis needs the `redis` package") from e
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.errors = redis.RedisError
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str):
+        # an unreachable cache only costs the recomputation
+        try:
+            raw = self.client.get(self.prefix + key)
+        except self.errors:
+            return MISSING
+        if raw is None:
+            return MISSING
+        try:
+            return decode_result(raw)
+        except ValueError:
+            # not something this app wrote, recompute over it
+            return MISSING
+
+    def set(self, key: str, value) -> None:
+        try:
+            self.client.set(self.prefix + key, encode_result(value), ex=self.ttl)
+        except self.errors:
+            pass
+
+    def clear(self) -> None:
+        try:
+            for key in self.client.scan_iter(self.prefix + "*"):
+                self.client.delete(key)
+        except self.errors:
+            pass
+
+
+def build_result_cache(settings) -> ResultCache:
+    if settings.RESULT_CACHE_BACKEND == "redis":
+        return RedisResultCache(settings.REDIS_URL, settings.RESULT_CACHE_TTL_SECONDS)
+    if settings.RESULT_CACHE_BACKEND == "none":
+        return ResultCache()
+    return InMemoryResultCache(settings.RESULT_CACHE_MAX_SIZE)
+
+
+result_cache = build_result_cache(settings)
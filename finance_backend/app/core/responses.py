@@ -0,0 +1,40 @@
+from decimal import Decimal
+from operator import attrgetter
+from typing import Any, Iterable, List, Sequence
+from uuid import UUID
+
+import orjson
+from fastapi.responses import Response
+
+
+def _default(value: Any):
+    # the types orjson leaves to us; Decimal goes out as a string like pydantic does
+    if isinstance(value, Decimal):
+        return str(value)
+    # asyncpg hands back its own UUID subclass, orjson only takes uuid.UUID itself
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes for `content`. UUID, datetime and enums are handled by orjson."""
+    return orjson.dumps(content, default=_default)
+
+
+def rows_as_dicts(rows: Iterable, fields: Sequence[str]) -> List[dict]:
+    """Pick `fields` off Core rows (or any objects with those attributes)."""
+    get = attrgetter(*fields)
+    if len(fields) == 1:
+        return [{fields[0]: get(row)} for row in rows]
+    return [dict(zip(fields, get(row))) for row in rows]
+
+
+class ORJSONResponse(Response):
+    """Skips response_model validation and pydantic serialization: the content
+    must already be shaped like the documented model."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
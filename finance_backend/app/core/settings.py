@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -10,13 +11,45 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(..., env="ACCESS_TOKEN_EXPIRE_MINUTES")
     REFRESH_TOKEN_EXPIRE_DAYS: int = Field(..., env="REFRESH_TOKEN_EXPIRE_DAYS")
     COOLDOWN_VERIFICATION_EMAIL_SECONDS: int = 60
+    # RS*/ES*/PS* ALGORITHM signs access tokens with a key pair (PEM text or a
+    # path to a .pem file); services that only verify need just the public key
+    JWT_PRIVATE_KEY: Optional[str] = None
+    JWT_PUBLIC_KEY: Optional[str] = None
+    JWT_VERIFY_CACHE_SIZE: int = 10000  # verified access tokens kept, 0 disables
+    # Passwords, changing BCRYPT_ROUNDS rehashes users on their next login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # 0 hashes in the request thread
+    PASSWORD_HASH_MAX_PENDING: int = 16
     # Google
     GOOGLE_SERVER_CLIENT_ID_WEB: str = Field(..., env="GOOGLE_SERVER_CLIENT_ID_WEB")
+    # ID tokens are checked against these keys, an https URL or a local JWKS file
+    GOOGLE_JWKS_URL: str = "https://www.googleapis.com/oauth2/v3/certs"
+    GOOGLE_TOKENINFO_FALLBACK: bool = True  # ask tokeninfo when the keys can't be loaded
+    GOOGLE_HTTP_TIMEOUT_SECONDS: float = 5.0
 
     # Database
     DATABASE_URL: str = Field(..., env="DATABASE_URL")
     ALEMBIC_DATABASE_URL: str = Field(..., env="ALEMBIC_DATABASE_URL")
     TEST_DATABASE_URL: str = Field(..., env="TEST_DATABASE_URL")
+    # engine profile, see app/db/session.py
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # 0 disables
+    DB_USE_NULL_POOL: bool = False  # set when PgBouncer does the pooling
+    DB_ECHO: Optional[bool] = None  # None: echo only when ENVIRONMENT is development
+    TRANSACTION_PARTITIONS_AHEAD: int = 3  # months of transactions partitions kept ready
+
+    # Caches
+    REDIS_URL: str = "redis://localhost:6379/0"
+    USER_CACHE_BACKEND: str = "memory"  # memory | redis | none
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+    RESULT_CACHE_BACKEND: str = "memory"  # memory | redis | none
+    RESULT_CACHE_TTL_SECONDS: int = 300  # redis only, memory entries leave by LRU
+    RESULT_CACHE_MAX_SIZE: int = 10000
 
     # Api Url
     API_BASE_URL_MOBILE: str = Field(..., env="API_BASE_URL_MOBILE")
@@ -24,6 +57,11 @@ class Settings(BaseSettings):
     MAIL_USERNAME: str = Field(..., env="MAIL_USERNAME")
     MAIL_PASSWORD: str = Field(..., env="MAIL_PASSWORD")
 
+    # Metrics, GET /metrics answers 404 until a token is set and then only
+    # to "Authorization: Bearer <token>", the header a Prometheus scrape
+    # config sends through its authorization credentials
+    METRICS_TOKEN: Optional[str] = None
+
     # Misc
     ENVIRONMENT: str = "development"
 
@@ -0,0 +1,19 @@
+from sqlalchemy.exc import IntegrityError
+
+
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def is_missing_user(error: IntegrityError) -> bool:
+    """A foreign key violation on users: the access token outlived its user.
+
+    Routes take the user id from the token without loading the row, so a
+    deleted user's writes only fail once they reach the database.
+    """
+    orig = error.orig
+    if getattr(orig, "pgcode", None) != FOREIGN_KEY_VIOLATION:
+        return False
+    # psycopg2 carries the detail on `diag`, asyncpg on the exception it wraps
+    diag = getattr(orig, "diag", None)
+    detail = getattr(diag, "message_detail", None) or getattr(orig.__cause__, "detail", None)
+    return 'in table "users"' in (detail or "")
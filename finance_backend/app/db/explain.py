@@ -0,0 +1,28 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class explain(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON, ...)` wrapper around any select.
+
+    Compiled through the statement's own compiler so bound parameters work
+    with whichever driver the session is using.
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    options = "FORMAT JSON, ANALYZE, BUFFERS" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) " + compiler.process(element.statement, **kw)
+
+
+def estimated_row_count(session, statement) -> int:
+    """Planner's row estimate for `statement`, without executing it."""
+    plan = session.exec(explain(statement)).scalar_one()
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,109 @@
+from datetime import date
+from typing import List, Set
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+
+# `transactions` is range partitioned by month on occurred_at, one
+# transactions_yYYYYmMM table per month plus transactions_default for rows no
+# month covers. Months are created ahead of time by
+# scripts/maintain_transaction_partitions.py, so new rows always land in their
+# own month and queries bounded on occurred_at only open the months they need.
+
+PARENT = "transactions"
+DEFAULT_PARTITION = "transactions_default"
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year}m{month.month:02d}"
+
+
+def existing_partitions(session: Session) -> Set[str]:
+    return set(
+        session.exec(
+            text(
+                """
+                SELECT c.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = CAST(:parent AS regclass)
+                """
+            ),
+            params={"parent": PARENT},
+        ).scalars()
+    )
+
+
+def create_month_partition(session: Session, month: date) -> bool:
+    """Create the partition holding `month`, returns False if it exists.
+
+    Rows the default partition already holds for that month (a backfill of
+    old messages, say) are moved into it: the default is detached for the
+    move, which blocks the table until the caller commits, so that path is
+    only taken when there is something to move.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    if name in existing_partitions(session):
+        return False
+
+    # dates from datetime.date only, safe to inline in the DDL
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    in_month = "occurred_at >= :start AND occurred_at < :end"
+    params = {"start": month, "end": add_months(month, 1)}
+    stray = session.exec(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})"),
+        params=params,
+    ).scalar_one()
+
+    if not stray:
+        session.exec(text(f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES {bounds}"))
+    else:
+        session.exec(text(f"ALTER TABLE {PARENT} DETACH PARTITION {DEFAULT_PARTITION}"))
+        session.exec(text(f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES {bounds}"))
+        # straight off the detached table, whose deletes don't fire the
+        # parent's trigger, so the moved rows keep their message ids
+        session.exec(
+            text(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION} WHERE {in_month} RETURNING *
+                )
+                INSERT INTO {PARENT} SELECT * FROM moved
+                """
+            ),
+            params=params,
+        )
+        session.exec(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+    # extended statistics aren't inherited, each month needs its own
+    session.exec(
+        text(
+            f"CREATE STATISTICS IF NOT EXISTS {name}_user_account_category "
+            f"(dependencies) ON user_id, account_id, category_id FROM {name}"
+        )
+    )
+    return True
+
+
+def ensure_transaction_partitions(session: Session, first: date, last: date) -> List[str]:
+    """Create every missing month from `first` to `last`, inclusive.
+
+    Returns the names of the partitions created; the caller commits.
+    """
+    created = []
+    month, last = month_start(first), month_start(last)
+    while month <= last:
+        if create_month_partition(session, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
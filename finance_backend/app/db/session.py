@@ -1,11 +1,185 @@
+import time
+from datetime import date, datetime, timedelta, timezone
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..core.metrics import registry
 from ..core.settings import settings
 
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL, echo=True)
+pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection"
+)
+pool_checkout_timeouts = registry.counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout"
+)
+pool_checked_out = registry.gauge(
+    "db_pool_checked_out", "Connections currently checked out", labels=("engine",)
+)
+pool_saturation = registry.gauge(
+    "db_pool_saturation",
+    "Checked out connections over pool_size + max_overflow",
+    labels=("engine",),
+)
+
+
+class _TimedCheckout:
+    """Records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_checkout_timeouts.inc()
+            raise
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(settings, is_async: bool = False) -> dict:
+    """create_engine kwargs for the configured profile.
+
+    DB_USE_NULL_POOL is meant for running behind PgBouncer in transaction mode:
+    the bouncer does the pooling and rejects the `options` startup parameter,
+    so statement_timeout has to be set on the database role instead.
+    """
+    echo = settings.DB_ECHO
+    if echo is None:
+        echo = settings.ENVIRONMENT == "development"
+    options = {"echo": echo, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    if settings.DB_USE_NULL_POOL:
+        options["poolclass"] = NullPool
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if timeout and is_async:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout)}}
+    elif timeout:
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+def async_database_url(url: str) -> str:
+    """The same database through the asyncpg driver."""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(
+        hide_password=False
+    )
+
+
+def register_pool_metrics(engine, name: str, max_overflow: int) -> None:
+    """`max_overflow` is the configured one, the pool doesn't expose it."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    capacity = pool.size() + max(max_overflow, 0)
+    pool_checked_out.track(pool.checkedout, engine=name)
+    pool_saturation.track(
+        lambda: pool.checkedout() / capacity if capacity else 0.0, engine=name
+    )
+
+
+engine = create_engine(DATABASE_URL, **engine_options(settings))
+register_pool_metrics(engine, "sync", settings.DB_MAX_OVERFLOW)
+
+# The columns are `timestamp without time zone` while the models write aware
+# datetimes. psycopg2 sends those as timestamptz, which Postgres converts to the
+# session time zone (UTC) on the way into the column; asyncpg refuses aware
+# values instead, so encode them the way that conversion would.
+_PG_EPOCH = datetime(2000, 1, 1)
+
+
+def _encode_timestamp(value: date):
+    # plain dates too, psycopg2 lets Postgres read those as midnight
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return ((value - _PG_EPOCH) // timedelta(microseconds=1),)
+
+
+def _decode_timestamp(value) -> datetime:
+    return _PG_EPOCH + timedelta(microseconds=value[0])
+
+
+def create_async_db_engine(url: str, settings):
+    async_engine = create_async_engine(
+        async_database_url(url), **engine_options(settings, is_async=True)
+    )
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _register_timestamp_codec(dbapi_connection, connection_record):
+        dbapi_connection.run_async(
+            lambda conn: conn.set_type_codec(
+                "timestamp",
+                schema="pg_catalog",
+                encoder=_encode_timestamp,
+                decoder=_decode_timestamp,
+                format="tuple",
+            )
+        )
+
+    return async_engine
+
+
+async_engine = create_async_db_engine(DATABASE_URL, settings)
+register_pool_metrics(async_engine.sync_engine, "async", settings.DB_MAX_OVERFLOW)
+
+# objects stay usable after commit: reloading expired attributes would need IO
+# outside of the greenlet the session runs its queries in
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 def get_session():
-    with Session(engine) as session:
+    # like AsyncSessionLocal: returning committed objects costs no reload
+    with Session(engine, expire_on_commit=False) as session:
         yield session
+
+
+async def get_async_session():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def get_async_session_factory():
+    """For streaming responses: dependency sessions are closed before the body
+    is sent, so a streaming body opens its own session from this factory."""
+    return AsyncSessionLocal
+
+
+class SyncSessionRunner:
+    """`run_sync` over a plain Session, executed in the threadpool.
+
+    Lets code written against get_async_session run on the sync path, e.g. the
+    tests, whose sessions are bound to a connection that gets rolled back.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
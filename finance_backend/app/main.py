@@ -1,9 +1,48 @@
-from fastapi import FastAPI
+import hmac
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import IntegrityError
 from app.api.v1 import api_router
-app = FastAPI(title="Finance Tracker")
+from app.auth.utils import password_pool
+from app.core.metrics import registry
+from app.core.settings import settings
+from app.db.errors import is_missing_user
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # the bcrypt worker processes would otherwise outlive a reload or shutdown
+    password_pool.shutdown()
+
+
+app = FastAPI(title="Finance Tracker", lifespan=lifespan)
 
 app.include_router(router=api_router)
 
+@app.exception_handler(IntegrityError)
+async def integrity_error(request: Request, exc: IntegrityError):
+    # a deleted user's still valid token: answer like get_current_user did
+    if is_missing_user(exc):
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "User not found"})
+    raise exc
+
 @app.get("/health")
 def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics(authorization: Optional[str] = Header(None)):
+    # see METRICS_TOKEN in app/core/settings.py
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not hmac.compare_digest(authorization or "", f"Bearer {token}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return registry.render()
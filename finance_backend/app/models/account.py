@@ -14,6 +14,9 @@ class Account(SQLModel, table=True):
     __table_args__ = (
         UniqueConstraint("user_id", "name", name="uq_account_user_name"),
     )
+    # updated_at comes back through RETURNING on insert and update alike, so a
+    # flush leaves nothing to refresh
+    __mapper_args__ = {"eager_defaults": True}
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: UUID = Field(
         sa_column=Column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False,  index=True)
@@ -0,0 +1,62 @@
+from sqlmodel import SQLModel, Field, UniqueConstraint
+from sqlalchemy import Index
+from typing import Optional
+from decimal import Decimal
+from sqlalchemy import Column, Numeric, ForeignKey, Integer
+from uuid import UUID
+from datetime import date
+from ..models.enums import TransactionType
+
+
+class TransactionDailyRollup(SQLModel, table=True):
+    """Per user, day, account, category and type totals of `transactions`.
+
+    Kept in step by TransactionsService on every write so the analytics
+    endpoints never have to aggregate the raw table.
+    """
+
+    __tablename__ = "transaction_daily_rollups"
+    __table_args__ = (
+        # category_id is nullable, uncategorized rows still share one bucket
+        UniqueConstraint(
+            "user_id",
+            "day",
+            "account_id",
+            "category_id",
+            "type",
+            name="uq_transaction_daily_rollups_key",
+            postgresql_nulls_not_distinct=True,
+        ),
+        # every analytics read is user + day range, with the sums included
+        # they are answered from the index alone
+        Index(
+            "ix_transaction_daily_rollups_user_day",
+            "user_id",
+            "day",
+            postgresql_include=["type", "account_id", "category_id", "total", "count"],
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: UUID = Field(
+        sa_column=Column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    )
+    day: date = Field(nullable=False)
+    # indexed for the cascades, deleting an account or category would
+    # otherwise scan the whole table
+    account_id: int = Field(
+        sa_column=Column(
+            Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False, index=True
+        )
+    )
+    category_id: Optional[int] = Field(
+        default=None,
+        sa_column=Column(
+            Integer, ForeignKey("categories.id", ondelete="CASCADE"), nullable=True, index=True
+        ),
+    )
+    type: TransactionType = Field(nullable=False)
+    total: Decimal = Field(
+        default=Decimal("0"), sa_column=Column(Numeric(18, 4), nullable=False)
+    )
+    count: int = Field(default=0, nullable=False)
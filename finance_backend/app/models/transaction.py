@@ -9,7 +9,7 @@ from ..models.enums import TransactionType
 
 
 from sqlmodel import SQLModel, Field
-from sqlalchemy import Column, Integer, ForeignKey, Numeric, Index
+from sqlalchemy import DDL, Column, Integer, ForeignKey, Numeric, Index, PrimaryKeyConstraint, desc, event
 from typing import Optional
 from decimal import Decimal
 from datetime import datetime
@@ -17,23 +17,56 @@ from datetime import datetime
 class Transaction(SQLModel, table=True):
     __tablename__ = "transactions"
 
+    # monthly range partitions on occurred_at, see app/db/partitions.py. Every
+    # unique constraint has to include occurred_at, so (user_id, message_id)
+    # uniqueness lives in TransactionMessage instead.
     __table_args__ = (
+        # backs keyset pagination: WHERE user_id = ? AND (occurred_at, id) < (?, ?)
         Index(
-            "uniq_transactions_user_message",
+            "ix_transactions_user_occurred_at_id",
             "user_id",
-            "message_id",
-            unique=True,
-            postgresql_where=Column("message_id").isnot(None),
+            desc("occurred_at"),
+            desc("id"),
         ),
+        # the same order under an account, category or type filter, so filtered
+        # pages stop after `limit` rows instead of sorting every match; amount
+        # and type ride along for index-only sums over a range
+        Index(
+            "ix_transactions_user_account_occurred_at_id",
+            "user_id",
+            "account_id",
+            desc("occurred_at"),
+            desc("id"),
+            postgresql_include=["amount", "type"],
+        ),
+        Index(
+            "ix_transactions_user_category_occurred_at_id",
+            "user_id",
+            "category_id",
+            desc("occurred_at"),
+            desc("id"),
+            postgresql_include=["amount", "type"],
+        ),
+        Index(
+            "ix_transactions_user_type_occurred_at_id",
+            "user_id",
+            "type",
+            desc("occurred_at"),
+            desc("id"),
+            postgresql_include=["amount"],
+        ),
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
     )
 
-    id: Optional[int] = Field(default=None, primary_key=True)
+    id: Optional[int] = Field(
+        default=None, primary_key=True, sa_column_kwargs={"autoincrement": True}
+    )
 
+    # user_id leads every composite above, it needs no index of its own
     user_id: UUID = Field(
         sa_column=Column(
             ForeignKey("users.id", ondelete="CASCADE"),
             nullable=False,
-            index=True,
         )
     )
 
@@ -65,11 +98,62 @@ class Transaction(SQLModel, table=True):
     is_outgoing: Optional[bool] = Field(default=None, nullable=True)
 
     created_at: datetime = Field(default_factory=now_utc)
+    # part of the primary key because it is the partition key
     occurred_at: datetime = Field(
         default_factory=now_utc,
-        nullable=False,
-        index=True,
+        primary_key=True,
         description="Date the transaction occurred",
     )
 
-    message_id: Optional[str] = Field(default=None, nullable=True)
\ No newline at end of file
+    message_id: Optional[str] = Field(default=None, nullable=True)
+
+
+class TransactionMessage(SQLModel, table=True):
+    """The message ids of a user's stored transactions, one row each.
+
+    Writers claim the message id here (INSERT ... ON CONFLICT DO NOTHING)
+    before inserting its transaction, deleting the transaction releases it.
+    """
+
+    __tablename__ = "transaction_messages"
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "message_id", name="uniq_transactions_user_message"),
+    )
+
+    user_id: UUID = Field(
+        sa_column=Column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    )
+    message_id: str = Field(nullable=False)
+
+
+# A statement trigger, so an UPDATE moving a row to another partition (a delete
+# plus an insert underneath) keeps its message id, while deletes, including
+# the cascades from accounts, categories and users, release theirs.
+RELEASE_MESSAGES_FUNCTION = """
+CREATE OR REPLACE FUNCTION release_transaction_messages() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM transaction_messages m
+    USING released r
+    WHERE m.user_id = r.user_id AND m.message_id = r.message_id;
+    RETURN NULL;
+END
+$$
+"""
+RELEASE_MESSAGES_TRIGGER = """
+CREATE TRIGGER transactions_release_messages
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS released
+FOR EACH STATEMENT EXECUTE FUNCTION release_transaction_messages()
+"""
+
+# create_all gets the catch-all partition and the trigger, the migrations set
+# up the same plus the monthly partitions
+for statement in (
+    "CREATE TABLE transactions_default PARTITION OF transactions DEFAULT",
+    RELEASE_MESSAGES_FUNCTION,
+    RELEASE_MESSAGES_TRIGGER,
+):
+    event.listen(
+        Transaction.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql")
+    )
\ No newline at end of file
@@ -9,6 +9,8 @@ from app.models.enums import Provider
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    # updated_at is fetched with RETURNING, see Account
+    __mapper_args__ = {"eager_defaults": True}
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     email: str = Field(nullable=False, unique=True, index=True)
@@ -18,6 +20,11 @@ class User(SQLModel, table=True):
     is_verified: bool = Field(default=False)
     last_verification_email: Optional[datetime] = Field(nullable=True)
     created_at: datetime = Field(default_factory=now_utc)
+    # bumped by every write to the user's accounts, categories or transactions,
+    # conditional GETs derive their ETag from it
+    data_version: int = Field(
+        default=0, sa_column_kwargs={"server_default": "0", "nullable": False}
+    )
     updated_at: datetime = Field(
         default=None,
         sa_column=Column(
@@ -1,5 +1,7 @@
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlmodel import SQLModel, create_engine, Session
 from sqlalchemy.orm import sessionmaker
 from uuid import UUID, uuid4
@@ -8,8 +10,15 @@ from finance_backend.app.main import app
 from app import models
 from app.models.user import User
 from app.core.settings import settings
-from app.db.session import get_session
-from app.auth.dependencies import get_current_user
+from app.core.cache import result_cache
+from app.db.session import (
+    AsyncSession,
+    SyncSessionRunner,
+    create_async_db_engine,
+    get_async_session,
+    get_session,
+)
+from app.auth.dependencies import get_current_user, get_current_user_id
 
 
 # Database setup
@@ -46,20 +55,29 @@ def db_session(create_test_database):
 
 @pytest.fixture(scope="function")
 def override_get_session(db_session):
-    """Override get_session dependency to use the test DB session."""
+    """Override get_session and get_async_session to use the test DB session."""
     def _get_test_session():
         yield db_session
 
+    # the async routes run their service calls on the same rolled-back session
+    async def _get_test_async_session():
+        yield SyncSessionRunner(db_session)
+
     app.dependency_overrides[get_session] = _get_test_session
+    app.dependency_overrides[get_async_session] = _get_test_async_session
     yield
     app.dependency_overrides.pop(get_session, None)
+    app.dependency_overrides.pop(get_async_session, None)
+
+
+FAKE_USER_ID = UUID(int=0x12345678123456781234567812345678)
 
 
 @pytest.fixture(scope="function")
 def override_get_current_user():
     """Override get_current_user dependency to simulate a logged-in user."""
     fake_user = User(
-        id=UUID(int=0x12345678123456781234567812345678),
+        id=FAKE_USER_ID,
         provider=models.enums.Provider.LOCAL,
         email="fake@user.com",
         is_verified=True,
@@ -70,8 +88,10 @@ def override_get_current_user():
         return fake_user
 
     app.dependency_overrides[get_current_user] = _fake_user
+    app.dependency_overrides[get_current_user_id] = lambda: fake_user.id
     yield
     app.dependency_overrides.pop(get_current_user, None)
+    app.dependency_overrides.pop(get_current_user_id, None)
 
 
 # Test client
@@ -80,6 +100,68 @@ def client(override_get_session):
     """Test client with dependencies overridden (auth + db)."""
     with TestClient(app) as c:
         yield c
+    # every test reuses the same user id and data version
+    result_cache.clear()
+
+
+@pytest.fixture(scope="function")
+def async_client(db_session):
+    """Test client whose async routes run on asyncpg, as in production.
+
+    The routes get an AsyncSession on one asyncpg connection whose transaction
+    is rolled back after the test. asyncpg connections belong to an event loop,
+    so the connection is opened and closed through the client's portal.
+    `async_client.run_sync(fn, *args)` calls fn(session, *args) on that session
+    to set up or inspect data; db_session is a separate transaction and sees
+    none of it.
+    """
+    engine = create_async_db_engine(TEST_DATABASE_URL, settings)
+
+    async def _open():
+        connection = await engine.connect()
+        transaction = await connection.begin()
+        session = AsyncSession(
+            bind=connection,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+        return connection, transaction, session
+
+    async def _close(connection, transaction, session):
+        await session.close()
+        await transaction.rollback()
+        await connection.close()
+        await engine.dispose()
+
+    with TestClient(app) as c:
+        connection, transaction, session = c.portal.call(_open)
+
+        def _get_test_session():
+            yield db_session
+
+        async def _get_test_async_session():
+            yield session
+
+        app.dependency_overrides[get_session] = _get_test_session
+        app.dependency_overrides[get_async_session] = _get_test_async_session
+        c.run_sync = lambda fn, *args: c.portal.call(session.run_sync, fn, *args)
+        try:
+            yield c
+        finally:
+            app.dependency_overrides.pop(get_session, None)
+            app.dependency_overrides.pop(get_async_session, None)
+            c.portal.call(_close, connection, transaction, session)
+    result_cache.clear()
+
+
+@pytest.fixture(scope="function")
+def api(client, db_session, override_get_current_user):
+    """`client` with the fake user stored, for routes that write rows owned by it."""
+    # the app's sessions keep objects loaded across commit, so does this one
+    db_session.expire_on_commit = False
+    db_session.add(User(id=FAKE_USER_ID, email="fake@user.com", provider=models.enums.Provider.LOCAL, is_verified=True))
+    db_session.commit()
+    return client
 
 
 # ------------- Helpers -------------
@@ -93,4 +175,19 @@ def create_test_user(session: Session, email="test@example.com", password_hash="
     session.add(user)
     session.commit()
     session.refresh(user)
-    return user
\ No newline at end of file
+    return user
+
+
+@contextmanager
+def count_queries(engine=test_engine):
+    """Collects the SQL statements sent through `engine` inside the block."""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
@@ -120,4 +120,17 @@ def test_access_protected_route_with_valid_token(client: TestClient, db_session:
 
     # Step 5: Validate response
     assert me_data["email"] == "alice@example.com"
-    assert me_data["is_verified"] is True
\ No newline at end of file
+    assert me_data["is_verified"] is True
+
+@pytest.mark.parametrize("client_fixture", ["client", "async_client"])
+def test_writes_for_a_deleted_user_answer_404(request, client_fixture, override_get_current_user):
+    # the token still verifies but its user row is gone
+    api = request.getfixturevalue(client_fixture)
+
+    for url, payload in (
+        ("v1/accounts/", {"name": "Bank", "type": "BANK", "currency": "USD"}),
+        ("v1/categories/", {"name": "Food", "type": "EXPENSE"}),
+    ):
+        response = api.post(url, json=payload)
+        assert response.status_code == 404, response.text
+        assert response.json() == {"detail": "User not found"}
@@ -0,0 +1,44 @@
+from app.api.conditional import etag_matches
+from app.tests.conftest import api, count_queries
+
+
+def test_unchanged_data_answers_304_without_querying(api):
+    first = api.get("v1/accounts/?limit=10")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    with count_queries() as statements:
+        response = api.get("v1/accounts/?limit=10", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    # at most the version lookup, never the listing itself
+    assert not any("accounts" in statement for statement in statements)
+
+    # another endpoint or other params are another representation
+    assert api.get("v1/accounts/?limit=20").headers["ETag"] != etag
+    assert api.get("v1/categories/?limit=10").headers["ETag"] != etag
+
+
+def test_writes_change_the_etag(api):
+    etag = api.get("v1/transactions/balances").headers["ETag"]
+
+    api.post("v1/accounts/", json={"name": "Bank", "type": "BANK", "currency": "USD"})
+    response = api.get("v1/transactions/balances", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["accounts"][0]["name"] == "Bank"
+
+    # a rejected write changes nothing
+    etag = response.headers["ETag"]
+    api.post("v1/accounts/", json={"name": "Bank", "type": "BANK", "currency": "USD"})
+    assert api.get("v1/transactions/balances", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_etag_matching():
+    assert etag_matches('W/"abc"', 'W/"abc"')
+    assert etag_matches('"x", "abc"', 'W/"abc"')
+    assert etag_matches("*", 'W/"abc"')
+    assert not etag_matches(None, 'W/"abc"')
+    assert not etag_matches('W/"abd"', 'W/"abc"')
@@ -0,0 +1,189 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from sqlmodel import select
+from app.auth.repo import UserRepository
+from app.core.metrics import MetricsRegistry
+from app.core.responses import dumps
+from app.core.settings import settings
+from app.db.session import (
+    AsyncSession,
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    async_database_url,
+    create_async_db_engine,
+    engine_options,
+    pool_checkout_wait,
+    pool_saturation,
+    register_pool_metrics,
+)
+from app.main import app
+from app.models.user import User
+from app.tests.conftest import create_test_user
+from app.transactions.repo import TransactionRepo
+
+
+def profile(**overrides):
+    values = dict(
+        ENVIRONMENT="production", DB_ECHO=None, DB_POOL_SIZE=3, DB_MAX_OVERFLOW=2,
+        DB_POOL_TIMEOUT=5, DB_POOL_RECYCLE=600, DB_POOL_PRE_PING=True,
+        DB_STATEMENT_TIMEOUT_MS=1500, DB_USE_NULL_POOL=False,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_engine_options_production_profile():
+    options = engine_options(profile())
+    assert options["echo"] is False
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"], options["pool_recycle"]) == (3, 2, 600)
+    assert options["connect_args"] == {"options": "-c statement_timeout=1500"}
+
+    # echo follows the environment unless set explicitly
+    assert engine_options(profile(ENVIRONMENT="development"))["echo"] is True
+    assert engine_options(profile(ENVIRONMENT="development", DB_ECHO=False))["echo"] is False
+
+
+def test_engine_options_null_pool_for_pgbouncer():
+    options = engine_options(profile(DB_USE_NULL_POOL=True))
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options and "connect_args" not in options
+
+
+def test_pool_checkout_is_measured():
+    engine = create_engine(settings.TEST_DATABASE_URL, **engine_options(profile()))
+    register_pool_metrics(engine, "test", max_overflow=2)
+    before = pool_checkout_wait.count
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text("show statement_timeout")).scalar() == "1500ms"
+            assert engine.pool.checkedout() == 1
+            # one of pool_size 3 + max_overflow 2
+            assert pool_saturation.value(engine="test") == 0.2
+    finally:
+        engine.dispose()
+    assert pool_checkout_wait.count == before + 1
+
+
+def test_async_engine_profile():
+    options = engine_options(profile(), is_async=True)
+    assert options["poolclass"] is InstrumentedAsyncQueuePool
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "1500"}}
+    assert async_database_url("postgresql://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+
+
+BOUND_TIMESTAMPS = [
+    datetime(2025, 1, 31, 23, 30, tzinfo=timezone(timedelta(hours=-5))),
+    date(2024, 2, 29),
+    datetime(2024, 2, 29, 8),
+]
+
+
+def test_async_session_runs_sync_repo_code():
+    async def scenario():
+        engine = create_async_db_engine(settings.TEST_DATABASE_URL, profile())
+        try:
+            async with engine.connect() as conn:
+                outer = await conn.begin()
+                # commits inside the scenario only release savepoints
+                session = AsyncSession(
+                    bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint"
+                )
+                user = await session.run_sync(create_test_user, "async@test.com")
+                found = await session.run_sync(UserRepository().get_user_by_id, user.id)
+                stored = (await session.exec(select(User.created_at).where(User.id == user.id))).one()
+                timeout = (await session.exec(text("show statement_timeout"))).scalar()
+                read_back = [
+                    (await session.exec(text("SELECT CAST(:value AS timestamp)"), params={"value": value})).scalar()
+                    for value in BOUND_TIMESTAMPS
+                ]
+                raw_id = (await session.exec(
+                    text("SELECT CAST(:id AS uuid)"), params={"id": str(user.id)}
+                )).scalar()
+                # the gap-filled series binds dates to timestamps and its step as text
+                periods = [row.period for row in await session.run_sync(
+                    TransactionRepo().get_rollup_series, "month", date(2024, 1, 1), date(2024, 3, 1), user.id
+                )]
+                await session.close()
+                await outer.rollback()
+                return (
+                    found.email, stored == user.created_at.replace(tzinfo=None), timeout, read_back,
+                    dumps(raw_id) == dumps(str(user.id)), periods,
+                )
+        finally:
+            await engine.dispose()
+
+    with create_engine(settings.TEST_DATABASE_URL).connect() as conn:
+        expected = [
+            conn.execute(text("SELECT CAST(:value AS timestamp)"), {"value": value}).scalar()
+            for value in BOUND_TIMESTAMPS
+        ]
+    # aware datetimes and dates are stored like the psycopg2 path stores them
+    assert expected == [datetime(2025, 2, 1, 4, 30), datetime(2024, 2, 29), datetime(2024, 2, 29, 8)]
+    # and asyncpg's own UUIDs still go out through orjson
+    assert asyncio.run(scenario()) == (
+        "async@test.com", True, "1500ms", expected, True, [datetime(2024, 1, 1), datetime(2024, 2, 1)]
+    )
+
+
+def test_metrics_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    hits = registry.counter("cache_hits_total", "Cache hits", labels=("backend",))
+    hits.inc(backend="memory")
+    hits.inc(2, backend="memory")
+    registry.gauge("in_use", "In use", labels=("engine",)).track(lambda: 4, engine="sync")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    latency.observe(0.5)
+
+    body = registry.render()
+    assert 'cache_hits_total{backend="memory"} 3' in body
+    assert 'in_use{engine="sync"} 4' in body
+    assert 'latency_seconds_bucket{le="0.1"} 0' in body
+    assert 'latency_seconds_bucket{le="1.0"} 1' in body
+    assert "latency_seconds_count 1" in body
+    # the same name registers once
+    assert registry.counter("cache_hits_total", "Cache hits", labels=("backend",)) is hits
+
+
+def test_metrics_exposition_format():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors by path\\n", labels=("path", "engine"))
+    errors.inc(path='C:\\tmp\n"x"', engine="sync")
+    registry.gauge("ratio", "A ratio").set(float("nan"))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.5, 0.1))
+    for value in (0.05, 0.3, 2):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP errors_total Errors by path\\\\n",
+        "# TYPE errors_total counter",
+        'errors_total{path="C:\\\\tmp\\n\\"x\\"",engine="sync"} 1',
+        "# HELP ratio A ratio",
+        "# TYPE ratio gauge",
+        "ratio NaN",
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="0.5"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 2.35",
+        "latency_seconds_count 3",
+    ]
+
+
+def test_metrics_endpoint(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    wrong = {"Authorization": "Bearer guess"}
+    assert client.get("/metrics", headers=wrong).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "db_pool_checkout_wait_seconds_count" in response.text
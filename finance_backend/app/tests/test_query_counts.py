@@ -0,0 +1,69 @@
+"""Statements each write endpoint sends to the database.
+
+Counts are exact on purpose: a repo method that starts reading back what it
+just wrote shows up here as a failing test. Every write ends with the UPDATE
+that bumps the user's data version.
+"""
+from app.tests.conftest import api, count_queries
+
+
+def call(api, method, url, expected_status, **kwargs):
+    with count_queries() as statements:
+        response = api.request(method, url, **kwargs)
+    assert response.status_code == expected_status, response.text
+    return response.json() if response.content else None, len(statements)
+
+
+def new_account(api, name):
+    body, _ = call(api, "POST", "v1/accounts/", 201, json={"name": name, "type": "BANK", "currency": "USD"})
+    return body["id"]
+
+
+def test_account_writes(api):
+    # INSERT ... RETURNING, nothing read back
+    body, queries = call(api, "POST", "v1/accounts/", 201, json={"name": "Bank", "type": "BANK", "currency": "USD"})
+    assert queries == 2
+
+    # load, UPDATE ... RETURNING updated_at
+    _, queries = call(api, "PATCH", f"v1/accounts/{body['id']}", 200, json={"name": "Main"})
+    assert queries == 3
+
+
+def test_category_writes(api):
+    body, queries = call(api, "POST", "v1/categories/", 201, json={"name": "Food", "type": "EXPENSE"})
+    assert queries == 2
+
+    _, queries = call(api, "PATCH", f"v1/categories/{body['id']}", 200, json={"name": "Groceries"})
+    assert queries == 3
+
+
+def test_transaction_writes(api):
+    account_id = new_account(api, "Bank")
+    payload = {"account_id": account_id, "amount": "100", "currency": "USD", "type": "INCOME"}
+
+    # balance, insert, rollup
+    body, queries = call(api, "POST", "v1/transactions/", 201, json=payload)
+    assert queries == 4
+
+    # lock the row, balance, rollup out, update, rollup in
+    _, queries = call(api, "PATCH", f"v1/transactions/{body['id']}", 200, json={"amount": "90"})
+    assert queries == 6
+
+    # lock the row, balance, rollup, delete
+    _, queries = call(api, "DELETE", f"v1/transactions/{body['id']}", 204)
+    assert queries == 5
+
+
+def test_transfer_writes(api):
+    from_id, to_id = new_account(api, "Bank"), new_account(api, "Cash")
+    call(api, "POST", "v1/transactions/", 201, json={"account_id": from_id, "amount": "50", "currency": "USD", "type": "INCOME"})
+
+    body, queries = call(
+        api, "POST", "v1/transactions/transfer", 201,
+        json={"account_id": from_id, "to_account_id": to_id, "amount": "20", "currency": "USD", "type": "TRANSFER"},
+    )
+    assert queries == 2
+
+    group_id = body["outgoing_transaction"]["transfer_group_id"]
+    _, queries = call(api, "DELETE", f"v1/transactions/transfer/{group_id}", 204)
+    assert queries == 2
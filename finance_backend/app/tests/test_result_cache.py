@@ -0,0 +1,135 @@
+import asyncio
+import pickle
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import fakeredis
+import pytest
+
+from app.core.cache import (
+    MISSING,
+    InMemoryResultCache,
+    RedisResultCache,
+    ResultCache,
+    build_result_cache,
+    cache_evictions,
+    cache_hits,
+    cache_misses,
+)
+from app.tests.conftest import api, count_queries
+
+
+def compute(value, calls):
+    async def _compute():
+        calls.append(value)
+        return value
+    return _compute
+
+
+def test_get_or_compute_counts_hits_and_misses():
+    cache = InMemoryResultCache(max_size=10)
+    calls = []
+    hits, misses = cache_hits.value(endpoint="t"), cache_misses.value(endpoint="t")
+
+    async def scenario():
+        first = await cache.get_or_compute("t", "k", compute({"a": 1}, calls))
+        second = await cache.get_or_compute("t", "k", compute({"a": 2}, calls))
+        return first, second
+
+    assert asyncio.run(scenario()) == ({"a": 1}, {"a": 1})
+    assert calls == [{"a": 1}]
+    assert cache_hits.value(endpoint="t") == hits + 1
+    assert cache_misses.value(endpoint="t") == misses + 1
+
+
+def test_lru_evicts_least_recently_used():
+    cache = InMemoryResultCache(max_size=2)
+    evictions = cache_evictions.value(backend="memory")
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # b is now the oldest
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache_evictions.value(backend="memory") == evictions + 1
+
+
+def test_null_backend_always_computes():
+    cache = build_result_cache(type("S", (), {"RESULT_CACHE_BACKEND": "none"})())
+    assert type(cache) is ResultCache
+    calls = []
+
+    async def scenario():
+        for _ in range(2):
+            await cache.get_or_compute("t", "k", compute(1, calls))
+
+    asyncio.run(scenario())
+    assert calls == [1, 1]
+
+
+@pytest.fixture
+def redis_cache():
+    cache = RedisResultCache("redis://localhost:6379/0", ttl=60)
+    server = fakeredis.FakeServer()
+    cache.client = fakeredis.FakeRedis(server=server)
+    return cache, server
+
+
+def test_redis_round_trips_decimals_and_dates(redis_cache):
+    cache, _ = redis_cache
+    value = (
+        Decimal("10.5000"),
+        [
+            {
+                "date": date(2024, 1, 1),
+                "at": datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+                "income": Decimal("-0.0100"),
+                "name": "Food",
+                "transaction_count": 3,
+            }
+        ],
+    )
+    cache.set("k", value)
+
+    total, rows = cache.get("k")
+    assert total == Decimal("10.5000") and str(total) == "10.5000"
+    assert rows == value[1]
+    assert type(rows[0]["date"]) is date
+    assert rows[0]["at"].tzinfo == timezone.utc
+    assert cache.client.ttl("result:k") == 60
+
+
+def test_redis_never_unpickles(redis_cache):
+    cache, _ = redis_cache
+    cache.client.set("result:k", pickle.dumps({"a": 1}))
+    assert cache.get("k") is MISSING
+
+
+def test_redis_errors_fall_back_to_computing(redis_cache):
+    cache, server = redis_cache
+    server.connected = False
+    calls = []
+
+    async def scenario():
+        return await cache.get_or_compute("t", "k", compute({"a": 1}, calls))
+
+    assert asyncio.run(scenario()) == {"a": 1}
+    assert calls == [{"a": 1}]
+    cache.clear()
+
+
+def test_results_are_reused_until_a_write(api):
+    api.post("v1/accounts/", json={"name": "Bank", "type": "BANK", "currency": "USD"})
+    assert api.get("v1/transactions/balances").json()["total_balance"] == "0.0000"
+
+    with count_queries() as statements:
+        assert api.get("v1/transactions/balances").status_code == 200
+    assert not any("accounts" in statement for statement in statements)
+
+    account_id = api.get("v1/accounts/").json()["accounts"][0]["id"]
+    api.post(
+        "v1/transactions/",
+        json={"account_id": account_id, "amount": "25", "currency": "USD", "type": "INCOME"},
+    )
+    assert api.get("v1/transactions/balances").json()["total_balance"] == "25.0000"
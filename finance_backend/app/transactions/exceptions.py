@@ -14,4 +14,13 @@ class CanNotUpdateTransaction(TransactionError):
     pass
 
 class InvalidTransferTransaction(TransactionError):
-    pass
\ No newline at end of file
+    pass
+
+class InvalidCursor(TransactionError):
+    pass
+
+class DuplicateTransaction(TransactionError):
+    pass
+
+class InvalidImportFile(TransactionError):
+    pass
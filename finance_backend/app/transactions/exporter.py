@@ -0,0 +1,56 @@
+import csv
+import io
+from enum import Enum
+from typing import Iterable, Sequence
+
+from app.core.responses import dumps, rows_as_dicts
+
+# rows fetched per round trip of the server-side cursor, and encoded per chunk
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# same fields, in the same order, as TransactionOut
+EXPORT_FIELDS = (
+    "id",
+    "account_id",
+    "category_id",
+    "amount",
+    "merchant",
+    "currency",
+    "type",
+    "is_outgoing",
+    "description",
+    "transfer_group_id",
+    "occurred_at",
+    "created_at",
+)
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "isoformat"):
+        # same text as the NDJSON export, not str()'s space separated form
+        return value.isoformat()
+    return value
+
+
+def csv_header(fields: Sequence[str]) -> bytes:
+    out = io.StringIO()
+    csv.writer(out).writerow(fields)
+    return out.getvalue().encode()
+
+
+def encode_csv(rows: Iterable, fields: Sequence[str]) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for row in rows_as_dicts(rows, fields):
+        writer.writerow([_csv_cell(row[field]) for field in fields])
+    return out.getvalue().encode()
+
+
+def encode_ndjson(rows: Iterable, fields: Sequence[str]) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in rows_as_dicts(rows, fields))
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+from decimal import Decimal
+from typing import IO, Dict, Iterator, Optional
+
+from pydantic import ValidationError
+
+from app.models.common import now_utc
+from app.transactions.exceptions import InvalidImportFile
+from app.transactions.schemas import TransactionCreate
+
+# column order of the staging table the COPY stream feeds
+STAGING_COLUMNS = (
+    "line_no",
+    "account_id",
+    "category_id",
+    "amount",
+    "merchant",
+    "currency",
+    "type",
+    "description",
+    "occurred_at",
+    "message_id",
+)
+
+# limits of the staging columns: one value past them would fail the whole COPY
+MAX_INTEGER = 2**31 - 1
+MAX_AMOUNT = Decimal(10) ** 14  # numeric(18, 4)
+MAX_CURRENCY = 3
+MAX_MESSAGE_ID = 255
+
+
+def iter_records(stream: IO[bytes], format: str) -> Iterator[Optional[dict]]:
+    """Yield one raw record per input line; None for lines that are not parseable.
+
+    Raises InvalidImportFile when the file as a whole can't be read: not
+    UTF-8, or CSV the reader gives up on.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    try:
+        if format == "csv":
+            for record in csv.DictReader(text):
+                # empty csv cells mean "not given", not empty strings
+                yield {k: v for k, v in record.items() if v not in ("", None)}
+            return
+
+        for line in text:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield None
+                continue
+            yield record if isinstance(record, dict) else None
+    except UnicodeDecodeError:
+        raise InvalidImportFile("the file is not valid UTF-8")
+    except csv.Error as e:
+        raise InvalidImportFile(f"unreadable csv: {e}")
+
+
+def fits_staging(t: TransactionCreate) -> bool:
+    """Whether the staging table's column types can hold `t`."""
+    ids = [t.account_id] + ([t.category_id] if t.category_id is not None else [])
+    texts = [t.currency, t.message_id, t.merchant, t.description]
+    return (
+        all(-MAX_INTEGER - 1 <= i <= MAX_INTEGER for i in ids)
+        and abs(t.amount) < MAX_AMOUNT
+        and len(t.currency) <= MAX_CURRENCY
+        and len(t.message_id) <= MAX_MESSAGE_ID
+        # Postgres text can't hold NUL
+        and not any(value and "\x00" in value for value in texts)
+    )
+
+
+def iter_staging_rows(records: Iterator[Optional[dict]], skipped_reasons: Dict[str, int]):
+    """Validate records one at a time and yield staging rows in STAGING_COLUMNS order.
+
+    Rows rejected here are counted into skipped_reasons, checks that need the
+    database (accounts, duplicates, balances) happen in the merge step.
+    """
+    now = now_utc()
+    for line_no, record in enumerate(records, start=1):
+        if record is None:
+            skipped_reasons["malformed"] += 1
+            continue
+        try:
+            t = TransactionCreate.model_validate(record)
+        except ValidationError:
+            skipped_reasons["malformed"] += 1
+            continue
+        if not t.message_id:
+            skipped_reasons["no_message_id"] += 1
+            continue
+        if not fits_staging(t):
+            skipped_reasons["malformed"] += 1
+            continue
+        if t.amount <= 0:
+            skipped_reasons["invalid_amount"] += 1
+            continue
+        yield (
+            line_no,
+            t.account_id,
+            t.category_id,
+            t.amount,
+            t.merchant,
+            t.currency,
+            t.type.value,
+            t.description,
+            (t.occurred_at or now).isoformat(),
+            t.message_id,
+        )
+
+
+class CopyStream:
+    """Read-only file object rendering rows as CSV on demand for COPY ... FROM STDIN.
+
+    Only the rows needed to fill the next read() are pulled from the iterator, so
+    memory stays flat no matter how many rows flow through.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pending = b""
+        # psycopg2 turns an exception out of read() into a cancelled COPY,
+        # the original is kept here for the caller
+        self.error: Optional[Exception] = None
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._pending) < size:
+            try:
+                row = next(self._rows, None)
+            except Exception as e:
+                self.error = e
+                raise
+            if row is None:
+                break
+            self._writer.writerow(row)
+            self._pending += self._buffer.getvalue().encode()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        if size < 0:
+            size = len(self._pending)
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
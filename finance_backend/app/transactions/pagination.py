@@ -0,0 +1,23 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+from app.transactions.exceptions import InvalidCursor
+
+
+# Keyset cursors point at the last (occurred_at, id) pair of a page. They are
+# opaque to the client: base64url of "<iso occurred_at>|<id>".
+def encode_cursor(occurred_at: datetime, id: int) -> str:
+    raw = f"{occurred_at.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        occurred_at, id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(occurred_at), int(id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor("invalid pagination cursor")
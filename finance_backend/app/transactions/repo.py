@@ -1,11 +1,36 @@
+import psycopg2
 from sqlmodel import Session, select
-from app.models.transaction import Transaction
-from sqlalchemy import func, case
-from typing import List, Tuple
+from app.models.transaction import Transaction, TransactionMessage
+from sqlalchemy import and_, func, case, tuple_, text, bindparam, cast, literal, null, Date, DateTime, Interval, Numeric, String, Row
+from sqlalchemy.dialects.postgresql import insert
+from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, date, timedelta
 
 from app.models.enums import TransactionType
+from app.models.rollup import TransactionDailyRollup
+from app.models.account import Account
+from app.models.category import Category
+from app.db.explain import estimated_row_count
+from app.transactions.exporter import EXPORT_BATCH_SIZE
+
+
+# the columns TransactionOut exposes; list endpoints read just these as plain
+# rows, skipping ORM instances and the identity map
+LIST_COLUMNS = (
+    Transaction.id,
+    Transaction.account_id,
+    Transaction.category_id,
+    Transaction.amount,
+    Transaction.merchant,
+    Transaction.currency,
+    Transaction.type,
+    Transaction.is_outgoing,
+    Transaction.description,
+    Transaction.transfer_group_id,
+    Transaction.occurred_at,
+    Transaction.created_at,
+)
 
 
 class TransactionRepo:
@@ -20,7 +45,9 @@ class TransactionRepo:
         type,
         start,
         end,
-    ) -> Tuple[List[Transaction], int]:
+        cursor=None,
+        count="exact",
+    ) -> Tuple[List[Row], Optional[int]]:
         conditions = [Transaction.user_id == user_id]
         if account_id:
             conditions.append(Transaction.account_id == account_id)
@@ -35,19 +62,37 @@ class TransactionRepo:
         elif end:
             conditions.append(Transaction.occurred_at <= end)
 
-        totalstmt = select(func.count()).select_from(Transaction).where(*conditions)
-        total = session.exec(totalstmt).one()
+        def page(stmt):
+            stmt = stmt.where(*conditions)
+            if cursor:
+                # keyset mode: seek past the cursor instead of scanning `offset` rows
+                stmt = stmt.where(self._after_cursor(cursor))
+            else:
+                stmt = stmt.offset(offset)
+            return stmt.order_by(*self._newest_first()).limit(limit)
 
-        stmt = (
-            select(Transaction)
-            .where(*conditions)
-            .limit(limit)
-            .offset(offset)
-            .order_by(Transaction.occurred_at.desc())
-        )
+        # an exact total for a non-cursor page rides along with the rows as
+        # count(*) over (), saving the separate COUNT round-trip. With a cursor the
+        # window would only count the rows after it, so that case counts apart.
+        if count == "exact" and not cursor:
+            rows = session.exec(
+                page(select(*LIST_COLUMNS, func.count().over().label("total")))
+            ).all()
+            if rows:
+                return rows, rows[0].total
+            if not offset:
+                return [], 0
+            # paged past the end, no row is left to carry the window count
+            return [], self._count(session, conditions)
 
-        transactions = session.exec(stmt).all()
-        return transactions, total
+        transactions = session.exec(page(select(*LIST_COLUMNS))).all()
+        if count == "none":
+            return transactions, None
+        if count == "estimated":
+            return transactions, estimated_row_count(
+                session, select(Transaction.id).where(*conditions)
+            )
+        return transactions, self._count(session, conditions)
 
     def list_user_transactions_for_report(
         self,
@@ -60,8 +105,31 @@ class TransactionRepo:
         page,
         per_page,
         user_id,
-    ) -> List[Transaction]:
-        stmt = select(Transaction).where(Transaction.user_id == user_id)
+        cursor=None,
+    ) -> List[Row]:
+        stmt = self._report_query(
+            account_id, category_id, type, date_from, date_to, user_id
+        )
+        if cursor:
+            stmt = stmt.where(self._after_cursor(cursor))
+        else:
+            stmt = stmt.offset((page - 1) * per_page)
+        stmt = stmt.limit(per_page)
+
+        return session.exec(stmt).all()
+
+    def export_query(self, account_id, category_id, type, date_from, date_to, user_id):
+        """Every row the report filters match, newest first, for streaming.
+
+        Walks ix_transactions_user_occurred_at_id in order, so rows come out
+        without a sort and the first batch is ready right away.
+        """
+        return self._report_query(
+            account_id, category_id, type, date_from, date_to, user_id
+        ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    def _report_query(self, account_id, category_id, type, date_from, date_to, user_id):
+        stmt = select(*LIST_COLUMNS).where(Transaction.user_id == user_id)
         if date_from:
             stmt = stmt.where(Transaction.occurred_at >= date_from)
         if date_to:
@@ -72,21 +140,37 @@ class TransactionRepo:
             stmt = stmt.where(Transaction.account_id == account_id)
         if type:
             stmt = stmt.where(Transaction.type == type)
+        return stmt.order_by(*self._newest_first())
 
-        stmt = (
-            stmt.order_by(Transaction.occurred_at.desc())
-            .offset((page - 1) * per_page)
-            .limit(per_page)
-        )
+    # helpers
+    def _count(self, session: Session, conditions) -> int:
+        return session.exec(
+            select(func.count()).select_from(Transaction).where(*conditions)
+        ).one()
 
-        return session.exec(stmt).all()
+    def _newest_first(self):
+        # id breaks ties between rows sharing an occurred_at so pages are stable,
+        # matches ix_transactions_user_occurred_at_id
+        return Transaction.occurred_at.desc(), Transaction.id.desc()
 
-    def get_transaction_for_user(self, session: Session, id, user_id) -> Transaction:
-        return session.exec(
-            select(Transaction).where(
-                Transaction.id == id, Transaction.user_id == user_id
-            )
-        ).first()
+    def _after_cursor(self, cursor: Tuple[datetime, int]):
+        occurred_at, id = cursor
+        # the plain bound is implied by the row comparison, but only it lets the
+        # planner skip the months after the cursor
+        return and_(
+            Transaction.occurred_at <= occurred_at,
+            tuple_(Transaction.occurred_at, Transaction.id) < tuple_(occurred_at, id),
+        )
+
+    def get_transaction_for_user(
+        self, session: Session, id, user_id, for_update: bool = False
+    ) -> Transaction:
+        stmt = select(Transaction).where(
+            Transaction.id == id, Transaction.user_id == user_id
+        )
+        if for_update:
+            stmt = stmt.with_for_update()
+        return session.exec(stmt).first()
 
     def get_transfer_transactions(
         self, session: Session, transfer_group_id, user_id
@@ -102,118 +186,629 @@ class TransactionRepo:
         self, session: Session, incoming_mids, user_id
     ) -> List[str]:
         return session.exec(
-            select(Transaction.message_id).where(
-                Transaction.user_id == user_id,
-                Transaction.message_id.in_(list(incoming_mids)),
+            select(TransactionMessage.message_id).where(
+                TransactionMessage.user_id == user_id,
+                TransactionMessage.message_id.in_(list(incoming_mids)),
             )
         ).all()
 
+    def claim_message_ids(self, session: Session, user_id, message_ids) -> List[str]:
+        """Record the message ids as taken, returns the ones that weren't yet.
+
+        A message id claimed by a concurrent, uncommitted writer blocks here
+        until that writer finishes, then counts as taken if it committed.
+        """
+        if not message_ids:
+            return []
+        stmt = (
+            insert(TransactionMessage)
+            .values([{"user_id": user_id, "message_id": mid} for mid in message_ids])
+            .on_conflict_do_nothing(constraint="uniq_transactions_user_message")
+            .returning(TransactionMessage.message_id)
+        )
+        return session.exec(stmt).scalars().all()
+
     def save_transaction(
         self, session: Session, transaction: Transaction
     ) -> Transaction:
         session.add(transaction)
         session.flush()
-        session.refresh(transaction)
 
         return transaction
 
-    def bulk_insert(self, session: Session, transactions: List[Transaction]):
-        session.add_all(transactions)
+    def insert_ignoring_duplicates(self, session: Session, rows: List[dict]) -> List[Row]:
+        # claim the chunk's message ids, then one multi-row INSERT of the rows
+        # whose id was still free; the others are missing from the RETURNING set.
+        # Rows are all one user's, like every bulk write.
+        if not rows:
+            return []
+        claimed = set(
+            self.claim_message_ids(
+                session, rows[0]["user_id"], [row["message_id"] for row in rows]
+            )
+        )
+        rows = [row for row in rows if row["message_id"] in claimed]
+        if not rows:
+            return []
+        stmt = (
+            insert(Transaction)
+            .values(rows)
+            .returning(
+                Transaction.id, Transaction.account_id, Transaction.type, Transaction.amount
+            )
+        )
+        return session.exec(stmt).all()
+
+    # COPY based import: rows are streamed into a per-transaction temp table and
+    # merged into transactions with a handful of set-based statements
+    def copy_into_import_staging(self, session: Session, stream) -> int:
+        session.exec(
+            text(
+                """
+                CREATE TEMP TABLE transactions_import_staging (
+                    line_no bigint NOT NULL,
+                    account_id integer NOT NULL,
+                    category_id integer,
+                    amount numeric(18, 4) NOT NULL,
+                    merchant varchar,
+                    currency varchar(3) NOT NULL,
+                    type transactiontype NOT NULL,
+                    description varchar,
+                    occurred_at timestamptz NOT NULL,
+                    message_id varchar(255) NOT NULL
+                ) ON COMMIT DROP
+                """
+            )
+        )
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                "COPY transactions_import_staging FROM STDIN WITH (FORMAT csv)", stream
+            )
+            return cursor.rowcount
+        except psycopg2.Error:
+            if getattr(stream, "error", None):
+                raise stream.error
+            raise
+        finally:
+            cursor.close()
+
+    def merge_import_staging(self, session: Session, user_id) -> Dict[str, int]:
+        params = {"user_id": user_id}
+
+        def discard(sql) -> int:
+            return session.exec(text(sql), params=params).rowcount
+
+        skipped = {
+            # first occurrence of a message_id in the file wins
+            "duplicate": discard(
+                """
+                DELETE FROM transactions_import_staging s
+                USING transactions_import_staging d
+                WHERE s.message_id = d.message_id AND s.line_no > d.line_no
+                """
+            ),
+            "invalid_account": discard(
+                """
+                DELETE FROM transactions_import_staging s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM accounts a
+                    WHERE a.id = s.account_id AND a.user_id = :user_id
+                )
+                """
+            ),
+            "invalid_category": discard(
+                """
+                DELETE FROM transactions_import_staging s
+                WHERE s.category_id IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM categories c
+                    WHERE c.id = s.category_id AND c.user_id = :user_id
+                )
+                """
+            ),
+        }
+        skipped["duplicate"] += discard(
+            """
+            DELETE FROM transactions_import_staging s
+            USING transaction_messages m
+            WHERE m.user_id = :user_id AND m.message_id = s.message_id
+            """
+        )
+        # balances are checked per account on the net effect of the whole file,
+        # an account that would end up negative has none of its rows imported
+        skipped["insufficient_funds"] = discard(
+            """
+            DELETE FROM transactions_import_staging s
+            USING (
+                SELECT s.account_id
+                FROM transactions_import_staging s
+                JOIN accounts a ON a.id = s.account_id
+                GROUP BY s.account_id, a.balance
+                HAVING a.balance + sum(
+                    CASE WHEN s.type = 'EXPENSE' THEN -s.amount ELSE s.amount END
+                ) < 0
+            ) overdrawn
+            WHERE s.account_id = overdrawn.account_id
+            """
+        )
+
+        # the balance update is conditional like every other balance write: an
+        # account overdrawn by a concurrent writer since the check above is left
+        # alone and reported back, the caller then rolls the import back
+        inserted, overdrawn = session.exec(
+            text(
+                """
+                WITH claimed AS (
+                    INSERT INTO transaction_messages (user_id, message_id)
+                    SELECT :user_id, message_id FROM transactions_import_staging
+                    ON CONFLICT ON CONSTRAINT uniq_transactions_user_message DO NOTHING
+                    RETURNING message_id
+                ),
+                inserted AS (
+                    INSERT INTO transactions (
+                        user_id, account_id, category_id, amount, merchant, currency, type,
+                        description, occurred_at, created_at, message_id
+                    )
+                    SELECT :user_id, s.account_id, s.category_id, s.amount, s.merchant, s.currency,
+                           s.type, s.description, s.occurred_at, now(), s.message_id
+                    FROM transactions_import_staging s
+                    JOIN claimed c ON c.message_id = s.message_id
+                    ORDER BY s.line_no
+                    RETURNING account_id, category_id, type, amount, occurred_at
+                ),
+                -- accounts locked in id order, like the transfer and bulk paths
+                locked AS (
+                    SELECT id FROM accounts
+                    WHERE id IN (SELECT account_id FROM inserted)
+                    ORDER BY id
+                    FOR UPDATE
+                ),
+                balances AS (
+                    UPDATE accounts a
+                    SET balance = a.balance + d.delta
+                    FROM (
+                        SELECT account_id,
+                               sum(CASE WHEN type = 'EXPENSE' THEN -amount ELSE amount END) AS delta
+                        FROM inserted
+                        GROUP BY account_id
+                    ) d
+                    JOIN locked l ON l.id = d.account_id
+                    WHERE a.id = d.account_id AND a.balance + d.delta >= 0
+                    RETURNING a.id
+                ),
+                rollups AS (
+                    INSERT INTO transaction_daily_rollups (
+                        user_id, day, account_id, category_id, type, total, count
+                    )
+                    SELECT :user_id, i.occurred_at::date, i.account_id, i.category_id,
+                           i.type, sum(i.amount), count(*)
+                    FROM inserted i
+                    -- joining `balances` makes the account row locks come first,
+                    -- the order every other writer takes them in
+                    JOIN balances b ON b.id = i.account_id
+                    GROUP BY i.occurred_at::date, i.account_id, i.category_id, i.type
+                    ON CONFLICT ON CONSTRAINT uq_transaction_daily_rollups_key
+                    DO UPDATE SET
+                        total = transaction_daily_rollups.total + excluded.total,
+                        count = transaction_daily_rollups.count + excluded.count
+                )
+                SELECT (SELECT count(*) FROM inserted),
+                       (SELECT count(DISTINCT account_id) FROM inserted)
+                       - (SELECT count(*) FROM balances)
+                """
+            ),
+            params=params,
+        ).one()
+        staged = session.exec(
+            text("SELECT count(*) FROM transactions_import_staging")
+        ).scalar_one()
+        # rows that raced with a concurrent insert of the same message_id
+        skipped["duplicate"] += staged - inserted
+        return {"inserted": inserted, "overdrawn": overdrawn, **skipped}
 
     def delete_transaction(self, session: Session, transaction: Transaction):
         session.delete(transaction)
         session.flush()
 
-    def get_transaction_summary_for_type(
-        self, session: Session, type, start_date, end_date, user_id
-    ) -> Tuple[Decimal, int]:
+    def create_transfer(
+        self,
+        session: Session,
+        user_id,
+        transfer_group_id,
+        from_account_id: int,
+        to_account_id: int,
+        amount: Decimal,
+        currency: str,
+        description: Optional[str],
+        occurred_at: datetime,
+        created_at: datetime,
+    ) -> List[Transaction]:
+        """Move `amount` and write both legs and their rollups in one statement.
+
+        Both accounts are locked in id order, so opposite transfers queue up
+        instead of deadlocking. Returns [outgoing, incoming], or no rows when an
+        account isn't the user's or the sender is short of funds; nothing is
+        written then.
+        """
+        stmt = text(
+            """
+            WITH locked AS (
+                SELECT id, balance FROM accounts
+                WHERE id IN (:from_account_id, :to_account_id) AND user_id = :user_id
+                ORDER BY id
+                FOR UPDATE
+            ),
+            moved AS (
+                UPDATE accounts a
+                SET balance = a.balance + CASE
+                    WHEN a.id = :from_account_id THEN -:amount ELSE :amount
+                END
+                FROM locked l
+                WHERE a.id = l.id
+                  AND (SELECT count(*) FROM locked) = 2
+                  AND (SELECT balance FROM locked WHERE id = :from_account_id) >= :amount
+                RETURNING a.id
+            ),
+            legs AS (
+                INSERT INTO transactions (
+                    user_id, account_id, amount, currency, type, description,
+                    transfer_group_id, is_outgoing, occurred_at, created_at
+                )
+                SELECT :user_id, m.id, :amount, :currency, 'TRANSFER', :description,
+                       :transfer_group_id, m.id = :from_account_id, :occurred_at, :created_at
+                FROM moved m
+                RETURNING *
+            ),
+            rollups AS (
+                INSERT INTO transaction_daily_rollups (
+                    user_id, day, account_id, category_id, type, total, count
+                )
+                SELECT user_id, occurred_at::date, account_id, category_id, type, amount, 1
+                FROM legs
+                ON CONFLICT ON CONSTRAINT uq_transaction_daily_rollups_key
+                DO UPDATE SET
+                    total = transaction_daily_rollups.total + excluded.total,
+                    count = transaction_daily_rollups.count + excluded.count
+            )
+            SELECT * FROM legs ORDER BY is_outgoing DESC
+            """
+        ).bindparams(
+            # typed, asyncpg can't infer a type for `-$1` or `CASE ... ELSE $1`
+            bindparam("amount", type_=Numeric)
+        )
+        return session.exec(
+            select(Transaction).from_statement(stmt),
+            params={
+                "user_id": user_id,
+                "transfer_group_id": transfer_group_id,
+                "from_account_id": from_account_id,
+                "to_account_id": to_account_id,
+                "amount": amount,
+                "currency": currency,
+                "description": description,
+                "occurred_at": occurred_at,
+                "created_at": created_at,
+            },
+        ).scalars().all()
+
+    def delete_transfer(self, session: Session, transfer_group_id, user_id) -> Tuple[int, int]:
+        """Revert and delete both legs of a transfer, rollups included, in one
+        statement. Locks the legs, then their accounts in id order.
+
+        Returns (legs found, legs deleted); nothing is deleted unless exactly two
+        legs exist and the receiving account still holds the amount. Balances
+        move by the net of the legs per account, so a legacy transfer with both
+        legs on one account deletes without changing its balance.
+        """
+        return tuple(
+            session.exec(
+                text(
+                    """
+                    WITH legs AS (
+                        SELECT id, account_id, amount, is_outgoing FROM transactions
+                        WHERE transfer_group_id = :transfer_group_id
+                          AND user_id = :user_id
+                        FOR UPDATE
+                    ),
+                    locked AS (
+                        SELECT a.id, a.balance
+                        FROM accounts a
+                        JOIN legs l ON l.account_id = a.id
+                        ORDER BY a.id
+                        FOR UPDATE OF a
+                    ),
+                    deltas AS (
+                        SELECT account_id,
+                               sum(CASE WHEN is_outgoing THEN amount ELSE -amount END) AS delta
+                        FROM legs
+                        GROUP BY account_id
+                    ),
+                    moved AS (
+                        UPDATE accounts a
+                        SET balance = a.balance + d.delta
+                        FROM deltas d
+                        WHERE a.id = d.account_id
+                          AND (SELECT count(*) FROM legs) = 2
+                          AND NOT EXISTS (
+                              SELECT 1 FROM locked k
+                              JOIN deltas r ON r.account_id = k.id
+                              WHERE r.delta < 0 AND k.balance + r.delta < 0
+                          )
+                        RETURNING a.id
+                    ),
+                    deleted AS (
+                        DELETE FROM transactions t
+                        USING legs l
+                        WHERE t.id = l.id
+                          AND EXISTS (SELECT 1 FROM moved)
+                          AND (SELECT count(*) FROM moved) = (SELECT count(*) FROM deltas)
+                        RETURNING t.user_id, t.occurred_at, t.account_id, t.category_id,
+                                  t.type, t.amount
+                    ),
+                    rollups AS (
+                        INSERT INTO transaction_daily_rollups (
+                            user_id, day, account_id, category_id, type, total, count
+                        )
+                        -- grouped: legs on one account share a rollup row
+                        SELECT user_id, occurred_at::date, account_id, category_id, type,
+                               -sum(amount), -count(*)
+                        FROM deleted
+                        GROUP BY user_id, occurred_at::date, account_id, category_id, type
+                        ON CONFLICT ON CONSTRAINT uq_transaction_daily_rollups_key
+                        DO UPDATE SET
+                            total = transaction_daily_rollups.total + excluded.total,
+                            count = transaction_daily_rollups.count + excluded.count
+                    )
+                    SELECT (SELECT count(*) FROM legs), (SELECT count(*) FROM deleted)
+                    """
+                ),
+                params={"transfer_group_id": transfer_group_id, "user_id": user_id},
+            ).one()
+        )
+
+    # daily rollups
+    def rollup_transactions(self, session: Session, ids, sign: int = 1):
+        """Add (sign=1) or remove (sign=-1) the given stored transactions from the
+        daily rollups. Reads them back from the table so day bucketing always
+        matches what Postgres stored."""
+        if not ids:
+            return
+        day = cast(Transaction.occurred_at, Date)
+        keys = (
+            Transaction.user_id,
+            day,
+            Transaction.account_id,
+            Transaction.category_id,
+            Transaction.type,
+        )
+        source = (
+            select(*keys, func.sum(Transaction.amount) * sign, func.count() * sign)
+            .where(Transaction.id.in_(list(ids)))
+            .group_by(*keys)
+        )
+        stmt = insert(TransactionDailyRollup).from_select(
+            ["user_id", "day", "account_id", "category_id", "type", "total", "count"],
+            source,
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_transaction_daily_rollups_key",
+            set_={
+                "total": TransactionDailyRollup.total + stmt.excluded.total,
+                "count": TransactionDailyRollup.count + stmt.excluded.count,
+            },
+        )
+        session.exec(stmt)
+
+    def get_rollup_summary(
+        self, session: Session, start_day: date, end_day: date, user_id
+    ) -> Tuple[Decimal, Decimal, int, int]:
+        """Income, expense and both counts in one pass over the range."""
         return session.exec(
-            select(
-                func.coalesce(func.sum(Transaction.amount), 0),
-                func.count(Transaction.id),
+            select(*self._summary_columns()).where(
+                TransactionDailyRollup.user_id == user_id,
+                *self._rollup_days(start_day, end_day),
             )
-            .where(Transaction.user_id == user_id)
-            .where(Transaction.type == type)
-            .where(Transaction.occurred_at.between(start_date, end_date))
         ).one()
 
-    def get_time_series_rows(
-        self, session: Session, granularity, date_from, date_to, user_id
-    ) -> List[Tuple[datetime, Decimal, Decimal]]:
-        trunc = {
-            "day": func.date(Transaction.occurred_at),
-            "week": func.date_trunc("week", Transaction.occurred_at),
-            "month": func.date_trunc("month", Transaction.occurred_at),
-        }[granularity]
-
+    def get_rollup_monthly_summaries(
+        self, session: Session, start_day: date, end_day: date, user_id
+    ) -> List[Tuple[datetime, Decimal, Decimal, int, int]]:
+        """Per month summaries for every month in [start_day, end_day) that has
+        activity, one statement for the whole range."""
+        month = func.date_trunc("month", TransactionDailyRollup.day)
         stmt = (
+            select(month.label("month"), *self._summary_columns())
+            .where(
+                TransactionDailyRollup.user_id == user_id,
+                *self._rollup_days(start_day, end_day),
+            )
+            .group_by("month")
+            .order_by("month")
+        )
+        return session.exec(stmt).all()
+
+    def _summary_columns(self):
+        # conditional aggregation: every total comes out of the same scan
+        is_income = TransactionDailyRollup.type == TransactionType.INCOME
+        is_expense = TransactionDailyRollup.type == TransactionType.EXPENSE
+        total = func.sum(TransactionDailyRollup.total)
+        count = func.sum(TransactionDailyRollup.count)
+        return (
+            func.coalesce(total.filter(is_income), 0).label("income"),
+            func.coalesce(total.filter(is_expense), 0).label("expense"),
+            func.coalesce(count.filter(is_income), 0).label("income_count"),
+            func.coalesce(count.filter(is_expense), 0).label("expense_count"),
+        )
+
+    def get_rollup_series(
+        self,
+        session: Session,
+        granularity: str,
+        start_day: date,
+        end_day: date,
+        user_id,
+        by: Optional[str] = None,
+        closing_balance: bool = False,
+    ) -> List[Row]:
+        """Every period from start_day up to end_day (exclusive), gaps included.
+
+        Rows are (period, key, name, income, expense), ordered by period then
+        key. A period without activity comes back once with NULL sums; with
+        `by` set there is one row per category or account active in the
+        period. `closing_balance` adds the user's total balance as of end_day
+        to every row, for running-balance series.
+        """
+        rollup = TransactionDailyRollup
+        # bound as text and cast by Postgres, asyncpg only takes a timedelta
+        # for an interval parameter and a month isn't one
+        step = cast(literal(f"1 {granularity}", String), Interval)
+        periods = select(
+            func.generate_series(
+                func.date_trunc(granularity, cast(start_day, DateTime)),
+                func.date_trunc(granularity, cast(end_day - timedelta(days=1), DateTime)),
+                step,
+            ).label("period")
+        ).cte("periods")
+
+        period = func.date_trunc(granularity, cast(rollup.day, DateTime))
+        key = {"category": rollup.category_id, "account": rollup.account_id}.get(by)
+        group_keys = (period,) if key is None else (period, key)
+        totals = (
             select(
-                trunc.label("period"),
+                period.label("period"),
+                (key if key is not None else null()).label("key"),
                 func.sum(
-                    case(
-                        (
-                            Transaction.type == TransactionType.INCOME,
-                            Transaction.amount,
-                        ),
-                        else_=0,
-                    )
+                    case((rollup.type == TransactionType.INCOME, rollup.total), else_=0)
                 ).label("income"),
                 func.sum(
-                    case(
-                        (
-                            Transaction.type == TransactionType.EXPENSE,
-                            Transaction.amount,
-                        ),
-                        else_=0,
-                    )
+                    case((rollup.type == TransactionType.EXPENSE, rollup.total), else_=0)
                 ).label("expense"),
             )
-            .where(
-                Transaction.user_id == user_id,
-                Transaction.occurred_at >= date_from,
-                Transaction.occurred_at <= date_to,
-            )
-            .group_by("period")
-            .order_by("period")
+            .where(rollup.user_id == user_id, *self._rollup_days(start_day, end_day))
+            .group_by(*group_keys)
+            .having(func.sum(rollup.count) > 0)
+            .cte("totals")
+        )
+
+        source = periods.outerjoin(totals, totals.c.period == periods.c.period)
+        if by == "category":
+            name = Category.name
+            source = source.outerjoin(Category, Category.id == totals.c.key)
+        elif by == "account":
+            name = func.coalesce(Account.name, "Unknown Account")
+            source = source.outerjoin(Account, Account.id == totals.c.key)
+        else:
+            name = null()
+        columns = [
+            periods.c.period,
+            totals.c.key,
+            name.label("name"),
+            totals.c.income,
+            totals.c.expense,
+        ]
+        if closing_balance:
+            columns.append(self._balance_as_of(end_day, user_id).label("closing"))
+
+        stmt = (
+            select(*columns)
+            .select_from(source)
+            .order_by(periods.c.period, totals.c.key.nulls_last())
         )
         return session.exec(stmt).all()
 
-    def get_grouped_transaction_totals(
+    def _balance_as_of(self, day: date, user_id):
+        # today's balances minus everything that landed on or after `day`;
+        # transfers move money between the user's own accounts and cancel out
+        rollup = TransactionDailyRollup
+        current = (
+            select(func.coalesce(func.sum(Account.balance), 0))
+            .where(Account.user_id == user_id)
+            .scalar_subquery()
+        )
+        since = (
+            select(
+                func.coalesce(
+                    func.sum(
+                        case(
+                            (rollup.type == TransactionType.INCOME, rollup.total),
+                            (rollup.type == TransactionType.EXPENSE, -rollup.total),
+                            else_=0,
+                        )
+                    ),
+                    0,
+                )
+            )
+            .where(rollup.user_id == user_id, rollup.day >= day)
+            .scalar_subquery()
+        )
+        return current - since
+
+    def get_rollup_grouped_totals(
         self,
         session: Session,
-        date_from,
-        date_to,
+        start_day: Optional[date],
+        end_day: Optional[date],
         limit,
         is_expense,
-        user_id: str,
-        group_field,
-    ) -> List[Tuple]:
-        stmt = (
+        user_id,
+        by: str,
+    ) -> List[Tuple[str, Decimal, Decimal, int]]:
+        """Top `limit` groups as (name, total, percentage, count) rows.
+
+        Names are joined in and percentages come from a window over the
+        returned groups, so the whole breakdown is one round-trip.
+        """
+        rollup = TransactionDailyRollup
+        if by == "category":
+            name = func.coalesce(Category.name, "Uncategorized")
+            source = rollup.__table__.outerjoin(Category, Category.id == rollup.category_id)
+            keys = (rollup.category_id, Category.name)
+        elif by == "account":
+            name = func.coalesce(Account.name, "Unknown Account")
+            source = rollup.__table__.outerjoin(Account, Account.id == rollup.account_id)
+            keys = (rollup.account_id, Account.name)
+        else:
+            name = cast(rollup.type, String)
+            source = rollup.__table__
+            keys = (rollup.type,)
+
+        conditions = [rollup.user_id == user_id, *self._rollup_days(start_day, end_day)]
+        if is_expense:
+            conditions.append(rollup.type == TransactionType.EXPENSE)
+        total = func.sum(rollup.total)
+        groups = (
             select(
-                group_field, func.sum(Transaction.amount), func.count(Transaction.id)
-            )
-            .where(
-                Transaction.user_id == user_id,
-                (
-                    True
-                    if not is_expense
-                    else (
-                        Transaction.type == TransactionType.EXPENSE
-                        if is_expense
-                        else Transaction.type == TransactionType.INCOME
-                    )
-                ),
+                name.label("name"),
+                total.label("total"),
+                func.sum(rollup.count).label("count"),
             )
-            .group_by(group_field)
-            .order_by(func.sum(Transaction.amount).desc())
+            .select_from(source)
+            .where(*conditions)
+            .group_by(*keys)
+            .having(func.sum(rollup.count) > 0)
+            .order_by(total.desc())
             .limit(limit)
+            .subquery()
         )
-        if date_from:
-            stmt = stmt.where(Transaction.occurred_at >= date_from)
-        if date_to:
-            stmt = stmt.where(Transaction.occurred_at <= date_to)
+
+        grand_total = func.sum(groups.c.total).over()
+        percentage = func.coalesce(
+            func.round(groups.c.total * 100 / func.nullif(grand_total, 0), 2), 0
+        )
+        stmt = select(
+            groups.c.name, groups.c.total, percentage, groups.c.count
+        ).order_by(groups.c.total.desc())
         return session.exec(stmt).all()
 
+    def _rollup_days(self, start_day: Optional[date], end_day: Optional[date]):
+        # end_day is exclusive
+        conditions = []
+        if start_day:
+            conditions.append(TransactionDailyRollup.day >= start_day)
+        if end_day:
+            conditions.append(TransactionDailyRollup.day < end_day)
+        return conditions
+
 
 # FastApi dependency provider
 def get_transaction_repo() -> TransactionRepo:
@@ -1,10 +1,30 @@
-from fastapi import APIRouter, Depends, Path, Query, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Path,
+    Query,
+    HTTPException,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
-from app.api.deps import get_current_user, get_session
-from app.models.user import User
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.accounts.exceptions import AccountNotFound
+from app.api.conditional import conditional_get
+from app.api.deps import (
+    get_current_user_id,
+    get_session,
+    get_async_session,
+    get_async_session_factory,
+)
+from app.core.cache import result_cache
+from app.core.responses import ORJSONResponse, rows_as_dicts
 from app.models.enums import TransactionType
+from app.transactions.exporter import MEDIA_TYPES
 from app.transactions.service import TransactionsService, get_transaction_service
-from typing import Annotated, Optional, List
+from typing import Annotated, Literal, Optional, List
 from uuid import UUID
 from datetime import datetime
 from app.transactions.schemas import (
@@ -16,6 +36,7 @@ from app.transactions.schemas import (
     TransactionPatch,
     TransferTransactionsOut,
     TransactionSummaryOut,
+    MonthlySummaryOut,
     TransactionStatsOut,
     TimeSeries,
     AccountBalancesOut
@@ -27,13 +48,20 @@ from app.transactions.exceptions import (
     CanNotUpdateTransaction,
     TransactionError,
     InvalidTransferTransaction,
+    InvalidCursor,
+    DuplicateTransaction,
+    InvalidImportFile,
 )
 
 router = APIRouter(prefix="/transactions", tags=["Transaction"])
 
+TRANSACTION_OUT_FIELDS = tuple(TransactionOut.model_fields)
+# YYYY-MM with a real month, 2025-13 and 2025-00 are rejected with a 422
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
 
 @router.get("/", response_model=TransactionsOut)
-def get_user_transactions(
+async def get_user_transactions(
     limit: int = Query(
         1000, ge=1, le=1000, title="limit", description="amount of result per page"
     ),
@@ -63,42 +91,63 @@ def get_user_transactions(
     end: Optional[datetime] = Query(
         None, title="end-date", description="ending date to filter the transaction's"
     ),
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(
+        None,
+        title="cursor",
+        description="next_cursor of the previous page, takes precedence over offset",
+    ),
+    count: Literal["exact", "estimated", "none"] = Query(
+        "exact",
+        title="count",
+        description="how to compute total: exactly, from planner statistics, or not at all",
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
 ):
-    transactions, total = transaction_service.get_user_transactions(
-        session,
-        current_user.id,
-        limit,
-        offset,
-        account_id,
-        category_id,
-        type,
-        start,
-        end,
-    )
-
-    transaction_outs = []
-    for transaction in transactions:
-        transaction_outs.append(TransactionOut.model_validate(transaction))
+    try:
+        transactions, total, next_cursor = await session.run_sync(
+            transaction_service.get_user_transactions,
+            user_id,
+            limit,
+            offset,
+            account_id,
+            category_id,
+            type,
+            start,
+            end,
+            cursor,
+            count,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"code": "INVALID_CURSOR", "message": str(e)},
+        )
 
-    transactions_out = TransactionsOut(transactions=transaction_outs, total=total)
-    return transactions_out
+    # rows go straight to JSON, already in TransactionsOut's shape
+    return ORJSONResponse(
+        {
+            "transactions": rows_as_dicts(transactions, TRANSACTION_OUT_FIELDS),
+            "total": total,
+            "total_exact": count == "exact",
+            "next_cursor": next_cursor,
+        }
+    )
 
 
 @router.post("/", response_model=TransactionOut, status_code=status.HTTP_201_CREATED)
-def create_transaction(
+async def create_transaction(
     transaction_data: TransactionCreate,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
 ):
     try:
-        transaction = transaction_service.create_income_expense_transaction(
-            session,
+        transaction = await session.run_sync(
+            transaction_service.create_income_expense_transaction,
             transaction_data.model_dump(exclude_unset=True),
-            current_user.id,
+            user_id,
         )
         transaction_out = TransactionOut.model_validate(transaction)
 
@@ -113,20 +162,63 @@ def create_transaction(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"code": "INVALID_AMOUNT", "message": str(e)},
         )
+    except AccountNotFound as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "ACCOUNT_NOT_FOUND", "message": str(e)},
+        )
+    except DuplicateTransaction as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"code": "DUPLICATE_TRANSACTION", "message": str(e)},
+        )
 
 
 @router.post("/bulk", status_code=status.HTTP_201_CREATED)
-def create_transactions_bulk(
+async def create_transactions_bulk(
     payload: BulkTransactionCreate,
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
+    transaction_service: TransactionsService = Depends(get_transaction_service),
+):
+    try:
+        return await session.run_sync(
+            transaction_service.create_transactions_bulk,
+            payload.transactions,
+            user_id,
+        )
+    except InsufficientBalance as e:
+        # a concurrent write overdrew an account between the check and the update
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"code": "INSUFFICIENT_BALANCE", "message": str(e)},
+        )
+
+
+@router.post("/import", status_code=status.HTTP_201_CREATED)
+def import_transactions(
+    file: UploadFile = File(..., description="NDJSON or CSV, one transaction per line"),
+    format: Literal["ndjson", "csv"] = "ndjson",
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
 ):
-    return transaction_service.create_transactions_bulk(
-        session,
-        payload.transactions,
-        current_user.id,
-    )
+    # the upload is spooled to disk by starlette and parsed line by line from there.
+    # stays on the sync session: COPY FROM STDIN goes through the psycopg2 cursor
+    try:
+        return transaction_service.import_transactions(
+            session, file.file, format, user_id
+        )
+    except InsufficientBalance as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"code": "INSUFFICIENT_BALANCE", "message": str(e)},
+        )
+    except InvalidImportFile as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"code": "INVALID_IMPORT_FILE", "message": str(e)},
+        )
 
 
 @router.post(
@@ -134,15 +226,15 @@ def create_transactions_bulk(
     response_model=TransferTransactionsOut,
     status_code=status.HTTP_201_CREATED,
 )
-def create_transaction(
+async def create_transaction(
     transaction_data: TransferTransactionCreate,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
 ):
     try:
-        txn_out, txn_in = transaction_service.create_transfer_transaction(
-            session, transaction_data, current_user.id
+        txn_out, txn_in = await session.run_sync(
+            transaction_service.create_transfer_transaction, transaction_data, user_id
         )
 
         transfer_transactions_out = TransferTransactionsOut(
@@ -160,9 +252,19 @@ def create_transaction(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"code": "INVALID_AMOUNT", "message": str(e)},
         )
+    except AccountNotFound as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "ACCOUNT_NOT_FOUND", "message": str(e)},
+        )
+    except InvalidTransferTransaction as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"code": "INVALID_TRANSFER_TRANSACTION", "message": str(e)},
+        )
 
 @router.get("/list", response_model=List[TransactionOut], status_code=status.HTTP_200_OK)
-def list_transactions_for_report(
+async def list_transactions_for_report(
     date_from: datetime | None = None,
     date_to: datetime | None = None,
     category_id: int | None = None,
@@ -170,80 +272,171 @@ def list_transactions_for_report(
     type: TransactionType | None = None,
     page: int = 1,
     per_page: int = 1000,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service)
 ):
-    transactions = transaction_service.get_user_transactions_for_report(
-        session,
-        account_id,
-        category_id,
-        type,
-        date_from,
-        date_to,
-        page,
-        per_page,
-        current_user.id,
+    try:
+        transactions, next_cursor = await session.run_sync(
+            transaction_service.get_user_transactions_for_report,
+            account_id,
+            category_id,
+            type,
+            date_from,
+            date_to,
+            page,
+            per_page,
+            user_id,
+            cursor,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"code": "INVALID_CURSOR", "message": str(e)},
+        )
+    # the body stays a bare list for existing clients, the cursor rides in a header
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return ORJSONResponse(
+        rows_as_dicts(transactions, TRANSACTION_OUT_FIELDS), headers=headers
     )
-    transaction_outs = [TransactionOut.model_validate(transaction) for transaction in transactions]    
-    return transaction_outs
 
 @router.get("/summary", response_model=TransactionSummaryOut, status_code=status.HTTP_200_OK)
-def get_transaction_summary(
-    month: str | None = Query(None, pattern=r"^\d{4}-\d{2}$"),
+async def get_transaction_summary(
+    month: str | None = Query(None, pattern=MONTH_PATTERN),
     date_from: datetime | None = None,
     date_to: datetime | None = None,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
+    etag: str = Depends(conditional_get),
 ):
-    return transaction_service.get_transaction_summary(
-        session, month, date_from, date_to, current_user.id
+    return await result_cache.get_or_compute(
+        "summary",
+        etag,
+        lambda: session.run_sync(
+            transaction_service.get_transaction_summary, month, date_from, date_to, user_id
+        ),
+    )
+
+
+@router.get(
+    "/summary/months",
+    response_model=List[MonthlySummaryOut],
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(conditional_get)],
+)
+async def get_monthly_summaries(
+    month: str = Query(..., pattern=MONTH_PATTERN),
+    months: int = Query(12, ge=1, le=36),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
+    transaction_service: TransactionsService = Depends(get_transaction_service),
+):
+    return await session.run_sync(
+        transaction_service.get_monthly_summaries, month, months, user_id
     )
 
 
 @router.get("/stats", response_model=List[TransactionStatsOut], status_code=status.HTTP_200_OK)
-def get_transaction_stats(
+async def get_transaction_stats(
     by: str = Query("category", enum=["category", "account", "type"]),
     is_expense: bool = True,
     date_from: datetime | None = None,
     date_to: datetime | None = None,
     limit: int = 1000,
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
+    etag: str = Depends(conditional_get),
 ):
-    return transaction_service.get_transaction_stats(
-        session, by, date_from, date_to, limit, is_expense, current_user.id
+    return await result_cache.get_or_compute(
+        "stats",
+        etag,
+        lambda: session.run_sync(
+            transaction_service.get_transaction_stats,
+            by, date_from, date_to, limit, is_expense, user_id,
+        ),
     )
 
 
-@router.get("/timeseries", response_model=List[TimeSeries], status_code=status.HTTP_200_OK)
-def get_timeseries(
+@router.get(
+    "/timeseries",
+    response_model=List[TimeSeries],
+    response_model_exclude_none=True,
+    status_code=status.HTTP_200_OK,
+)
+async def get_timeseries(
     date_from: datetime,
     date_to: datetime,
-    granularity: str = Query("day", enum=["day", "week", "month"]),
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    granularity: Literal["day", "week", "month"] = "day",
+    by: Optional[Literal["category", "account"]] = Query(
+        None, description="add a per category or per account breakdown to every point"
+    ),
+    running: Optional[Literal["net", "balance"]] = Query(
+        None, description="add the cumulative net, or the total balance at each period end"
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
+    etag: str = Depends(conditional_get),
 ):
-    return transaction_service.get_timeseries(
-        session, granularity, date_from, date_to, current_user.id
+    return await result_cache.get_or_compute(
+        "timeseries",
+        etag,
+        lambda: session.run_sync(
+            transaction_service.get_timeseries,
+            granularity, date_from, date_to, user_id, by, running,
+        ),
     )
 
 
 @router.get("/balances", response_model=AccountBalancesOut, status_code=status.HTTP_200_OK)
-def get_account_balances(
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+async def get_account_balances(
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
+    etag: str = Depends(conditional_get),
 ):
-    total, account_balances = transaction_service.get_account_balances(session, current_user.id)
+    total, account_balances = await result_cache.get_or_compute(
+        "balances",
+        etag,
+        lambda: session.run_sync(transaction_service.get_account_balances, user_id),
+    )
     return AccountBalancesOut(total_balance=total, accounts=account_balances)
 
 
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_transactions(
+    format: Literal["csv", "ndjson"] = "ndjson",
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    category_id: int | None = None,
+    account_id: int | None = None,
+    type: TransactionType | None = None,
+    session_factory=Depends(get_async_session_factory),
+    user_id: UUID = Depends(get_current_user_id),
+    transaction_service: TransactionsService = Depends(get_transaction_service),
+):
+    chunks = transaction_service.iter_export(
+        session_factory,
+        format,
+        account_id,
+        category_id,
+        type,
+        date_from,
+        date_to,
+        user_id,
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
+    )
+
+
 @router.get("/{id}", response_model=TransactionOut)
-def get_transaction(
+async def get_transaction(
     id: Annotated[
         int,
         Path(
@@ -253,19 +446,19 @@ def get_transaction(
             examples=[1, 2, 3, 4, 5, 6, 7],
         ),
     ],
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
 ):
     try:
-        transaction = transaction_service.get_transaction(session, id, current_user.id)
+        transaction = await session.run_sync(transaction_service.get_transaction, id, user_id)
         return TransactionOut.model_validate(transaction)
     except TransactionNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 @router.patch("/{id}", response_model=TransactionOut)
-def update_transaction(
+async def update_transaction(
     transaction_data: TransactionPatch,
     id: Annotated[
         int,
@@ -276,13 +469,13 @@ def update_transaction(
             examples=[1, 2, 3, 4, 5, 6, 7],
         ),
     ],
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
 ):
     try:
-        updated_transaction = transaction_service.update_transaction(
-            session, transaction_data, id, current_user.id
+        updated_transaction = await session.run_sync(
+            transaction_service.update_transaction, transaction_data, id, user_id
         )
         return TransactionOut.model_validate(updated_transaction)
     except TransactionNotFound as e:
@@ -305,7 +498,7 @@ def update_transaction(
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_transaction(
+async def delete_transaction(
     id: Annotated[
         int,
         Path(
@@ -315,12 +508,12 @@ def delete_transaction(
             examples=[1, 2, 3, 4, 5, 6, 7],
         ),
     ],
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
 ):
     try:
-        transaction_service.delete_transaction(session, id, current_user.id)
+        await session.run_sync(transaction_service.delete_transaction, id, user_id)
     except TransactionNotFound as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except InsufficientBalance as e:
@@ -331,7 +524,7 @@ def delete_transaction(
 
 
 @router.delete("/transfer/{transfer_group_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_transfer_transaction(
+async def delete_transfer_transaction(
     transfer_group_id: Annotated[
         UUID,
         Path(
@@ -339,13 +532,13 @@ def delete_transfer_transaction(
             description="The global id of Transfer Transaction's",
         ),
     ],
-    session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    user_id: UUID = Depends(get_current_user_id),
     transaction_service: TransactionsService = Depends(get_transaction_service),
 ):
     try:
-        transaction_service.delete_transfer_transaction(
-            session, transfer_group_id, current_user.id
+        await session.run_sync(
+            transaction_service.delete_transfer_transaction, transfer_group_id, user_id
         )
     except InvalidTransferTransaction as e:
         raise HTTPException(
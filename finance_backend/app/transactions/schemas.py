@@ -30,7 +30,10 @@ class TransferTransactionsOut(BaseModel):
 
 class TransactionsOut(BaseModel):
     transactions: List[TransactionOut]
-    total: int
+    # None when the client asked to skip counting, approximate unless total_exact
+    total: Optional[int] = None
+    total_exact: bool = True
+    next_cursor: Optional[str] = None
 
 
 class TransactionCreate(BaseModel):
@@ -71,6 +74,9 @@ class TransactionSummaryOut(BaseModel):
     net_savings: Decimal
     transactions_count: int
 
+class MonthlySummaryOut(TransactionSummaryOut):
+    month: str
+
 
 class TransactionStatsOut(BaseModel):
     name: str
@@ -78,11 +84,22 @@ class TransactionStatsOut(BaseModel):
     percentage: Decimal
     transaction_count: int
 
+class SeriesBreakdown(BaseModel):
+    # None is the uncategorized bucket
+    id: Optional[int] = None
+    name: str
+    income: Decimal
+    expense: Decimal
+    net: Decimal
+
 class TimeSeries(BaseModel):
     date: datetime
     income: Decimal
     expense: Decimal
     net: Decimal
+    # only present when asked for, see GET /transactions/timeseries
+    running: Optional[Decimal] = None
+    breakdown: Optional[List[SeriesBreakdown]] = None
 
 class AccountBalance(BaseModel):
     id: int
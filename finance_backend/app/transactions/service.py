@@ -1,20 +1,21 @@
 from collections import defaultdict
 from sqlmodel import Session
 from fastapi import Depends
-from app.models.transaction import Transaction
-from typing import List, Optional, Tuple, Dict
-from decimal import Decimal, ROUND_HALF_UP
+from app.models.transaction import Transaction, TransactionType
+from typing import AsyncIterator, List, Optional, Tuple, Dict
+from decimal import Decimal
 from sqlalchemy.exc import SQLAlchemyError
 from uuid import uuid4
-from datetime import datetime
-from calendar import monthrange
-from sqlmodel import Session
-from app.models.transaction import Transaction, TransactionType
-from app.models.account import Account
-from app.models.category import Category
+from datetime import datetime, time, timedelta
+from app.models.common import now_utc
 from app.transactions.schemas import TransferTransactionCreate, TransactionPatch
+from app.accounts.exceptions import AccountNotFound
 from app.accounts.repo import AccountRepository, get_account_repo
+from app.auth.repo import UserRepository, get_user_repo
 from app.transactions.repo import TransactionRepo, get_transaction_repo
+from app.transactions.pagination import encode_cursor, decode_cursor
+from app.transactions.importer import iter_records, iter_staging_rows, CopyStream
+from app.transactions.exporter import EXPORT_FIELDS, csv_header, encode_csv, encode_ndjson
 from app.transactions.exceptions import (
     TransactionNotFound,
     InsufficientBalance,
@@ -22,34 +23,65 @@ from app.transactions.exceptions import (
     TransactionError,
     CanNotUpdateTransaction,
     InvalidTransferTransaction,
+    DuplicateTransaction,
+    InvalidImportFile,
 )
 
 
+def day_bounds(date_from: Optional[datetime], date_to: Optional[datetime]):
+    """Map a datetime range onto the [start_day, end_day) days of the rollups.
+
+    Rollups are day granular: a bound with a time of day covers its whole day,
+    while an end at exactly midnight stops before that day starts.
+    """
+    start_day = date_from.date() if date_from else None
+    end_day = None
+    if date_to:
+        end_day = date_to.date()
+        if date_to.time() != time.min:
+            end_day += timedelta(days=1)
+    return start_day, end_day
+
+
+def month_start(year: int, month: int, offset: int = 0) -> datetime:
+    """First instant of the month `offset` months after year-month."""
+    if not 1 <= month <= 12:
+        raise ValueError(f"month must be between 1 and 12, got {month}")
+    index = year * 12 + month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
 class TransactionsService:
     def __init__(
-        self, transaction_repo: TransactionRepo, account_repo: AccountRepository
+        self,
+        transaction_repo: TransactionRepo,
+        account_repo: AccountRepository,
+        user_repo: Optional[UserRepository] = None,
     ):
         self.transaction_repo = transaction_repo
         self.account_repo = account_repo
+        self.user_repo = user_repo or UserRepository()
 
     def create_income_expense_transaction(
         self, session: Session, data, user_id: str
     ) -> Transaction:
         transaction = Transaction(**data, user_id=user_id)
-        account_id = transaction.account_id
         amount = transaction.amount
-        account = self.account_repo.get_account_for_user(session, account_id, user_id)
 
         if amount <= 0:
             raise InvalidAmount("amount must be a postive integer")
+        if transaction.message_id and not self.transaction_repo.claim_message_ids(
+            session, user_id, [transaction.message_id]
+        ):
+            raise DuplicateTransaction("a transaction with this message_id already exists")
         if transaction.type == TransactionType.EXPENSE:
-            if account.balance < amount:
-                raise InsufficientBalance("account balance insufficient")
-            account.balance -= amount
+            self._change_balance(session, transaction.account_id, user_id, -amount)
         elif transaction.type == TransactionType.INCOME:
-            account.balance += amount
+            self._change_balance(session, transaction.account_id, user_id, amount)
 
         txn = self.transaction_repo.save_transaction(session, transaction)
+        self.transaction_repo.rollup_transactions(session, [txn.id])
+        self.user_repo.bump_data_version(session, user_id)
         session.commit()
         return txn
 
@@ -70,131 +102,176 @@ class TransactionsService:
             }
 
         # Query DB for *only* message_ids that are in incoming_mids
-        existing_mids = self.transaction_repo.get_transaction_with_message_id(
-            session, incoming_mids, user_id
+        existing_mids = set(
+            self.transaction_repo.get_transaction_with_message_id(
+                session, incoming_mids, user_id
+            )
         )
+        # every referenced account in one query, balances are then tracked in
+        # memory to pick the rows that fit; the final conditional updates are
+        # what actually guards the balances against concurrent writers
+        balances = {
+            account.id: account.balance
+            for account in self.account_repo.get_accounts_for_user(
+                session, {t.account_id for t in transactions}, user_id
+            )
+        }
 
         to_insert = []
+        seen_mids = set()
         skipped_reasons = defaultdict(int)
+        now = now_utc()
 
         for t in transactions:
             # basic validation
             if not t.message_id:
                 skipped_reasons["no_message_id"] += 1
                 continue
-            if t.message_id in existing_mids:
+            if t.message_id in existing_mids or t.message_id in seen_mids:
                 skipped_reasons["duplicate"] += 1
                 continue
             if t.amount <= 0:
                 skipped_reasons["invalid_amount"] += 1
                 continue
-
-            account = self.account_repo.get_account_for_user(
-                session, t.account_id, user_id
-            )
-            if not account:
+            if t.account_id not in balances:
                 skipped_reasons["invalid_account"] += 1
                 continue
 
             if t.type == TransactionType.EXPENSE:
-                if account.balance < t.amount:
+                if balances[t.account_id] < t.amount:
                     skipped_reasons["insufficient_funds"] += 1
                     continue
-                account.balance -= t.amount
+                balances[t.account_id] -= t.amount
             else:
-                account.balance += t.amount
-
-            entity = Transaction(
-                user_id=user_id,
-                account_id=t.account_id,
-                amount=t.amount,
-                merchant=t.merchant,
-                currency=t.currency,
-                type=t.type,
-                description=t.description,
-                occurred_at=t.occurred_at,
-                message_id=t.message_id,
+                balances[t.account_id] += t.amount
+
+            seen_mids.add(t.message_id)
+            to_insert.append(
+                {
+                    "user_id": user_id,
+                    "account_id": t.account_id,
+                    "category_id": t.category_id,
+                    "amount": t.amount,
+                    "merchant": t.merchant,
+                    "currency": t.currency,
+                    "type": t.type,
+                    "description": t.description,
+                    "occurred_at": t.occurred_at or now,
+                    "created_at": now,
+                    "message_id": t.message_id,
+                }
             )
-            to_insert.append(entity)
 
-            inserted = 0
-            for i in range(0, len(to_insert), chunk_size):
-                try:
+        # per chunk the message ids are claimed and the rows that got theirs
+        # inserted, only rows that actually landed move balances
+        deltas = defaultdict(Decimal)
+        inserted_ids = []
+        for i in range(0, len(to_insert), chunk_size):
+            chunk = to_insert[i : i + chunk_size]
+            rows = self.transaction_repo.insert_ignoring_duplicates(session, chunk)
+            skipped_reasons["duplicate"] += len(chunk) - len(rows)
+            for id, account_id, type, amount in rows:
+                inserted_ids.append(id)
+                deltas[account_id] += -amount if type == TransactionType.EXPENSE else amount
+        inserted = len(inserted_ids)
+
+        # id order, so concurrent syncs touching the same accounts lock them in
+        # the same order; account locks are taken before rollup locks, like on
+        # every other write path
+        for account_id, delta in sorted(deltas.items()):
+            if delta:
+                self._change_balance(session, account_id, user_id, delta)
+        self.transaction_repo.rollup_transactions(session, inserted_ids)
+        if inserted:
+            self.user_repo.bump_data_version(session, user_id)
+        session.commit()
 
-                    chunk = to_insert[i : i + chunk_size]
-                    self.transaction_repo.bulk_insert(session, chunk)
-                except SQLAlchemyError:
-                    # ignore duplicate transaciton's
-                    continue
+        skipped_reasons = {k: v for k, v in skipped_reasons.items() if v}
+        return {
+            "inserted": inserted,
+            "skipped": sum(skipped_reasons.values()),
+            "skipped_reasons": skipped_reasons,
+        }
+
+    def import_transactions(self, session: Session, stream, format: str, user_id):
+        skipped_reasons = defaultdict(int)
+        rows = iter_staging_rows(iter_records(stream, format), skipped_reasons)
+        try:
+            # rows are parsed lazily while COPY pulls them, nothing is held in memory
+            self.transaction_repo.copy_into_import_staging(session, CopyStream(rows))
+            merged = self.transaction_repo.merge_import_staging(session, user_id)
+            if merged.pop("overdrawn", 0):
+                session.rollback()
+                raise InsufficientBalance("account balance insufficient")
+            if merged["inserted"]:
+                self.user_repo.bump_data_version(session, user_id)
             session.commit()
+        except (SQLAlchemyError, InvalidImportFile) as e:
+            # an unreadable file surfaces mid-COPY, which aborts the transaction
+            session.rollback()
+            raise e
 
+        inserted = merged.pop("inserted")
+        for reason, count in merged.items():
+            skipped_reasons[reason] += count
+        skipped_reasons = {k: v for k, v in skipped_reasons.items() if v}
         return {
-            "inserted": len(to_insert),
+            "inserted": inserted,
             "skipped": sum(skipped_reasons.values()),
-            "skipped_reasons": dict(skipped_reasons),
+            "skipped_reasons": skipped_reasons,
         }
 
     def create_transfer_transaction(
         self, session: Session, transfer_txn: TransferTransactionCreate, user_id: str
     ) -> Tuple[Transaction, Transaction]:
         try:
-            transfer_group_id = uuid4()
             amount = transfer_txn.amount
-            occured_at = transfer_txn.occurred_at
 
             # validate amount before continuing
             if amount <= 0:
                 raise InvalidAmount("amount must be a postive integer")
-
-            # 1. Decrease balance on sender account
-            from_account = self.account_repo.get_account_for_user(
-                session, transfer_txn.account_id, user_id
+            if transfer_txn.account_id == transfer_txn.to_account_id:
+                raise InvalidTransferTransaction("cannot transfer to the same account")
+
+            # balances, both legs and their rollups in a single statement
+            now = now_utc()
+            legs = self.transaction_repo.create_transfer(
+                session,
+                user_id,
+                uuid4(),
+                transfer_txn.account_id,
+                transfer_txn.to_account_id,
+                amount,
+                transfer_txn.currency,
+                transfer_txn.description,
+                transfer_txn.occurred_at or now,
+                now,
             )
-            if from_account.balance < amount:
+            if not legs:
+                found = self.account_repo.get_accounts_for_user(
+                    session, {transfer_txn.account_id, transfer_txn.to_account_id}, user_id
+                )
+                if len(found) < 2:
+                    raise AccountNotFound("Account not found")
                 raise InsufficientBalance("account balance insufficient")
-            from_account.balance -= amount
-
-            # 2. Increase balance on receiver account
-            to_account = self.account_repo.get_account_for_user(
-                session, transfer_txn.to_account_id, user_id
-            )
-            to_account.balance += amount
-
-            # 3. Add two linked transaction rows
-            outgoing_txn = Transaction(
-                account_id=from_account.id,
-                user_id=user_id,
-                amount=amount,
-                currency=transfer_txn.currency,
-                type=TransactionType.TRANSFER,
-                transfer_group_id=transfer_group_id,
-                description=transfer_txn.description,
-                is_outgoing=True,
-            )
-            if occured_at:
-                outgoing_txn.occurred_at = occured_at
-            incoming_txn = Transaction(
-                account_id=to_account.id,
-                user_id=user_id,
-                amount=amount,
-                currency=transfer_txn.currency,
-                type=TransactionType.TRANSFER,
-                transfer_group_id=transfer_group_id,
-                description=transfer_txn.description,
-                is_outgoing=False,
-            )
-            if occured_at:
-                incoming_txn.occurred_at = occured_at
-
-            outgoing_txn = self.transaction_repo.save_transaction(session, outgoing_txn)
-            incoming_txn = self.transaction_repo.save_transaction(session, incoming_txn)
 
+            self.user_repo.bump_data_version(session, user_id)
             session.commit()
+            outgoing_txn, incoming_txn = legs
             return outgoing_txn, incoming_txn
         except SQLAlchemyError as e:
             session.rollback()
             raise e
 
+    def _change_balance(self, session: Session, account_id, user_id, delta) -> Decimal:
+        balance = self.account_repo.change_balance(session, account_id, user_id, delta)
+        if balance is None:
+            # only the failure path pays for telling the two cases apart
+            if not self.account_repo.get_account_for_user(session, account_id, user_id):
+                raise AccountNotFound("Account not found")
+            raise InsufficientBalance("account balance insufficient")
+        return balance
+
     def get_user_transactions(
         self,
         session: Session,
@@ -206,8 +283,10 @@ class TransactionsService:
         type,
         start,
         end,
-    ) -> Tuple[List[Transaction], int]:
-        return self.transaction_repo.list_user_transactions(
+        cursor: Optional[str] = None,
+        count: str = "exact",
+    ) -> Tuple[List[Transaction], Optional[int], Optional[str]]:
+        transactions, total = self.transaction_repo.list_user_transactions(
             session,
             user_id,
             limit,
@@ -217,7 +296,10 @@ class TransactionsService:
             type,
             start,
             end,
+            decode_cursor(cursor) if cursor else None,
+            count,
         )
+        return transactions, total, self._next_cursor(transactions, limit)
 
     def get_user_transactions_for_report(
         self,
@@ -230,8 +312,9 @@ class TransactionsService:
         page,
         per_page,
         user_id,
-    ) -> List[Transaction]:
-        return self.transaction_repo.list_user_transactions_for_report(
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Transaction], Optional[str]]:
+        transactions = self.transaction_repo.list_user_transactions_for_report(
             session,
             account_id,
             category_id,
@@ -241,7 +324,45 @@ class TransactionsService:
             page,
             per_page,
             user_id,
+            decode_cursor(cursor) if cursor else None,
         )
+        return transactions, self._next_cursor(transactions, per_page)
+
+    async def iter_export(
+        self,
+        session_factory,
+        format: str,
+        account_id,
+        category_id,
+        type,
+        date_from,
+        date_to,
+        user_id,
+    ) -> AsyncIterator[bytes]:
+        """Encoded chunks of every transaction the report filters match.
+
+        Rows come off a server-side cursor one batch at a time, so memory stays
+        flat however many rows the user has. The session is opened here rather
+        than taken from a dependency because the response body is sent after
+        request dependencies have been closed.
+        """
+        encode = encode_csv if format == "csv" else encode_ndjson
+        if format == "csv":
+            yield csv_header(EXPORT_FIELDS)
+        stmt = self.transaction_repo.export_query(
+            account_id, category_id, type, date_from, date_to, user_id
+        )
+        async with session_factory() as session:
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                yield encode(rows, EXPORT_FIELDS)
+
+    def _next_cursor(self, transactions: List[Transaction], page_size) -> Optional[str]:
+        # a short page means there is nothing left to fetch
+        if len(transactions) < page_size:
+            return None
+        last = transactions[-1]
+        return encode_cursor(last.occurred_at, last.id)
 
     def get_transaction(self, session: Session, id, user_id) -> Transaction:
         transaction = self.transaction_repo.get_transaction_for_user(
@@ -255,14 +376,11 @@ class TransactionsService:
         self, session: Session, transaction_data: TransactionPatch, id, user_id
     ) -> Transaction:
         transaction = self.transaction_repo.get_transaction_for_user(
-            session, id, user_id
+            session, id, user_id, for_update=True
         )
         if not transaction:
             raise TransactionNotFound("Transaction not found")
 
-        account = self.account_repo.get_account_for_user(
-            session, transaction.account_id, user_id
-        )
         amount = transaction_data.amount
 
         if transaction.type == TransactionType.TRANSFER:
@@ -275,74 +393,55 @@ class TransactionsService:
         # update account balance only if the user updated the amount
         if amount is not None:
             offset = amount - transaction.amount
-
             if transaction.type == TransactionType.EXPENSE:
-                # validate account balance before updating
-                if offset > account.balance:
-                    raise InsufficientBalance("account balance insufficient")
-                account.balance -= offset
-            else:
-                if offset < 0 and account.balance < abs(offset):
-                    raise InsufficientBalance("account balance insufficient")
-                account.balance += offset
+                offset = -offset
+            if offset:
+                self._change_balance(session, transaction.account_id, user_id, offset)
 
         update_data = transaction_data.model_dump(exclude_unset=True)
+        # move the row between rollup buckets when anything they key on changes
+        rebucket = bool(update_data.keys() & {"amount", "category_id", "occurred_at"})
+        if rebucket:
+            self.transaction_repo.rollup_transactions(session, [transaction.id], -1)
         for field, value in update_data.items():
             setattr(transaction, field, value)
 
         updated_transaction = self.transaction_repo.save_transaction(
             session, transaction
         )
+        if rebucket:
+            self.transaction_repo.rollup_transactions(session, [transaction.id])
+        self.user_repo.bump_data_version(session, user_id)
         session.commit()
         return updated_transaction
 
     def delete_transaction(self, session: Session, id, user_id):
+        # the row lock keeps two concurrent deletes from both reverting it
         transaction = self.transaction_repo.get_transaction_for_user(
-            session, id, user_id
+            session, id, user_id, for_update=True
         )
         if not transaction:
             raise TransactionNotFound("Transaction not found")
         amount = transaction.amount
-        account = self.account_repo.get_account_for_user(
-            session, transaction.account_id, user_id
-        )
         if transaction.type == TransactionType.INCOME:
-            if amount > account.balance:
-                raise InsufficientBalance("account balance insufficient")
-            account.balance -= amount
+            self._change_balance(session, transaction.account_id, user_id, -amount)
         elif transaction.type == TransactionType.EXPENSE:
-            account.balance += amount
+            self._change_balance(session, transaction.account_id, user_id, amount)
+        self.transaction_repo.rollup_transactions(session, [transaction.id], -1)
         self.transaction_repo.delete_transaction(session, transaction)
+        self.user_repo.bump_data_version(session, user_id)
         session.commit()
 
     def delete_transfer_transaction(self, session: Session, transfer_group_id, user_id):
         try:
-            group_transactions = self.transaction_repo.get_transfer_transactions(
+            found, deleted = self.transaction_repo.delete_transfer(
                 session, transfer_group_id, user_id
             )
-            if len(group_transactions) != 2:
+            if found != 2:
                 raise InvalidTransferTransaction("Invalid transfer transaction")
-            outgoing_transaction = [
-                txn for txn in group_transactions if txn.is_outgoing
-            ].pop()
-            incoming_transaction = [
-                txn for txn in group_transactions if not txn.is_outgoing
-            ].pop()
-
-            from_account = self.account_repo.get_account_for_user(
-                session, outgoing_transaction.account_id, user_id
-            )
-            to_account = self.account_repo.get_account_for_user(
-                session, incoming_transaction.account_id, user_id
-            )
-
-            from_account.balance += outgoing_transaction.amount
-            if to_account.balance < incoming_transaction.amount:
+            if not deleted:
                 raise InsufficientBalance("account balance insufficient")
-            to_account.balance -= incoming_transaction.amount
-
-            self.transaction_repo.delete_transaction(session, outgoing_transaction)
-            self.transaction_repo.delete_transaction(session, incoming_transaction)
+            self.user_repo.bump_data_version(session, user_id)
             session.commit()
         except SQLAlchemyError as e:
             session.rollback()
@@ -353,40 +452,103 @@ class TransactionsService:
     ) -> Dict[str, object]:
         if month:
             year, m = map(int, month.split("-"))
-            date_from = datetime(year, m, 1)
-            date_to = datetime(year, m + 1, 1) if m < 12 else datetime(year + 1, 1, 1)
+            date_from = month_start(year, m)
+            date_to = month_start(year, m, 1)
 
-        income, i_count = self.transaction_repo.get_transaction_summary_for_type(
-            session, TransactionType.INCOME, date_from, date_to, user_id
+        start_day, end_day = day_bounds(date_from, date_to)
+        income, expense, i_count, e_count = self.transaction_repo.get_rollup_summary(
+            session, start_day, end_day, user_id
         )
-        expense, e_count = self.transaction_repo.get_transaction_summary_for_type(
-            session, TransactionType.EXPENSE, date_from, date_to, user_id
+        return self._summary(income, expense, i_count, e_count)
+
+    def get_monthly_summaries(
+        self, session: Session, month: str, months: int, user_id: str
+    ) -> List[Dict[str, object]]:
+        """Summaries for `months` consecutive months starting at `month`, months
+        without activity included as zeros."""
+        year, m = map(int, month.split("-"))
+        start = month_start(year, m)
+        rows = self.transaction_repo.get_rollup_monthly_summaries(
+            session, start.date(), month_start(year, m, months).date(), user_id
         )
+        by_month = {row[0].strftime("%Y-%m"): row[1:] for row in rows}
+
+        summaries = []
+        for offset in range(months):
+            key = month_start(year, m, offset).strftime("%Y-%m")
+            income, expense, i_count, e_count = by_month.get(key, (0, 0, 0, 0))
+            summaries.append(
+                {"month": key, **self._summary(income, expense, i_count, e_count)}
+            )
+        return summaries
 
-        net = income - expense
-        count = i_count + e_count
+    def _summary(self, income, expense, i_count, e_count) -> Dict[str, object]:
         return {
             "total_income": income,
             "total_expense": expense,
-            "net_savings": net,
-            "transactions_count": count,
+            "net_savings": income - expense,
+            "transactions_count": i_count + e_count,
         }
 
     def get_timeseries(
-        self, session: Session, granularity, date_from, date_to, user_id: str
+        self,
+        session: Session,
+        granularity,
+        date_from,
+        date_to,
+        user_id: str,
+        by: Optional[str] = None,
+        running: Optional[str] = None,
     ) -> List[Dict]:
-        rows = self.transaction_repo.get_time_series_rows(
-            session, granularity, date_from, date_to, user_id
+        """One point per period of the range, periods without activity as zeros.
+
+        `by` adds a per category or per account breakdown to every point,
+        `running` a cumulative net ("net") or the total balance at the end of
+        each period ("balance"). Either way it's a single query.
+        """
+        start_day, end_day = day_bounds(date_from, date_to)
+        if not start_day or not end_day or start_day >= end_day:
+            return []
+        rows = self.transaction_repo.get_rollup_series(
+            session, granularity, start_day, end_day, user_id, by, running == "balance"
         )
-        return [
-            {
-                "date": period,
-                "income": income,
-                "expense": expense,
-                "net": income - expense,
-            }
-            for period, income, expense in rows
-        ]
+
+        points = []
+        for row in rows:
+            if not points or points[-1]["date"] != row.period:
+                points.append({"date": row.period, "income": Decimal(0), "expense": Decimal(0)})
+                if by:
+                    points[-1]["breakdown"] = []
+            if row.income is None:
+                continue
+            point = points[-1]
+            point["income"] += row.income
+            point["expense"] += row.expense
+            if by:
+                point["breakdown"].append(
+                    {
+                        "id": row.key,
+                        "name": row.name or "Uncategorized",
+                        "income": row.income,
+                        "expense": row.expense,
+                        "net": row.income - row.expense,
+                    }
+                )
+        for point in points:
+            point["net"] = point["income"] - point["expense"]
+
+        if running == "net":
+            total = Decimal(0)
+            for point in points:
+                total += point["net"]
+                point["running"] = total
+        elif running == "balance" and rows:
+            # walk back from the balance at the end of the range
+            balance = rows[0].closing
+            for point in reversed(points):
+                point["running"] = balance
+                balance -= point["net"]
+        return points
 
     def get_account_balances(
         self, session: Session, user_id: str
@@ -408,58 +570,28 @@ class TransactionsService:
         is_expense,
         user_id: str,
     ) -> List[Dict[str, object]]:
-        group_field = {
-            "category": Transaction.category_id,
-            "account": Transaction.account_id,
-            "type": Transaction.type,
-        }[by]
-
-        if group_field == Transaction.type:
+        if by == "type":
             is_expense = None
 
-        results = self.transaction_repo.get_grouped_transaction_totals(
-            session, date_from, date_to, limit, is_expense, user_id, group_field
+        start_day, end_day = day_bounds(date_from, date_to)
+        results = self.transaction_repo.get_rollup_grouped_totals(
+            session, start_day, end_day, limit, is_expense, user_id, by
         )
-        if not results:
-            return []
-
-        total_sum = sum(Decimal(str(total)) for label, total, count in results)
-
-        enriched = []
-        for group_value, total, count in results:
-            name = None
-            if by == "category":
-                category = session.get(Category, group_value)
-                name = category.name if category else "Uncategorized"
-            elif by == "account":
-                account = session.get(Account, group_value)
-                name = account.name if account else "Unknown Account"
-            elif by == "type":
-                name = group_value.value
-
-            percentage = (
-                (Decimal(total) / total_sum * 100).quantize(
-                    Decimal("0.01"), rounding=ROUND_HALF_UP
-                )
-                if total_sum > 0
-                else Decimal("0.00")
-            )
-
-            enriched.append(
-                {
-                    "name": name,
-                    "total": Decimal(total),
-                    "percentage": percentage,
-                    "transaction_count": count,
-                }
-            )
-
-        return enriched
+        return [
+            {
+                "name": name,
+                "total": Decimal(total),
+                "percentage": Decimal(percentage),
+                "transaction_count": count,
+            }
+            for name, total, percentage, count in results
+        ]
 
 
 # FastApi dependency provider
 def get_transaction_service(
     transaction_repo: TransactionRepo = Depends(get_transaction_repo),
     account_repo: AccountRepository = Depends(get_account_repo),
+    user_repo: UserRepository = Depends(get_user_repo),
 ) -> TransactionsService:
-    return TransactionsService(transaction_repo, account_repo)
+    return TransactionsService(transaction_repo, account_repo, user_repo)
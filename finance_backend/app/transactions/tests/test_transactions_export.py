@@ -0,0 +1,119 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import uuid4
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.settings import settings
+from app.db.session import create_async_db_engine
+from app.models.account import Account
+from app.models.category import Category
+from app.models.enums import AccountType, CategoryType, TransactionType
+from app.models.transaction import Transaction
+from app.transactions import repo as repo_module
+from app.transactions.exporter import EXPORT_FIELDS, csv_header, encode_csv, encode_ndjson
+from app.transactions.repo import TransactionRepo
+from app.transactions.schemas import TransactionOut
+from app.transactions.service import TransactionsService
+from app.tests.conftest import create_test_database, create_test_user
+
+
+NULL_POOL = SimpleNamespace(
+    ENVIRONMENT="test", DB_ECHO=False, DB_POOL_PRE_PING=False, DB_USE_NULL_POOL=True
+)
+
+
+def make_row(**values):
+    row = dict.fromkeys(EXPORT_FIELDS)
+    row.update(
+        id=1, account_id=2, amount=Decimal("12.5000"), currency="ETB",
+        type=TransactionType.EXPENSE, is_outgoing=True,
+        occurred_at=datetime(2025, 5, 1, 8, 30, 0, 125), created_at=datetime(2025, 5, 1, 8, 30, 1),
+    )
+    row.update(values)
+    return SimpleNamespace(**row)
+
+
+def test_export_fields_follow_transaction_out():
+    assert EXPORT_FIELDS == tuple(TransactionOut.model_fields)
+
+
+def test_encoders_match_json_serialization():
+    group = uuid4()
+    rows = [
+        make_row(transfer_group_id=group, type=TransactionType.TRANSFER),
+        make_row(id=2, category_id=3, merchant='Shop, "the" one', description="two\nlines"),
+    ]
+    expected = [TransactionOut.model_validate(r, from_attributes=True).model_dump(mode="json") for r in rows]
+
+    lines = encode_ndjson(rows, EXPORT_FIELDS).decode().splitlines()
+    assert [json.loads(line) for line in lines] == expected
+
+    body = (csv_header(EXPORT_FIELDS) + encode_csv(rows, EXPORT_FIELDS)).decode()
+    parsed = list(csv.DictReader(io.StringIO(body)))
+    # csv has no nulls, missing values are empty cells
+    assert parsed == [
+        {field: "" if value is None else str(value) for field, value in row.items()}
+        for row in expected
+    ]
+
+
+def test_export_streams_in_batches(create_test_database, monkeypatch):
+    monkeypatch.setattr(repo_module, "EXPORT_BATCH_SIZE", 2)
+    service = TransactionsService(TransactionRepo(), None)
+
+    def seed(session):
+        user = create_test_user(session, "export@test.com")
+        user_id = user.id
+        account = Account(user_id=user_id, name="Bank", type=AccountType.BANK, currency="ETB", balance=0)
+        category = Category(user_id=user_id, name="Food", type=CategoryType.EXPENSE)
+        session.add_all([account, category])
+        session.flush()
+        for day in range(1, 6):
+            session.add(Transaction(
+                user_id=user_id, account_id=account.id, category_id=category.id,
+                amount=Decimal(day), type=TransactionType.EXPENSE, occurred_at=datetime(2025, 3, day),
+            ))
+        session.commit()
+        return user_id
+
+    async def scenario():
+        engine = create_async_db_engine(settings.TEST_DATABASE_URL, NULL_POOL)
+        try:
+            async with engine.connect() as conn:
+                outer = await conn.begin()
+                # every session the export opens sees the seeded rows, all rolled back after
+                def factory():
+                    return AsyncSession(
+                        bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint"
+                    )
+
+                async with factory() as session:
+                    user_id = await session.run_sync(seed)
+
+                chunks = {}
+                for format in ("csv", "ndjson"):
+                    chunks[format] = [
+                        chunk async for chunk in service.iter_export(
+                            factory, format, None, None, None, datetime(2025, 3, 2), None, user_id
+                        )
+                    ]
+                await outer.rollback()
+                return chunks
+        finally:
+            await engine.dispose()
+
+    chunks = asyncio.run(scenario())
+
+    # header, then 4 matching rows in batches of 2
+    assert len(chunks["csv"]) == 3
+    assert chunks["csv"][0] == csv_header(EXPORT_FIELDS)
+    assert len(chunks["ndjson"]) == 2
+    rows = [json.loads(line) for line in b"".join(chunks["ndjson"]).splitlines()]
+    assert [row["amount"] for row in rows] == ["5.0000", "4.0000", "3.0000", "2.0000"]
+    assert rows[0]["occurred_at"] == "2025-03-05T00:00:00"
@@ -0,0 +1,181 @@
+import io
+import csv
+import json
+import pytest
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from sqlmodel import select
+from app.accounts.repo import AccountRepository
+from app.transactions.exceptions import InvalidImportFile
+from app.transactions.importer import iter_records, iter_staging_rows, CopyStream
+from app.transactions.repo import TransactionRepo
+from app.transactions.service import TransactionsService
+from app.models.transaction import Transaction, TransactionMessage
+from app.models.account import Account
+from app.models.category import Category
+from app.models.enums import AccountType, CategoryType, TransactionType
+from app.models.rollup import TransactionDailyRollup
+from app.tests.conftest import db_session, create_test_database, create_test_user
+
+repo = TransactionRepo()
+
+# Helpers
+def ndjson(*lines):
+    return io.BytesIO("\n".join(lines).encode())
+
+def stage(stream, format):
+    skipped = defaultdict(int)
+    rows = list(iter_staging_rows(iter_records(stream, format), skipped))
+    return rows, dict(skipped)
+
+# Tests
+
+def test_parse_ndjson_counts_rejected_lines():
+    rows, skipped = stage(
+        ndjson(
+            '{"account_id": 1, "amount": "10.5", "currency": "ETB", "type": "EXPENSE", "message_id": "m1"}',
+            "not json",
+            '{"account_id": 1, "amount": "-3", "currency": "ETB", "type": "EXPENSE", "message_id": "m2"}',
+            '{"account_id": 1, "amount": "3", "currency": "ETB", "type": "INCOME"}',
+            "",
+            '{"account_id": "x", "amount": "3", "currency": "ETB", "type": "INCOME", "message_id": "m3"}',
+        ),
+        "ndjson",
+    )
+    assert len(rows) == 1
+    assert rows[0][0] == 1  # line number
+    assert rows[0][3] == Decimal("10.5")
+    assert rows[0][-1] == "m1"
+    assert skipped == {"malformed": 2, "invalid_amount": 1, "no_message_id": 1}
+
+
+def test_parse_csv_treats_empty_cells_as_missing():
+    body = (
+        "account_id,category_id,amount,currency,type,merchant,message_id,occurred_at\n"
+        "1,,25,USD,INCOME,,m1,2025-02-01T10:00:00\n"
+    )
+    rows, skipped = stage(io.BytesIO(body.encode()), "csv")
+    assert skipped == {}
+    assert rows[0][2] is None  # category_id
+    assert rows[0][4] is None  # merchant
+    assert rows[0][8] == "2025-02-01T10:00:00"
+
+
+def test_parse_rejects_rows_the_staging_columns_cannot_hold():
+    def line(**fields):
+        record = {"account_id": 1, "amount": "1", "currency": "ETB", "type": "EXPENSE", "message_id": "ok"}
+        record.update(fields)
+        return json.dumps(record)
+
+    rows, skipped = stage(
+        ndjson(
+            line(category_id=7),
+            line(message_id="m" * 256),
+            line(currency="ETBX"),
+            line(merchant="a\u0000b"),
+            line(amount="1e14"),
+            line(account_id=2**31),
+        ),
+        "ndjson",
+    )
+    assert [row[2] for row in rows] == [7]
+    assert skipped == {"malformed": 5}
+
+
+@pytest.mark.parametrize("body, format", [
+    (b'{"account_id": 1}\n\xff\xfe\n', "ndjson"),
+    (b'account_id,amount\n1,"' + b"9" * 200000 + b'"\n', "csv"),  # past csv's field size limit
+])
+def test_parse_unreadable_file(body, format):
+    with pytest.raises(InvalidImportFile):
+        stage(io.BytesIO(body), format)
+
+
+def test_copy_stream_reads_in_chunks():
+    rows = [(i, "a,b", None) for i in range(1000)]
+    stream = CopyStream(rows)
+
+    chunks = []
+    while True:
+        chunk = stream.read(64)
+        if not chunk:
+            break
+        assert len(chunk) <= 64
+        chunks.append(chunk)
+
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert len(parsed) == 1000
+    assert parsed[3] == ["3", "a,b", ""]
+
+
+def test_copy_and_merge_import(db_session):
+    user = create_test_user(db_session, "import@test.com")
+    acc = Account(user_id=user.id, name="Bank", type=AccountType.BANK, currency="USD", balance=Decimal("100"))
+    db_session.add(acc)
+    db_session.commit()
+    db_session.refresh(acc)
+    db_session.add(Transaction(user_id=user.id, account_id=acc.id, amount=Decimal("1"), type="INCOME", message_id="old"))
+    db_session.add(TransactionMessage(user_id=user.id, message_id="old"))
+    food = Category(user_id=user.id, name="Food", type=CategoryType.EXPENSE)
+    other = create_test_user(db_session, "import-other@test.com")
+    foreign = Category(user_id=other.id, name="Food", type=CategoryType.EXPENSE)
+    db_session.add_all([food, foreign])
+    db_session.commit()
+
+    def row(line_no, mid, amount, type="EXPENSE", account_id=acc.id, category_id=None):
+        return (
+            line_no, account_id, category_id, Decimal(amount), None, "USD", type, None,
+            "2025-01-01T00:00:00", mid,
+        )
+
+    staged = repo.copy_into_import_staging(
+        db_session,
+        CopyStream([
+            row(1, "a", "30", category_id=food.id),
+            row(2, "b", "5", "INCOME"),
+            row(3, "a", "30"),                  # repeated in the file
+            row(4, "old", "1"),                 # already stored
+            row(5, "c", "1", account_id=0),     # not the user's account
+            row(6, "d", "1", category_id=foreign.id),  # not the user's category
+        ]),
+    )
+    assert staged == 6
+
+    result = repo.merge_import_staging(db_session, user.id)
+    assert result == {
+        "inserted": 2, "overdrawn": 0, "duplicate": 2, "invalid_account": 1, "invalid_category": 1,
+        "insufficient_funds": 0,
+    }
+
+    db_session.refresh(acc)
+    assert acc.balance == Decimal("75")
+    stored = db_session.exec(
+        select(Transaction.message_id, Transaction.category_id).where(Transaction.user_id == user.id)
+    ).all()
+    assert sorted(stored, key=lambda r: r[0]) == [("a", food.id), ("b", None), ("old", None)]
+    # the merged rows are rolled up in the same statement
+    rollups = db_session.exec(
+        select(
+            TransactionDailyRollup.type, TransactionDailyRollup.category_id,
+            TransactionDailyRollup.total, TransactionDailyRollup.count,
+        )
+        .where(TransactionDailyRollup.user_id == user.id)
+        .order_by(TransactionDailyRollup.type)
+    ).all()
+    assert [tuple(r) for r in rollups] == [
+        (TransactionType.INCOME, None, Decimal("5"), 1), (TransactionType.EXPENSE, food.id, Decimal("30"), 1),
+    ]
+
+
+def test_import_of_an_unreadable_file_rolls_back(db_session):
+    user_id = create_test_user(db_session, "import-binary@test.com").id
+    service = TransactionsService(repo, AccountRepository())
+    body = io.BytesIO(
+        b'{"account_id": 1, "amount": "1", "currency": "ETB", "type": "INCOME", "message_id": "m"}\n'
+        + b"\xff" * 70000
+    )
+    with pytest.raises(InvalidImportFile):
+        service.import_transactions(db_session, body, "ndjson", user_id)
+    # the session is usable again
+    assert db_session.exec(select(Transaction).where(Transaction.user_id == user_id)).all() == []
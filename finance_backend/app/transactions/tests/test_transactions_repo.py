@@ -1,13 +1,20 @@
+import threading
+import time
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
-from app.transactions.repo import TransactionRepo
+from uuid import uuid4
+from sqlmodel import Session, select
+from app.transactions.repo import TransactionRepo, LIST_COLUMNS
+from app.transactions.schemas import TransactionOut
 from app.models.transaction import Transaction
 from app.models.enums import TransactionType, CategoryType, AccountType
 from app.models.user import User
 from app.models.account import Account
 from app.models.category import Category
-from app.tests.conftest import db_session, create_test_database, create_test_user
+from app.models.rollup import TransactionDailyRollup
+from app.tests.conftest import db_session, create_test_database, create_test_user, test_engine
 
 # no layer below so nothing to mock just instanciate the repo
 repo = TransactionRepo()
@@ -69,6 +76,19 @@ def test_list_transactions_filtering(db_session):
     assert count == 1
     assert txns[0].id == t2.id
 
+def test_list_reads_plain_rows(db_session):
+    user, acc, cat = create_setup(db_session)
+    create_txn(db_session, user.id, acc.id, cat.id, 50, TransactionType.EXPENSE)
+    user_id = user.id
+    db_session.expunge_all()
+
+    rows, total = repo.list_user_transactions(db_session, user_id, 10, 0, None, None, None, None, None)
+    assert total == 1
+    # exactly the response columns, no ORM instance in the session
+    assert tuple(c.key for c in LIST_COLUMNS) == tuple(TransactionOut.model_fields)
+    assert rows[0].amount == Decimal("50") and not isinstance(rows[0], Transaction)
+    assert len(db_session.identity_map) == 0
+
 def test_get_transfer_group(db_session):
     user, acc, _ = create_setup(db_session)
     
@@ -88,39 +108,249 @@ def test_get_transfer_group(db_session):
     assert t_out.id in ids
     assert t_in.id in ids
 
-def test_get_transaction_summary_sum(db_session):
-    user, acc, cat = create_setup(db_session)
-    
-    # Add 3 expenses of 20 each = 60 total
-    create_txn(db_session, user.id, acc.id, cat.id, 20, TransactionType.EXPENSE, date=datetime(2025, 11, 5))
-    create_txn(db_session, user.id, acc.id, cat.id, 20, TransactionType.EXPENSE, date=datetime(2025, 11, 10))
-    create_txn(db_session, user.id, acc.id, cat.id, 20, TransactionType.EXPENSE, date=datetime(2025, 11, 15))
-    
-    # Filter for Nov 2025
-    start = datetime(2025, 11, 1)
-    end = datetime(2025, 11, 30)
-    
-    total = repo.get_transaction_summary_for_type(db_session, TransactionType.EXPENSE, start, end, user.id)
-    assert total == Decimal("60.00")
+def test_create_and_delete_transfer_in_one_statement(db_session):
+    user, acc, _ = create_setup(db_session)
+    other = Account(user_id=user.id, name="Cash", type=AccountType.CASH, currency="USD", balance=0)
+    db_session.add(other)
+    db_session.commit()
+    group_id, when = uuid4(), datetime(2025, 3, 4, 10)
 
-def test_get_grouped_stats(db_session):
-    #Test the 'Group By' logic for the pie charts.
-    user, acc, cat1 = create_setup(db_session)
-    
-    cat2 = Category(user_id=user.id, name="Transport", type=CategoryType.EXPENSE)
-    db_session.add(cat2)
+    out_leg, in_leg = repo.create_transfer(
+        db_session, user.id, group_id, acc.id, other.id, Decimal("400"), "USD", "rent", when, when
+    )
+    assert (out_leg.account_id, out_leg.is_outgoing, in_leg.account_id, in_leg.is_outgoing) == (acc.id, True, other.id, False)
+    assert out_leg.transfer_group_id == group_id and out_leg.type == TransactionType.TRANSFER
+    balances = lambda: db_session.exec(select(Account.balance).where(Account.user_id == user.id).order_by(Account.id)).all()
+    assert balances() == [Decimal("600"), Decimal("400")]
+    rollups = db_session.exec(select(TransactionDailyRollup.total).where(TransactionDailyRollup.user_id == user.id)).all()
+    assert rollups == [Decimal("400"), Decimal("400")]
+
+    # more than the sender holds: nothing written
+    assert repo.create_transfer(
+        db_session, user.id, uuid4(), acc.id, other.id, Decimal("601"), "USD", None, when, when
+    ) == []
+    assert balances() == [Decimal("600"), Decimal("400")]
+
+    # the receiver spent part of it, the transfer can't be reverted
+    db_session.exec(select(Account).where(Account.id == other.id)).one().balance = Decimal("300")
+    db_session.flush()
+    assert repo.delete_transfer(db_session, group_id, user.id) == (2, 0)
+
+    db_session.exec(select(Account).where(Account.id == other.id)).one().balance = Decimal("400")
+    db_session.flush()
+    assert repo.delete_transfer(db_session, group_id, user.id) == (2, 2)
+    db_session.expire_all()
+    assert balances() == [Decimal("1000"), Decimal("0")]
+    assert repo.get_transfer_transactions(db_session, group_id, user.id) == []
+    rollups = db_session.exec(select(TransactionDailyRollup.count).where(TransactionDailyRollup.user_id == user.id)).all()
+    assert rollups == [0, 0]
+
+def test_delete_legacy_transfer_within_one_account(db_session):
+    # older clients could send both legs to the same account
+    user, acc, _ = create_setup(db_session)
+    group_id = uuid4()
+    for is_outgoing in (True, False):
+        db_session.add(Transaction(
+            user_id=user.id, account_id=acc.id, amount=Decimal("50"), currency="USD",
+            type=TransactionType.TRANSFER, transfer_group_id=group_id, is_outgoing=is_outgoing,
+        ))
     db_session.commit()
-    
-    # 100 Food, 50 Transport
-    create_txn(db_session, user.id, acc.id, cat1.id, 100, TransactionType.EXPENSE)
-    create_txn(db_session, user.id, acc.id, cat2.id, 50, TransactionType.EXPENSE)
-    
-    results = repo.get_grouped_transaction_totals(db_session, user.id, Transaction.category_id)
-    
-    # Results is list of tuples (category_id, total_amount)
-    assert len(results) == 2
-    
-    # Verify mapping
-    res_dict = {r[0]: r[1] for r in results}
-    assert res_dict[cat1.id] == 100
-    assert res_dict[cat2.id] == 50
\ No newline at end of file
+
+    assert repo.delete_transfer(db_session, group_id, user.id) == (2, 2)
+    db_session.expire_all()
+    assert db_session.get(Account, acc.id).balance == Decimal("1000")
+    assert repo.get_transfer_transactions(db_session, group_id, user.id) == []
+
+
+def test_concurrent_opposite_transfers_do_not_deadlock():
+    with Session(test_engine) as session:
+        user = create_test_user(session, "transfer-stress@test.com")
+        a = Account(user_id=user.id, name="A", type=AccountType.BANK, currency="USD", balance=1000)
+        b = Account(user_id=user.id, name="B", type=AccountType.BANK, currency="USD", balance=1000)
+        session.add_all([a, b])
+        session.commit()
+        user_id, a_id, b_id = user.id, a.id, b.id
+
+    barrier = threading.Barrier(8)
+
+    def transfer(i):
+        from_id, to_id = (a_id, b_id) if i % 2 else (b_id, a_id)
+        latencies = []
+        barrier.wait()
+        for _ in range(25):
+            start = time.perf_counter()
+            with Session(test_engine) as session:
+                now = datetime.now()
+                legs = repo.create_transfer(
+                    session, user_id, uuid4(), from_id, to_id, Decimal("7"), "USD", None, now, now
+                )
+                session.commit()
+            assert len(legs) == 2
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    try:
+        # a deadlock would surface here as an OperationalError from Postgres
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            latencies = sorted(l for ls in pool.map(transfer, range(8)) for l in ls)
+        with Session(test_engine) as session:
+            balances = session.exec(select(Account.balance).where(Account.user_id == user_id)).all()
+            legs = session.exec(select(Transaction.id).where(Transaction.user_id == user_id)).all()
+        # money is conserved and every transfer landed
+        assert sum(balances) == 2000
+        assert sorted(balances) == [1000, 1000]
+        assert len(legs) == 8 * 25 * 2
+        # each transfer waits at most for the ones queued ahead of it
+        assert latencies[int(len(latencies) * 0.99)] < 2.0
+    finally:
+        with Session(test_engine) as session:
+            session.delete(session.get(User, user_id))
+            session.commit()
+
+
+def test_list_transactions_keyset_cursor(db_session):
+    user, acc, cat = create_setup(db_session)
+
+    same_day = datetime(2025, 10, 1)
+    t1 = create_txn(db_session, user.id, acc.id, cat.id, 10, TransactionType.EXPENSE, date=same_day)
+    t2 = create_txn(db_session, user.id, acc.id, cat.id, 20, TransactionType.EXPENSE, date=same_day)
+    t3 = create_txn(db_session, user.id, acc.id, cat.id, 30, TransactionType.EXPENSE, date=datetime(2025, 9, 1))
+
+    # First page: newest first, ties broken by id desc
+    page1, total = repo.list_user_transactions(db_session, user.id, 2, 0, None, None, None, None, None)
+    assert total == 3
+    assert [t.id for t in page1] == [t2.id, t1.id]
+
+    # Second page seeks past the last row of the first page
+    last = page1[-1]
+    page2, _ = repo.list_user_transactions(
+        db_session, user.id, 2, 0, None, None, None, None, None,
+        cursor=(last.occurred_at, last.id),
+    )
+    assert [t.id for t in page2] == [t3.id]
+
+    report_page = repo.list_user_transactions_for_report(
+        db_session, None, None, None, None, None, 1, 2, user.id,
+        cursor=(last.occurred_at, last.id),
+    )
+    assert [t.id for t in report_page] == [t3.id]
+
+
+def test_list_transactions_count_modes(db_session):
+    user, acc, cat = create_setup(db_session)
+    for day in range(1, 4):
+        create_txn(db_session, user.id, acc.id, cat.id, 10, TransactionType.EXPENSE, date=datetime(2025, 3, day))
+
+    # exact total comes back through the window count, even for a partial page
+    txns, total = repo.list_user_transactions(db_session, user.id, 2, 0, None, None, None, None, None)
+    assert len(txns) == 2
+    assert total == 3
+
+    # paging past the end still reports the exact total
+    txns, total = repo.list_user_transactions(db_session, user.id, 2, 10, None, None, None, None, None)
+    assert txns == []
+    assert total == 3
+
+    txns, total = repo.list_user_transactions(
+        db_session, user.id, 2, 0, None, None, None, None, None, count="none"
+    )
+    assert len(txns) == 2
+    assert total is None
+
+    txns, total = repo.list_user_transactions(
+        db_session, user.id, 2, 0, None, None, None, None, None, count="estimated"
+    )
+    assert len(txns) == 2
+    assert isinstance(total, int)
+
+
+def test_insert_ignoring_duplicates(db_session):
+    user, acc, _ = create_setup(db_session)
+    row = {
+        "user_id": user.id, "account_id": acc.id, "amount": Decimal("12.50"),
+        "currency": "USD", "type": TransactionType.EXPENSE,
+        "occurred_at": datetime(2025, 4, 1), "created_at": datetime(2025, 4, 1),
+        "message_id": "sms-1", "merchant": None, "description": None,
+    }
+
+    inserted = repo.insert_ignoring_duplicates(db_session, [row, {**row, "message_id": "sms-2"}])
+    assert len(inserted) == 2
+    assert inserted[0].account_id == acc.id
+
+    # sms-1 is already stored, only sms-3 comes back
+    inserted = repo.insert_ignoring_duplicates(db_session, [row, {**row, "message_id": "sms-3"}])
+    assert len(inserted) == 1
+    assert inserted[0].amount == Decimal("12.50")
+
+    # deleting a transaction frees its message id, moving it to another month doesn't
+    sms_1 = db_session.exec(select(Transaction).where(Transaction.message_id == "sms-1")).one()
+    sms_2 = db_session.exec(select(Transaction).where(Transaction.message_id == "sms-2")).one()
+    sms_2.occurred_at = datetime(2025, 7, 1)
+    db_session.flush()
+    repo.delete_transaction(db_session, sms_1)
+    assert repo.claim_message_ids(db_session, user.id, ["sms-1", "sms-2"]) == ["sms-1"]
+    assert sorted(repo.get_transaction_with_message_id(db_session, ["sms-1", "sms-2", "sms-4"], user.id)) == [
+        "sms-1", "sms-2",
+    ]
+
+
+def test_rollup_transactions_and_readers(db_session):
+    from datetime import date
+
+    user, acc, cat = create_setup(db_session)
+    a = create_txn(db_session, user.id, acc.id, cat.id, "40", TransactionType.EXPENSE, datetime(2025, 3, 1, 8))
+    b = create_txn(db_session, user.id, acc.id, cat.id, "60", TransactionType.EXPENSE, datetime(2025, 3, 1, 20))
+    c = create_txn(db_session, user.id, acc.id, None, "500", TransactionType.INCOME, datetime(2025, 3, 15))
+    repo.rollup_transactions(db_session, [a.id, b.id, c.id])
+
+    summary = repo.get_rollup_summary(db_session, date(2025, 3, 1), date(2025, 4, 1), user.id)
+    assert tuple(summary) == (Decimal("500"), Decimal("100"), 1, 2)
+    # the range excludes end_day
+    summary = repo.get_rollup_summary(db_session, date(2025, 3, 2), date(2025, 3, 15), user.id)
+    assert tuple(summary) == (0, 0, 0, 0)
+
+    months = repo.get_rollup_monthly_summaries(db_session, date(2025, 1, 1), date(2026, 1, 1), user.id)
+    assert [tuple(m)[1:] for m in months] == [(Decimal("500"), Decimal("100"), 1, 2)]
+    assert months[0].month.month == 3
+
+    by_category = repo.get_rollup_grouped_totals(db_session, None, None, 10, True, user.id, "category")
+    assert [tuple(r) for r in by_category] == [("Food", Decimal("100"), Decimal("100.00"), 2)]
+    by_account = repo.get_rollup_grouped_totals(db_session, None, None, 10, False, user.id, "account")
+    assert [tuple(r) for r in by_account] == [("Bank", Decimal("600"), Decimal("100.00"), 3)]
+    by_category = repo.get_rollup_grouped_totals(db_session, None, None, 10, False, user.id, "category")
+    assert [(r.name, r[2]) for r in by_category] == [("Uncategorized", Decimal("83.33")), ("Food", Decimal("16.67"))]
+
+    # removing a row takes it back out of its bucket, empty buckets are not reported
+    repo.rollup_transactions(db_session, [a.id, b.id], -1)
+    assert repo.get_rollup_grouped_totals(db_session, None, None, 10, True, user.id, "category") == []
+    by_type = repo.get_rollup_grouped_totals(db_session, None, None, 10, None, user.id, "type")
+    assert [tuple(r) for r in by_type] == [("INCOME", Decimal("500"), Decimal("100.00"), 1)]
+
+
+def test_rollup_series_fills_gaps_and_pivots(db_session):
+    from datetime import date
+
+    user, acc, cat = create_setup(db_session)
+    a = create_txn(db_session, user.id, acc.id, cat.id, "40", TransactionType.EXPENSE, datetime(2025, 1, 10))
+    b = create_txn(db_session, user.id, acc.id, None, "500", TransactionType.INCOME, datetime(2025, 1, 12))
+    c = create_txn(db_session, user.id, acc.id, cat.id, "10", TransactionType.EXPENSE, datetime(2025, 3, 2))
+    # after the range, the closing balance takes it back out
+    d = create_txn(db_session, user.id, acc.id, cat.id, "5", TransactionType.EXPENSE, datetime(2025, 4, 2))
+    repo.rollup_transactions(db_session, [a.id, b.id, c.id, d.id])
+
+    rows = repo.get_rollup_series(db_session, "month", date(2025, 1, 1), date(2025, 4, 1), user.id)
+    assert [(r.period.month, r.income, r.expense) for r in rows] == [
+        (1, Decimal("500"), Decimal("40")), (2, None, None), (3, Decimal("0"), Decimal("10")),
+    ]
+
+    rows = repo.get_rollup_series(
+        db_session, "month", date(2025, 1, 1), date(2025, 4, 1), user.id, "category", True
+    )
+    assert [(r.period.month, r.key, r.name) for r in rows] == [
+        (1, cat.id, "Food"), (1, None, None), (2, None, None), (3, cat.id, "Food"),
+    ]
+    # create_txn doesn't move balances, so the stored 1000 stands for today
+    assert {r.closing for r in rows} == {Decimal("1005")}
+
+    days = repo.get_rollup_series(db_session, "day", date(2025, 1, 10), date(2025, 1, 13), user.id)
+    assert [r.period.day for r in days] == [10, 11, 12]
@@ -1,13 +1,21 @@
 import pytest
 from unittest.mock import Mock
 from fastapi.testclient import TestClient
-from uuid import UUID
+from uuid import UUID, uuid4
 from decimal import Decimal
+from datetime import datetime
 from finance_backend.app.main import app
 from app.transactions.service import TransactionsService, get_transaction_service
+from app.auth.repo import UserRepository, get_user_repo
+from app.core.cache import result_cache
+from app.models.enums import Provider
 from app.models.transaction import Transaction, TransactionType
-from app.transactions.exceptions import InsufficientBalance, InvalidAmount
-from app.tests.conftest import override_get_current_user
+from app.models.user import User
+from app.transactions.exceptions import (
+    DuplicateTransaction, InsufficientBalance, InvalidAmount, InvalidCursor, InvalidImportFile,
+)
+from app.transactions.schemas import TransactionOut
+from app.tests.conftest import async_client, create_test_database, db_session, override_get_current_user
 
 
 # demo uid
@@ -26,8 +34,15 @@ def client():
 @pytest.fixture
 def client_with_mock(client, mock_service):
     app.dependency_overrides[get_transaction_service] = lambda: mock_service
+    # conditional GETs read the data version, kept off the database here
+    user_repo = Mock(spec=UserRepository)
+    user_repo.get_data_version.return_value = 0
+    app.dependency_overrides[get_user_repo] = lambda: user_repo
     yield client
     app.dependency_overrides.pop(get_transaction_service, None)
+    app.dependency_overrides.pop(get_user_repo, None)
+    # the mocked user is always at data version 0
+    result_cache.clear()
 
 # Tests 
 
@@ -61,6 +76,15 @@ def test_create_transaction_insufficient_balance(client_with_mock, mock_service,
     assert response.status_code == 400
     assert response.json()["detail"]["code"] == "INSUFFICIENT_BALANCE"
 
+def test_create_transaction_duplicate_message(client_with_mock, mock_service, override_get_current_user):
+    mock_service.create_income_expense_transaction.side_effect = DuplicateTransaction("seen")
+    payload = {"account_id": 1, "amount": 100, "currency": "ETB", "type": "EXPENSE", "message_id": "m1"}
+
+    response = client_with_mock.post("v1/transactions/", json=payload)
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["code"] == "DUPLICATE_TRANSACTION"
+
 def test_create_transfer_201(client_with_mock, mock_service, override_get_current_user):
     payload = {
         "account_id": 1,
@@ -95,10 +119,36 @@ def test_get_summary(client_with_mock, mock_service, override_get_current_user):
     assert response.status_code == 200
     assert response.json()["net_savings"] == "500"
 
+def test_get_monthly_summaries(client_with_mock, mock_service, override_get_current_user):
+    mock_service.get_monthly_summaries.return_value = [
+        {
+            "month": "2025-11",
+            "total_income": Decimal("1000"),
+            "total_expense": Decimal("500"),
+            "net_savings": Decimal("500"),
+            "transactions_count": 3,
+        }
+    ]
+
+    response = client_with_mock.get("/v1/transactions/summary/months?month=2025-11&months=1")
+    assert response.status_code == 200
+    assert response.json()[0]["month"] == "2025-11"
+    assert mock_service.get_monthly_summaries.call_args.args[1:3] == ("2025-11", 1)
+
+    response = client_with_mock.get("/v1/transactions/summary/months?month=2025-11&months=100")
+    assert response.status_code == 422
+
 def test_get_summary_invalid_date_format(client_with_mock, mock_service, override_get_current_user):
     response = client_with_mock.get("v1/transactions/summary?month=2025/11") # Wrong format
     assert response.status_code == 422 # Validation Error / unprocesible content
 
+@pytest.mark.parametrize("month", ["2025-13", "2025-00"])
+def test_summary_rejects_month_out_of_range(client_with_mock, mock_service, override_get_current_user, month):
+    assert client_with_mock.get(f"/v1/transactions/summary?month={month}").status_code == 422
+    response = client_with_mock.get(f"/v1/transactions/summary/months?month={month}")
+    assert response.status_code == 422
+    mock_service.get_monthly_summaries.assert_not_called()
+
 def test_delete_transfer_transaction(client_with_mock, mock_service, override_get_current_user):
     group_id = "123e4567-e89b-12d3-a456-426614174000"
     mock_service.delete_transfer_transaction.return_value = None
@@ -106,4 +156,196 @@ def test_delete_transfer_transaction(client_with_mock, mock_service, override_ge
     response = client_with_mock.delete(f"v1/transactions/transfer/{group_id}")
     
     assert response.status_code == 204 # No Content
-    mock_service.delete_transfer_transaction.assert_called_once()
\ No newline at end of file
+    mock_service.delete_transfer_transaction.assert_called_once()
+
+def test_list_transactions_invalid_cursor(client_with_mock, mock_service, override_get_current_user):
+    mock_service.get_user_transactions.side_effect = InvalidCursor("invalid pagination cursor")
+
+    response = client_with_mock.get("v1/transactions/?cursor=not-a-cursor")
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["code"] == "INVALID_CURSOR"
+
+
+def test_import_unreadable_file(client_with_mock, mock_service, override_get_current_user):
+    mock_service.import_transactions.side_effect = InvalidImportFile("the file is not valid UTF-8")
+
+    response = client_with_mock.post("v1/transactions/import", files={"file": ("t.ndjson", b"\xff")})
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["code"] == "INVALID_IMPORT_FILE"
+
+
+def test_list_transactions_without_total(client_with_mock, mock_service, override_get_current_user):
+    mock_service.get_user_transactions.return_value = ([], None, None)
+
+    response = client_with_mock.get("v1/transactions/?count=none")
+
+    assert response.status_code == 200
+    assert response.json()["total"] is None
+    assert response.json()["total_exact"] is False
+    assert mock_service.get_user_transactions.call_args.args[-1] == "none"
+
+
+def test_list_transactions_rejects_unknown_count(client_with_mock, mock_service, override_get_current_user):
+    response = client_with_mock.get("v1/transactions/?count=foo")
+
+    assert response.status_code == 422
+    mock_service.get_user_transactions.assert_not_called()
+
+
+def test_list_bodies_match_pydantic_serialization(client_with_mock, mock_service, override_get_current_user):
+    rows = [
+        Transaction(
+            id=1, account_id=1, amount=Decimal("12.5000"), currency="ETB", type=TransactionType.TRANSFER,
+            is_outgoing=True, transfer_group_id=uuid4(), occurred_at=datetime(2025, 5, 1, 8, 30, 0, 125),
+            created_at=datetime(2025, 5, 1, 8, 30, 1),
+        ),
+        Transaction(
+            id=2, account_id=1, category_id=3, amount=Decimal("7"), merchant="Shop", currency="ETB",
+            type=TransactionType.EXPENSE, occurred_at=datetime(2025, 4, 30), created_at=datetime(2025, 4, 30),
+        ),
+    ]
+    expected = [TransactionOut.model_validate(t).model_dump(mode="json") for t in rows]
+    mock_service.get_user_transactions.return_value = (rows, 2, "next")
+    mock_service.get_user_transactions_for_report.return_value = (rows, "next")
+
+    body = client_with_mock.get("v1/transactions/").json()
+    assert body == {"transactions": expected, "total": 2, "total_exact": True, "next_cursor": "next"}
+
+    response = client_with_mock.get("v1/transactions/list")
+    assert response.json() == expected
+    assert response.headers["X-Next-Cursor"] == "next"
+
+
+def test_export_streams_service_chunks(client_with_mock, mock_service, override_get_current_user):
+    async def chunks(*args):
+        yield b"id,amount\r\n"
+        yield b"1,12.5000\r\n"
+
+    mock_service.iter_export.side_effect = chunks
+
+    response = client_with_mock.get("v1/transactions/export?format=csv&account_id=4")
+
+    assert response.status_code == 200
+    assert response.text == "id,amount\r\n1,12.5000\r\n"
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="transactions.csv"'
+    assert mock_service.iter_export.call_args.args[1:4] == ("csv", 4, None)
+
+    assert client_with_mock.get("v1/transactions/export?format=xml").status_code == 422
+
+
+def test_timeseries_options(client_with_mock, mock_service, override_get_current_user):
+    point = {"date": datetime(2025, 1, 1), "income": Decimal("1"), "expense": Decimal("0"), "net": Decimal("1")}
+    mock_service.get_timeseries.return_value = [point]
+    url = "v1/transactions/timeseries?date_from=2025-01-01T00:00:00&date_to=2025-02-01T00:00:00"
+
+    # the plain series keeps its original shape
+    assert set(client_with_mock.get(url).json()[0]) == {"date", "income", "expense", "net"}
+
+    response = client_with_mock.get(url + "&granularity=month&by=account&running=balance")
+    assert response.status_code == 200
+    assert mock_service.get_timeseries.call_args.args[1:] == (
+        "month", datetime(2025, 1, 1), datetime(2025, 2, 1), uid, "account", "balance",
+    )
+
+    assert client_with_mock.get(url + "&granularity=year").status_code == 422
+    assert client_with_mock.get(url + "&by=merchant").status_code == 422
+
+
+# Through asyncpg: the real service and database behind the same routes
+
+@pytest.fixture
+def asyncpg_api(async_client, override_get_current_user):
+    def _add_user(session):
+        session.add(User(id=uid, email="fake@user.com", provider=Provider.LOCAL, is_verified=True))
+        session.commit()
+
+    async_client.run_sync(_add_user)
+    return async_client
+
+def new_account(api, name):
+    response = api.post("v1/accounts/", json={"name": name, "type": "BANK", "currency": "USD"})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def add_transaction(api, account_id, amount, occurred_at, type="INCOME"):
+    payload = {
+        "account_id": account_id, "amount": amount, "currency": "USD", "type": type, "occurred_at": occurred_at,
+    }
+    response = api.post("v1/transactions/", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+def balance(api, account_id):
+    return Decimal(api.get(f"v1/accounts/{account_id}").json()["balance"])
+
+def test_list_transactions_on_asyncpg(asyncpg_api):
+    account_id = new_account(asyncpg_api, "Bank")
+    # aware dates are stored as UTC, like psycopg2 stores them
+    for day, amount in ((5, "10"), (6, "20"), (7, "30")):
+        add_transaction(asyncpg_api, account_id, amount, f"2025-01-{day:02}T10:00:00+03:00")
+
+    response = asyncpg_api.get("v1/transactions/?limit=2")
+    assert response.status_code == 200
+    page = response.json()
+    assert page["total"] == 3
+    assert [t["occurred_at"] for t in page["transactions"]] == ["2025-01-07T07:00:00", "2025-01-06T07:00:00"]
+
+    rest = asyncpg_api.get(f"v1/transactions/?limit=2&cursor={page['next_cursor']}").json()
+    assert [Decimal(t["amount"]) for t in rest["transactions"]] == [Decimal("10")]
+    assert rest["next_cursor"] is None
+
+    response = asyncpg_api.get("v1/transactions/list?date_from=2025-01-06T00:00:00&per_page=1")
+    assert [Decimal(t["amount"]) for t in response.json()] == [Decimal("30")]
+    assert "X-Next-Cursor" in response.headers
+
+def test_transfer_on_asyncpg(asyncpg_api):
+    from_id, to_id = new_account(asyncpg_api, "Bank"), new_account(asyncpg_api, "Cash")
+    add_transaction(asyncpg_api, from_id, "50", "2025-01-01T09:00:00")
+    transfer = {"account_id": from_id, "to_account_id": to_id, "currency": "USD", "type": "TRANSFER"}
+
+    response = asyncpg_api.post("v1/transactions/transfer", json={**transfer, "amount": "20"})
+    assert response.status_code == 201, response.text
+    assert (balance(asyncpg_api, from_id), balance(asyncpg_api, to_id)) == (Decimal("30"), Decimal("20"))
+
+    response = asyncpg_api.post("v1/transactions/transfer", json={**transfer, "amount": "100"})
+    assert response.status_code == 400
+    assert response.json()["detail"]["code"] == "INSUFFICIENT_BALANCE"
+
+    group_id = asyncpg_api.get("v1/transactions/?type=TRANSFER").json()["transactions"][0]["transfer_group_id"]
+    assert asyncpg_api.delete(f"v1/transactions/transfer/{group_id}").status_code == 204
+    assert (balance(asyncpg_api, from_id), balance(asyncpg_api, to_id)) == (Decimal("50"), Decimal("0"))
+
+def test_bulk_create_keeps_categories_on_asyncpg(asyncpg_api):
+    account_id = new_account(asyncpg_api, "Bank")
+    category = asyncpg_api.post("v1/categories/", json={"name": "Salary", "type": "INCOME"}).json()
+    row = {"account_id": account_id, "amount": "10", "currency": "USD", "type": "INCOME"}
+    payload = {"transactions": [
+        {**row, "category_id": category["id"], "message_id": "sms-1"},
+        {**row, "message_id": "sms-2"},
+    ]}
+
+    response = asyncpg_api.post("v1/transactions/bulk", json=payload)
+    assert response.status_code == 201, response.text
+    assert response.json()["inserted"] == 2
+    listed = asyncpg_api.get("v1/transactions/").json()["transactions"]
+    assert sorted(t["category_id"] or 0 for t in listed) == [0, category["id"]]
+
+def test_timeseries_on_asyncpg(asyncpg_api):
+    account_id = new_account(asyncpg_api, "Bank")
+    add_transaction(asyncpg_api, account_id, "100", "2025-01-01T09:00:00")
+    add_transaction(asyncpg_api, account_id, "40", "2025-01-03T09:00:00", type="EXPENSE")
+
+    url = "v1/transactions/timeseries?date_from=2025-01-01T00:00:00&date_to=2025-01-04T00:00:00"
+    response = asyncpg_api.get(url + "&running=balance")
+    assert response.status_code == 200, response.text
+    assert [(p["date"], Decimal(p["net"]), Decimal(p["running"])) for p in response.json()] == [
+        ("2025-01-01T00:00:00", Decimal("100"), Decimal("100")),
+        ("2025-01-02T00:00:00", Decimal("0"), Decimal("100")),
+        ("2025-01-03T00:00:00", Decimal("-40"), Decimal("60")),
+    ]
+
+    points = asyncpg_api.get(url + "&granularity=month&by=account").json()
+    assert [(p["date"], p["breakdown"][0]["id"]) for p in points] == [("2025-01-01T00:00:00", account_id)]
@@ -1,20 +1,26 @@
+import io
 import pytest
 from unittest.mock import Mock, MagicMock, call
 from decimal import Decimal
 from uuid import uuid4, UUID
-from app.transactions.service import TransactionsService
+from datetime import datetime, date
+from app.transactions.service import TransactionsService, day_bounds, month_start
 from app.transactions.repo import TransactionRepo
 from app.accounts.repo import AccountRepository
 from app.models.transaction import Transaction, TransactionType
 from app.models.account import Account
 from app.models.category import Category
-from app.transactions.schemas import TransferTransactionCreate, TransactionPatch
+from app.transactions.schemas import TransferTransactionCreate, TransactionPatch, TransactionCreate
 from app.transactions.exceptions import (
     InsufficientBalance, 
     InvalidAmount, 
     CanNotUpdateTransaction,
-    InvalidTransferTransaction
+    InvalidTransferTransaction,
+    InvalidCursor,
+    DuplicateTransaction,
 )
+from app.transactions.pagination import decode_cursor
+from app.accounts.exceptions import AccountNotFound
 
 # demo uid
 uid = UUID(int=0x12345678123456781234567812345678)
@@ -40,111 +46,352 @@ def mock_session():
 
 def test_create_expense_success(service, mock_txn_repo, mock_acc_repo, mock_session):
     user_id = uid
-    # Account has 100
-    mock_account = Account(id=1, balance=Decimal("100.00"))
-    mock_acc_repo.get_account_for_user.return_value = mock_account
+    # the balance covers the amount
+    mock_acc_repo.change_balance.return_value = Decimal("60.00")
     mock_txn_repo.save_transaction.side_effect = lambda s, t: t
     
     data = {"account_id": 1, "amount": Decimal("40.00"), "type": TransactionType.EXPENSE}
     
     service.create_income_expense_transaction(mock_session, data, user_id)
     
-    # Logic: Balance should decrease
-    assert mock_account.balance == Decimal("60.00")
+    # Logic: one conditional debit, the account is never loaded
+    mock_acc_repo.change_balance.assert_called_once_with(mock_session, 1, user_id, Decimal("-40.00"))
+    mock_acc_repo.get_account_for_user.assert_not_called()
     mock_session.commit.assert_called_once()
 
 def test_create_expense_insufficient_funds(service, mock_txn_repo, mock_acc_repo, mock_session):
-    mock_account = Account(id=1, balance=Decimal("10.00"))
-    mock_acc_repo.get_account_for_user.return_value = mock_account
+    # the conditional update matched no row, the account exists
+    mock_acc_repo.change_balance.return_value = None
+    mock_acc_repo.get_account_for_user.return_value = Account(id=1, balance=Decimal("10.00"))
     
     data = {"account_id": 1, "amount": Decimal("50.00"), "type": TransactionType.EXPENSE}
     
     with pytest.raises(InsufficientBalance):
         service.create_income_expense_transaction(mock_session, data, 1)
     
-    # Balance should not change
-    assert mock_account.balance == Decimal("10.00")
+    # nothing was written
+    mock_txn_repo.save_transaction.assert_not_called()
+    mock_session.commit.assert_not_called()
+
+def test_create_transaction_unknown_account(service, mock_txn_repo, mock_acc_repo, mock_session):
+    mock_acc_repo.change_balance.return_value = None
+    mock_acc_repo.get_account_for_user.return_value = None
+
+    data = {"account_id": 9, "amount": Decimal("5.00"), "type": TransactionType.INCOME}
+
+    with pytest.raises(AccountNotFound):
+        service.create_income_expense_transaction(mock_session, data, uid)
+    mock_txn_repo.save_transaction.assert_not_called()
+
+def test_create_transaction_duplicate_message(service, mock_txn_repo, mock_acc_repo, mock_session):
+    # the message id was claimed already
+    mock_txn_repo.claim_message_ids.return_value = []
+
+    data = {"account_id": 1, "amount": Decimal("5.00"), "type": TransactionType.INCOME, "message_id": "m1"}
+
+    with pytest.raises(DuplicateTransaction):
+        service.create_income_expense_transaction(mock_session, data, uid)
+    mock_txn_repo.claim_message_ids.assert_called_once_with(mock_session, uid, ["m1"])
+    mock_acc_repo.change_balance.assert_not_called()
+    mock_txn_repo.save_transaction.assert_not_called()
 
 def test_create_transfer_success(service, mock_txn_repo, mock_acc_repo, mock_session):
     user_id = uid
-    # Sender: 100, Receiver: 0
-    sender = Account(id=1, balance=Decimal("100.00"))
-    receiver = Account(id=2, balance=Decimal("0.00"))
-    
-    # Mock Repo to return correct account based on ID
-    def get_acc(sess, id, uid):
-        return sender if id == 1 else receiver
-    mock_acc_repo.get_account_for_user.side_effect = get_acc
-    mock_txn_repo.save_transaction = lambda s, t: t
+    mock_txn_repo.create_transfer.side_effect = lambda s, u, group, from_id, to_id, amount, *rest: [
+        Transaction(account_id=from_id, amount=amount, transfer_group_id=group, is_outgoing=True),
+        Transaction(account_id=to_id, amount=amount, transfer_group_id=group, is_outgoing=False),
+    ]
     
     transfer_data = TransferTransactionCreate(
-        account_id=1, to_account_id=2, amount=Decimal("50.00"), 
+        account_id=2, to_account_id=1, amount=Decimal("50.00"), 
         currency="USD", description="Test", type=TransactionType.TRANSFER, occurred_at=None
     )
     
     txn_out, txn_in = service.create_transfer_transaction(mock_session, transfer_data, user_id)
     
-    # Check Balances
-    assert sender.balance == Decimal("50.00")
-    assert receiver.balance == Decimal("50.00")
+    # balances, legs and rollups are one repo call
+    mock_txn_repo.create_transfer.assert_called_once()
+    mock_acc_repo.change_balance.assert_not_called()
+    mock_txn_repo.save_transaction.assert_not_called()
     
     # Check Transactions linked
+    assert (txn_out.account_id, txn_in.account_id) == (2, 1)
     assert txn_out.transfer_group_id == txn_in.transfer_group_id
     assert txn_out.is_outgoing is True
     assert txn_in.is_outgoing is False
     mock_session.commit.assert_called_once()
 
+@pytest.mark.parametrize("accounts, error", [([Account(id=1), Account(id=2)], InsufficientBalance), ([Account(id=1)], AccountNotFound)])
+def test_create_transfer_nothing_moved(service, mock_txn_repo, mock_acc_repo, mock_session, accounts, error):
+    mock_txn_repo.create_transfer.return_value = []
+    mock_acc_repo.get_accounts_for_user.return_value = accounts
+    transfer_data = TransferTransactionCreate(
+        account_id=1, to_account_id=2, amount=Decimal("50.00"), currency="USD", type=TransactionType.TRANSFER
+    )
+
+    with pytest.raises(error):
+        service.create_transfer_transaction(mock_session, transfer_data, uid)
+    mock_session.commit.assert_not_called()
+
+def test_create_transfer_to_same_account(service, mock_txn_repo, mock_session):
+    transfer_data = TransferTransactionCreate(
+        account_id=1, to_account_id=1, amount=Decimal("5.00"), currency="USD", type=TransactionType.TRANSFER
+    )
+    with pytest.raises(InvalidTransferTransaction):
+        service.create_transfer_transaction(mock_session, transfer_data, uid)
+    mock_txn_repo.create_transfer.assert_not_called()
+
 def test_update_transaction_expense_balance_adjustment(service, mock_txn_repo, mock_acc_repo, mock_session):
-    # Old: Expense 50. Account now has 50 remaining (original was 100).
+    # Old: Expense 50.
     # New: Expense 80. Account should go down by another 30.
     
     old_txn = Transaction(id=1, account_id=1, amount=Decimal("50.00"), type=TransactionType.EXPENSE)
-    account = Account(id=1, balance=Decimal("50.00"))
     
     mock_txn_repo.get_transaction_for_user.return_value = old_txn
-    mock_acc_repo.get_account_for_user.return_value = account
     
     patch = TransactionPatch(amount=Decimal("80.00"))
     
     service.update_transaction(mock_session, patch, 1, 1)
     
-    # Offset = 80 - 50 = 30.
-    # Expense type: balance -= offset -> 50 - 30 = 20.
-    assert account.balance == Decimal("20.00")
+    # Offset = 80 - 50 = 30, debited from the account.
+    mock_acc_repo.change_balance.assert_called_once_with(mock_session, 1, 1, Decimal("-30.00"))
+    # the transaction row is locked while its amount is read
+    mock_txn_repo.get_transaction_for_user.assert_called_once_with(mock_session, 1, 1, for_update=True)
     assert old_txn.amount == Decimal("80.00")
 
 def test_delete_transfer_reverts_balances(service, mock_txn_repo, mock_acc_repo, mock_session):
     group_id = uuid4()
-    # Sender previously sent 50. Current Bal: 50. Should revert to 100.
-    sender = Account(id=1, balance=Decimal("50.00"))
-    # Receiver previously got 50. Current Bal: 50. Should revert to 0.
-    receiver = Account(id=2, balance=Decimal("50.00"))
-    
-    t_out = Transaction(account_id=1, amount=50, is_outgoing=True)
-    t_in = Transaction(account_id=2, amount=50, is_outgoing=False)
-    
-    mock_txn_repo.get_transfer_transactions.return_value = [t_out, t_in]
-    mock_acc_repo.get_account_for_user.side_effect = lambda s, id, u: sender if id == 1 else receiver
+    mock_txn_repo.delete_transfer.return_value = (2, 2)
     
     service.delete_transfer_transaction(mock_session, group_id, 1)
     
-    assert sender.balance == Decimal("100.00")
-    assert receiver.balance == Decimal("0.00")
-    assert mock_txn_repo.delete_transaction.call_count == 2
+    mock_txn_repo.delete_transfer.assert_called_once_with(mock_session, group_id, 1)
+    mock_session.commit.assert_called_once()
+
+@pytest.mark.parametrize("result, error", [((2, 0), InsufficientBalance), ((1, 0), InvalidTransferTransaction)])
+def test_delete_transfer_nothing_reverted(service, mock_txn_repo, mock_session, result, error):
+    # (2, 0): the receiver already spent the money
+    mock_txn_repo.delete_transfer.return_value = result
+
+    with pytest.raises(error):
+        service.delete_transfer_transaction(mock_session, uuid4(), 1)
+    mock_session.commit.assert_not_called()
+
+def test_create_expense_updates_rollup(service, mock_txn_repo, mock_acc_repo, mock_session):
+    mock_txn_repo.save_transaction.side_effect = lambda s, t: setattr(t, "id", 7) or t
+
+    service.create_income_expense_transaction(
+        mock_session,
+        {"account_id": 1, "amount": Decimal("10"), "currency": "ETB", "type": TransactionType.EXPENSE},
+        uid,
+    )
+    mock_txn_repo.rollup_transactions.assert_called_once_with(mock_session, [7])
+
+
+def test_day_bounds_cover_whole_days():
+    assert day_bounds(None, None) == (None, None)
+    assert day_bounds(datetime(2025, 5, 1, 13), datetime(2025, 5, 3, 9)) == (date(2025, 5, 1), date(2025, 5, 4))
+    # an end at midnight excludes the day it starts
+    assert day_bounds(datetime(2025, 5, 1), datetime(2025, 6, 1)) == (date(2025, 5, 1), date(2025, 6, 1))
+
+
+def test_month_start():
+    assert month_start(2025, 11, 3) == datetime(2026, 2, 1)
+    for month in (0, 13):
+        with pytest.raises(ValueError):
+            month_start(2025, month)
+
+
+def test_get_summary_reads_rollups(service, mock_txn_repo, mock_session):
+    mock_txn_repo.get_rollup_summary.return_value = (Decimal("300"), Decimal("120"), 2, 3)
+
+    summary = service.get_transaction_summary(
+        mock_session, None, datetime(2025, 5, 1), datetime(2025, 5, 31, 12), uid
+    )
+    assert summary["net_savings"] == Decimal("180")
+    assert summary["transactions_count"] == 5
+    # income and expense come from a single query
+    mock_txn_repo.get_rollup_summary.assert_called_once_with(mock_session, date(2025, 5, 1), date(2025, 6, 1), uid)
+
+
+def test_get_monthly_summaries_fills_quiet_months(service, mock_txn_repo, mock_session):
+    mock_txn_repo.get_rollup_monthly_summaries.return_value = [
+        (datetime(2025, 12, 1), Decimal("100"), Decimal("40"), 1, 2),
+        (datetime(2026, 2, 1), Decimal("0"), Decimal("10"), 0, 1),
+    ]
+
+    summaries = service.get_monthly_summaries(mock_session, "2025-11", 4, uid)
+
+    assert [s["month"] for s in summaries] == ["2025-11", "2025-12", "2026-01", "2026-02"]
+    assert summaries[0]["transactions_count"] == 0
+    assert summaries[1]["net_savings"] == Decimal("60")
+    assert summaries[3]["total_expense"] == Decimal("10")
+    mock_txn_repo.get_rollup_monthly_summaries.assert_called_once_with(
+        mock_session, date(2025, 11, 1), date(2026, 3, 1), uid
+    )
+
 
 def test_get_stats_calculation(service, mock_txn_repo, mock_acc_repo, mock_session):
-    # Mock Repo returns: Cat A: 50, Cat B: 50. Total 100.
-    # Expecting 50% each.
-    mock_data = [(1, 50), (2, 50)] # (cat_id, total)
-    mock_txn_repo.get_grouped_transaction_totals.return_value = mock_data
-    
-    # Mock Session get for Category names
-    def get_mock(model, id):
-        return Category(name="A") if id == 1 else Category(name="B")
-    mock_session.get.side_effect = get_mock
-    
-    stats = service.get_transaction_stats(mock_session, "category", 1)
-    
+    # names and percentages come back from the single aggregate query
+    mock_data = [("A", 50, Decimal("50.00"), 1), ("B", 50, Decimal("50.00"), 2)]
+    mock_txn_repo.get_rollup_grouped_totals.return_value = mock_data
+
+    stats = service.get_transaction_stats(mock_session, "category", None, None, 1000, True, uid)
+
     assert len(stats) == 2
+    assert stats[0]["name"] == "A"
     assert stats[0]["percentage"] == Decimal("50.00")
-    assert stats[1]["percentage"] == Decimal("50.00")
\ No newline at end of file
+    assert stats[1]["percentage"] == Decimal("50.00")
+    # no lookups per group
+    mock_session.get.assert_not_called()
+
+def test_list_transactions_returns_next_cursor(service, mock_txn_repo, mock_session):
+    page = [
+        Transaction(id=5, amount=Decimal("1"), occurred_at=datetime(2025, 5, 2)),
+        Transaction(id=4, amount=Decimal("1"), occurred_at=datetime(2025, 5, 1)),
+    ]
+    mock_txn_repo.list_user_transactions.return_value = (page, 10)
+
+    _, total, next_cursor = service.get_user_transactions(
+        mock_session, uid, 2, 0, None, None, None, None, None
+    )
+    assert total == 10
+    assert decode_cursor(next_cursor) == (datetime(2025, 5, 1), 4)
+
+    # the cursor is decoded before it reaches the repo
+    service.get_user_transactions(
+        mock_session, uid, 2, 0, None, None, None, None, None, next_cursor
+    )
+    assert mock_txn_repo.list_user_transactions.call_args.args[-2] == (datetime(2025, 5, 1), 4)
+
+    # a short page is the last one
+    mock_txn_repo.list_user_transactions.return_value = (page[:1], 10)
+    _, _, next_cursor = service.get_user_transactions(
+        mock_session, uid, 2, 0, None, None, None, None, None
+    )
+    assert next_cursor is None
+
+
+def test_list_transactions_rejects_malformed_cursor(service, mock_session):
+    with pytest.raises(InvalidCursor):
+        service.get_user_transactions(
+            mock_session, uid, 2, 0, None, None, None, None, None, "%%%"
+        )
+
+
+def test_create_transactions_bulk_is_set_based(service, mock_txn_repo, mock_acc_repo, mock_session):
+    mock_txn_repo.get_transaction_with_message_id.return_value = ["seen"]
+    mock_acc_repo.get_accounts_for_user.return_value = [Account(id=1, balance=Decimal("100.00"))]
+    # echo back every row as inserted
+    mock_txn_repo.insert_ignoring_duplicates.side_effect = lambda s, rows: [
+        (len(r["message_id"]), r["account_id"], r["type"], r["amount"]) for r in rows
+    ]
+
+    def txn(mid, amount, type=TransactionType.EXPENSE, account_id=1):
+        return TransactionCreate(
+            account_id=account_id, category_id=7, amount=Decimal(amount), currency="ETB",
+            type=type, message_id=mid,
+        )
+
+    result = service.create_transactions_bulk(
+        mock_session,
+        [
+            txn("a", "30"),
+            txn("b", "50", TransactionType.INCOME),
+            txn("a", "10"),          # duplicate within the payload
+            txn("seen", "10"),       # already stored
+            txn(None, "10"),
+            txn("c", "500"),         # more than the running balance of 120
+            txn("d", "5", account_id=99),
+        ],
+        uid,
+        chunk_size=1,
+    )
+
+    assert result["inserted"] == 2
+    assert result["skipped_reasons"] == {
+        "duplicate": 2, "no_message_id": 1, "insufficient_funds": 1, "invalid_account": 1,
+    }
+    # accounts prefetched once, one insert per chunk, one balance update per account
+    mock_acc_repo.get_account_for_user.assert_not_called()
+    mock_acc_repo.get_accounts_for_user.assert_called_once()
+    assert mock_txn_repo.insert_ignoring_duplicates.call_count == 2
+    mock_acc_repo.change_balance.assert_called_once_with(mock_session, 1, uid, Decimal("20"))
+    mock_txn_repo.rollup_transactions.assert_called_once_with(mock_session, [1, 1])
+    mock_session.commit.assert_called_once()
+    rows = mock_txn_repo.insert_ignoring_duplicates.call_args.args[1]
+    assert rows[0]["category_id"] == 7
+
+
+def test_create_transactions_bulk_overdrawn_concurrently(service, mock_txn_repo, mock_acc_repo, mock_session):
+    mock_txn_repo.get_transaction_with_message_id.return_value = []
+    mock_acc_repo.get_accounts_for_user.return_value = [Account(id=1, balance=Decimal("100.00"))]
+    mock_txn_repo.insert_ignoring_duplicates.side_effect = lambda s, rows: [
+        (1, r["account_id"], r["type"], r["amount"]) for r in rows
+    ]
+    # the prefetched balance was spent by another writer before the update ran
+    mock_acc_repo.change_balance.return_value = None
+    mock_acc_repo.get_account_for_user.return_value = Account(id=1, balance=Decimal("0.00"))
+
+    with pytest.raises(InsufficientBalance):
+        service.create_transactions_bulk(
+            mock_session,
+            [TransactionCreate(account_id=1, amount=Decimal("80"), currency="ETB", type=TransactionType.EXPENSE, message_id="m")],
+            uid,
+        )
+    mock_session.commit.assert_not_called()
+
+
+def test_import_transactions_streams_into_staging(service, mock_txn_repo, mock_session):
+    staged_rows = []
+    mock_txn_repo.copy_into_import_staging.side_effect = lambda s, stream: staged_rows.append(stream.read())
+    mock_txn_repo.merge_import_staging.return_value = {"inserted": 1, "duplicate": 1, "invalid_account": 0, "insufficient_funds": 0}
+
+    body = io.BytesIO(
+        b'{"account_id": 1, "amount": "10", "currency": "ETB", "type": "EXPENSE", "message_id": "m1"}\n'
+        b'{"account_id": 1, "amount": "10", "currency": "ETB", "type": "EXPENSE"}\n'
+    )
+    result = service.import_transactions(mock_session, body, "ndjson", uid)
+
+    assert result == {"inserted": 1, "skipped": 2, "skipped_reasons": {"no_message_id": 1, "duplicate": 1}}
+    assert staged_rows[0].startswith(b"1,1,,10,,ETB,EXPENSE,")
+    mock_session.commit.assert_called_once()
+
+
+def test_timeseries_builds_points_from_one_query(service, mock_txn_repo, mock_session):
+    from types import SimpleNamespace
+
+    def row(period, key, name, income, expense, closing=Decimal("70")):
+        return SimpleNamespace(
+            period=datetime(2025, period, 1), key=key, name=name,
+            income=income, expense=expense, closing=closing,
+        )
+
+    mock_txn_repo.get_rollup_series.return_value = [
+        row(1, 3, "Food", Decimal("0"), Decimal("40")),
+        row(1, None, None, Decimal("100"), Decimal("0")),
+        row(2, None, None, None, None),  # a gap
+        row(3, 3, "Food", Decimal("0"), Decimal("10")),
+    ]
+
+    points = service.get_timeseries(
+        mock_session, "month", datetime(2025, 1, 1), datetime(2025, 4, 1), uid, "category", "balance"
+    )
+
+    mock_txn_repo.get_rollup_series.assert_called_once_with(
+        mock_session, "month", date(2025, 1, 1), date(2025, 4, 1), uid, "category", True
+    )
+    assert [(p["income"], p["expense"], p["net"]) for p in points] == [
+        (Decimal("100"), Decimal("40"), Decimal("60")),
+        (0, 0, 0),
+        (Decimal("0"), Decimal("10"), Decimal("-10")),
+    ]
+    assert [[b["name"] for b in p["breakdown"]] for p in points] == [["Food", "Uncategorized"], [], ["Food"]]
+    # the last point closes at the balance as of the range end
+    assert [p["running"] for p in points] == [Decimal("80"), Decimal("80"), Decimal("70")]
+
+    running = service.get_timeseries(
+        mock_session, "month", datetime(2025, 1, 1), datetime(2025, 4, 1), uid, None, "net"
+    )
+    assert [p["running"] for p in running] == [Decimal("60"), Decimal("60"), Decimal("50")]
+    assert "breakdown" not in running[0]
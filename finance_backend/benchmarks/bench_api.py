@@ -0,0 +1,450 @@
+"""End to end API benchmark: the real app under uvicorn, driven over HTTP.
+
+    python -m benchmarks.bench_api run [--users 50] [--transactions 50000]
+        [--concurrency 1 8] [--duration 10] [--scenarios list summary ...]
+        [--output bench.json]
+    python -m benchmarks.bench_api compare old.json new.json [--threshold 0.10]
+
+run seeds --users synthetic users with scripts.seed_sample_data under their own
+--seed (replaced on every run, so two runs read the same data), starts
+`uvicorn app.main:app` against DATABASE_URL (or --url) unless --base-url
+points at a server already up, and logs every user in. Then, for each scenario
+and each --concurrency level, it keeps that many requests in flight for
+--duration seconds after --warmup seconds that aren't counted. Throughput and
+p50/p95/p99 latency of every pair go to --output, with the data size and the
+git revision they were measured at.
+
+compare matches two such files by scenario and concurrency, and flags every
+percentile that grew or throughput that fell by more than --threshold; latency
+changes under --min-delta-ms are noise, and so is a percentile with fewer than
+five samples beyond it. It exits 1 when anything regressed.
+
+The client shares the host with the server and Postgres, only compare runs
+taken on the same machine. ingest and transfer write to the seeded users, so
+the data grows a little during a run and analytics see fresh data versions;
+the next run reseeds.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from app.core.settings import settings
+from scripts import seed_sample_data
+
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+# a percentile is only compared when this many samples lie beyond it in both
+# runs, a p99 of a 200 request run is one or two outliers
+TAIL_SAMPLES = 5
+
+
+@dataclass
+class BenchUser:
+    email: str
+    headers: Dict[str, str]
+    # (id, currency), richest first: transfers leave from the first one
+    accounts: List[Tuple[int, str]] = field(default_factory=list)
+    categories: List[int] = field(default_factory=list)
+
+
+@dataclass
+class Context:
+    users: List[BenchUser]
+    password: str
+    end: datetime  # last day of the seeded history
+    days: int
+    batch: int
+
+
+def _window(ctx: Context, rng: random.Random, days: int) -> Dict[str, str]:
+    start = ctx.end - timedelta(days=rng.randrange(days, max(days + 1, ctx.days)))
+    return {"date_from": start.isoformat(), "date_to": (start + timedelta(days=days)).isoformat()}
+
+
+async def _list(client, user, rng, ctx):
+    params = {"limit": 100, "count": "estimated"}
+    narrow = rng.random()
+    if narrow < 0.3:
+        params["account_id"] = rng.choice(user.accounts)[0]
+    elif narrow < 0.6 and user.categories:
+        params["category_id"] = rng.choice(user.categories)
+    return await client.get("/v1/transactions/", params=params, headers=user.headers)
+
+
+async def _ingest(client, user, rng, ctx):
+    account_id, currency = rng.choice(user.accounts)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "account_id": account_id,
+            "amount": f"{rng.randint(100, 50000) / 100:.2f}",
+            "currency": currency,
+            # income only, an expense could be refused for the balance
+            "type": "INCOME",
+            "occurred_at": (now - timedelta(minutes=i)).isoformat(),
+            "message_id": f"bench-{uuid4().hex}",
+        }
+        for i in range(ctx.batch)
+    ]
+    return await client.post("/v1/transactions/bulk", json={"transactions": rows}, headers=user.headers)
+
+
+async def _transfer(client, user, rng, ctx):
+    (source, currency), (target, _) = user.accounts[0], rng.choice(user.accounts[1:])
+    body = {
+        "account_id": source,
+        "to_account_id": target,
+        "amount": "1.00",
+        "currency": currency,
+        "type": "TRANSFER",
+    }
+    return await client.post("/v1/transactions/transfer", json=body, headers=user.headers)
+
+
+async def _summary(client, user, rng, ctx):
+    month = (ctx.end - timedelta(days=rng.randrange(ctx.days))).strftime("%Y-%m")
+    return await client.get("/v1/transactions/summary", params={"month": month}, headers=user.headers)
+
+
+async def _stats(client, user, rng, ctx):
+    params = {"by": rng.choice(["category", "account"]), **_window(ctx, rng, 90)}
+    return await client.get("/v1/transactions/stats", params=params, headers=user.headers)
+
+
+async def _timeseries(client, user, rng, ctx):
+    params = {"granularity": "day", **_window(ctx, rng, 90)}
+    return await client.get("/v1/transactions/timeseries", params=params, headers=user.headers)
+
+
+async def _balances(client, user, rng, ctx):
+    return await client.get("/v1/transactions/balances", headers=user.headers)
+
+
+async def _login(client, user, rng, ctx):
+    return await client.post("/v1/auth/login", json={"email": user.email, "password": ctx.password})
+
+
+SCENARIOS = {
+    "list": _list,
+    "ingest": _ingest,
+    "transfer": _transfer,
+    "summary": _summary,
+    "stats": _stats,
+    "timeseries": _timeseries,
+    "balances": _balances,
+    "login": _login,
+}
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest rank of an ascending list."""
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+async def run_level(client, ctx: Context, scenario: str, concurrency: int, args) -> dict:
+    """`concurrency` closed-loop workers, each sending its next request as the last returns."""
+    call = SCENARIOS[scenario]
+    users = ctx.users
+    if scenario == "transfer":
+        users = [u for u in users if len(u.accounts) > 1]
+    latencies, statuses = [], Counter()
+    measure_from = time.perf_counter() + args.warmup
+    stop = measure_from + args.duration
+
+    async def worker(index: int):
+        rng = random.Random(f"{args.seed}:{scenario}:{concurrency}:{index}")
+        while time.perf_counter() < stop:
+            user = rng.choice(users)
+            started = time.perf_counter()
+            try:
+                response = await call(client, user, rng, ctx)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if started < measure_from:
+                continue
+            statuses[status] += 1
+            if status.startswith("2"):
+                latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": sum(statuses.values()),
+        "errors": sum(n for status, n in statuses.items() if not status.startswith("2")),
+        "statuses": dict(sorted(statuses.items())),
+        "samples": len(latencies),
+        "throughput": round(len(latencies) / args.duration, 2),
+        "latency_ms": {
+            name: round(percentile(latencies, q) * 1000, 3) if latencies else None
+            for name, q in PERCENTILES.items()
+        }
+        | {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            "max": round(latencies[-1] * 1000, 3) if latencies else None,
+        },
+    }
+
+
+async def _log_in(client, emails: List[str], password: str) -> List[BenchUser]:
+    # a few at a time, the server turns away more password hashes than its pool holds
+    gate = asyncio.Semaphore(4)
+
+    async def one(email: str) -> BenchUser:
+        async with gate:
+            response = await client.post("/v1/auth/login", json={"email": email, "password": password})
+        response.raise_for_status()
+        user = BenchUser(email, {"Authorization": f"Bearer {response.json()['acc_jwt']}"})
+        accounts = (await client.get("/v1/accounts/", params={"limit": 500}, headers=user.headers)).json()
+        categories = (await client.get("/v1/categories/", headers=user.headers)).json()
+        ordered = sorted(accounts["accounts"], key=lambda a: float(a["balance"]), reverse=True)
+        user.accounts = [(a["id"], a["currency"]) for a in ordered]
+        user.categories = [c["id"] for c in categories["categories"]]
+        return user
+
+    return list(await asyncio.gather(*(one(email) for email in emails)))
+
+
+async def run_scenarios(base_url: str, emails: List[str], args) -> List[dict]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        users = await _log_in(client, emails, args.password)
+        end = datetime.combine(args.end, datetime.min.time())
+        ctx = Context(users, args.password, end, args.days, args.batch)
+        results = []
+        for scenario in args.scenarios:
+            if scenario == "transfer" and not any(len(u.accounts) > 1 for u in users):
+                print("transfer: no seeded user has two accounts, skipped")
+                continue
+            for concurrency in args.concurrency:
+                result = await run_level(client, ctx, scenario, concurrency, args)
+                print(_format_result(result))
+                results.append(result)
+        return results
+
+
+def _format_result(r: dict) -> str:
+    latency = r["latency_ms"]
+    cells = "".join(
+        f"{latency[name]:>10.2f}" if latency[name] is not None else f"{'-':>10}" for name in PERCENTILES
+    )
+    return f"{r['scenario']:<12}{r['concurrency']:>6}{r['throughput']:>10.1f}{cells}{r['errors']:>8}"
+
+
+def seed_users(args) -> dict:
+    """Reseed the benchmark's users, returns what the run measured against."""
+    engine = create_engine(args.url)
+    pattern = f"seed{args.seed}-user%@example.com"
+    try:
+        if not args.skip_seed:
+            with Session(engine) as session:
+                seed_sample_data.seed(session, argparse.Namespace(
+                    users=args.users, transactions=args.transactions, seed=args.seed,
+                    days=args.days, end=args.end, password=args.password,
+                    replace=True, jobs=1, defer_indexes=False,
+                ))
+                session.commit()
+            seed_sample_data.vacuum_analyze(engine)
+        with Session(engine) as session:
+            emails = list(session.exec(
+                text("SELECT email FROM users WHERE email LIKE :pattern ORDER BY email"),
+                params={"pattern": pattern},
+            ).scalars())
+            transactions = session.exec(
+                text(
+                    "SELECT count(*) FROM transactions t JOIN users u ON u.id = t.user_id "
+                    "WHERE u.email LIKE :pattern"
+                ),
+                params={"pattern": pattern},
+            ).scalar_one()
+    finally:
+        engine.dispose()
+    if not emails:
+        raise SystemExit(f"no users match {pattern}, run without --skip-seed first")
+    return {"emails": emails, "transactions": transactions}
+
+
+@contextmanager
+def server(args):
+    """The app under uvicorn, or --base-url as is."""
+    if args.base_url:
+        yield args.base_url
+        return
+    base_url = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(args.port), "--workers", str(args.workers),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        # statement logging would be most of what gets measured
+        env=dict(os.environ, DATABASE_URL=args.url, DB_ECHO="false"),
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(f"uvicorn exited with {process.returncode}")
+            try:
+                if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit("uvicorn didn't come up within 60s")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _revision() -> Optional[str]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ("-dirty" if dirty else "")
+
+
+def run(args) -> int:
+    data = seed_users(args)
+    started = datetime.now(timezone.utc)
+    print(f"{len(data['emails'])} users, {data['transactions']} transactions")
+    print(f"{'scenario':<12}{'conc':>6}{'req/s':>10}" + "".join(f"{n + ' ms':>10}" for n in PERCENTILES) + f"{'errors':>8}")
+    with server(args) as base_url:
+        results = asyncio.run(run_scenarios(base_url, data["emails"], args))
+
+    report = {
+        "meta": {
+            "started_at": started.isoformat(),
+            "revision": _revision(),
+            "host": platform.node(),
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+            "server": args.base_url or f"uvicorn --workers {args.workers}",
+            "users": len(data["emails"]),
+            "transactions": data["transactions"],
+            "seed": args.seed,
+            "days": args.days,
+            "end": args.end.isoformat(),
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "batch": args.batch,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    for name in ("users", "transactions", "cpus"):
+        if old["meta"].get(name) != new["meta"].get(name):
+            print(f"warning: {name} differ, {old['meta'].get(name)} vs {new['meta'].get(name)}")
+
+    before = {(r["scenario"], r["concurrency"]): r for r in old["results"]}
+    regressed = []
+    for r in new["results"]:
+        key = (r["scenario"], r["concurrency"])
+        if key not in before:
+            print(f"{key[0]:<12}{key[1]:>6}  new")
+            continue
+        b = before.pop(key)
+        flags, cells = [], []
+        for name in PERCENTILES:
+            was, now = b["latency_ms"][name], r["latency_ms"][name]
+            if was is None or now is None:
+                cells.append(f"{name} -")
+                continue
+            change = (now - was) / was if was else 0.0
+            tail = min(b["samples"], r["samples"]) * (1 - PERCENTILES[name])
+            cells.append(f"{name} {was:.2f}->{now:.2f}ms ({change:+.0%}{'' if tail >= TAIL_SAMPLES else ', few samples'})")
+            if change > args.threshold and now - was >= args.min_delta_ms and tail >= TAIL_SAMPLES:
+                flags.append(name)
+        change = (r["throughput"] - b["throughput"]) / b["throughput"] if b["throughput"] else 0.0
+        cells.append(f"req/s {b['throughput']:.1f}->{r['throughput']:.1f} ({change:+.0%})")
+        if change < -args.threshold:
+            flags.append("throughput")
+        # failures that weren't there before count whatever the latency does
+        if r["errors"] / max(r["requests"], 1) > b["errors"] / max(b["requests"], 1) + 0.01:
+            flags.append("errors")
+        print(f"{key[0]:<12}{key[1]:>6}  " + "  ".join(cells) + (f"  REGRESSED: {', '.join(flags)}" if flags else ""))
+        if flags:
+            regressed.append(key)
+    for scenario, concurrency in before:
+        print(f"{scenario:<12}{concurrency:>6}  missing from {args.new}")
+
+    print(f"{len(regressed)} regression(s)" if regressed else "no regressions")
+    return 1 if regressed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("run", help="benchmark the API, write a JSON report")
+    p.add_argument("--url", default=settings.DATABASE_URL)
+    p.add_argument("--base-url", help="an already running server, instead of starting uvicorn")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    p.add_argument("--users", type=int, default=50)
+    p.add_argument("--transactions", type=int, default=50_000)
+    p.add_argument("--days", type=int, default=365)
+    p.add_argument("--end", type=date.fromisoformat, default=seed_sample_data.DEFAULT_END)
+    p.add_argument("--seed", type=int, default=9000, help="kept apart from the sample data's seeds")
+    p.add_argument("--password", default="benchmark-password")
+    p.add_argument("--skip-seed", action="store_true", help="reuse the users of an earlier run")
+    p.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    p.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario and level")
+    p.add_argument("--warmup", type=float, default=2.0)
+    p.add_argument("--batch", type=int, default=100, help="rows per ingest request")
+    p.add_argument("--timeout", type=float, default=30.0)
+    p.add_argument("--output", default="bench.json")
+    p.set_defaults(handler=run)
+
+    p = commands.add_parser("compare", help="flag regressions between two reports")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.10, help="relative change that counts")
+    p.add_argument("--min-delta-ms", type=float, default=1.0)
+    p.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
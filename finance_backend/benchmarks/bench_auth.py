@@ -0,0 +1,80 @@
+"""Per-request auth overhead: what get_current_user_id costs for one bearer token.
+
+    python -m benchmarks.bench_auth [--number 20000]
+
+Compares a full decode against the verified-token cache, for the shared-secret
+(HS256) setup and for key pairs (RS256, ES256) with the parsed public key cached.
+"""
+import argparse
+import asyncio
+import timeit
+from datetime import timedelta
+from uuid import uuid4
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+import app.auth.jwt as auth_jwt
+from app.auth.dependencies import get_current_user_id
+
+
+def _pem_pair(algorithm: str):
+    if algorithm.startswith("RS"):
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private_pem, public_pem
+
+
+def _configure(algorithm: str, cache_size: int) -> None:
+    auth_jwt.ALGORITHM = algorithm
+    if auth_jwt.is_asymmetric(algorithm):
+        private_pem, public_pem = _pem_pair(algorithm)
+        auth_jwt.settings.JWT_PRIVATE_KEY = private_pem
+        auth_jwt.settings.JWT_PUBLIC_KEY = public_pem
+    auth_jwt.verified_tokens = auth_jwt.VerifiedTokenCache(cache_size)
+
+
+def _per_call_us(fn, number: int) -> float:
+    fn()  # warm up: key parsing, first cache fill
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def run(number: int) -> list:
+    results = []
+    loop = asyncio.new_event_loop()
+    for algorithm in ("HS256", "RS256", "ES256"):
+        for cache_size, label in ((0, "decode"), (10000, "cached")):
+            _configure(algorithm, cache_size)
+            token = auth_jwt.create_access_token(
+                {"id": str(uuid4()), "email": "bench@example.com"}, timedelta(minutes=15)
+            )
+            results.append((
+                algorithm,
+                label,
+                _per_call_us(lambda: auth_jwt.verify_access_token(token), number),
+                _per_call_us(lambda: loop.run_until_complete(get_current_user_id(token)), number),
+            ))
+    loop.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="calls per timing round")
+    args = parser.parse_args()
+
+    print(f"{'alg':<7}{'mode':<8}{'verify µs':>12}{'dependency µs':>16}")
+    for algorithm, label, verify_us, dependency_us in run(args.number):
+        print(f"{algorithm:<7}{label:<8}{verify_us:>12.2f}{dependency_us:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
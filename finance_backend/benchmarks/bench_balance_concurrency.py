@@ -0,0 +1,127 @@
+"""Concurrent writers on one account: throughput and a lost-update check.
+
+    python -m benchmarks.bench_balance_concurrency [--workers 1 4 16] [--seconds 5]
+
+Each worker is one session committing single transactions through
+TransactionsService, like parallel SMS syncs and manual entries hitting the same
+account. Runs against DATABASE_URL unless --url is given; the user it
+creates is deleted afterwards.
+"""
+import argparse
+import random
+import threading
+import time
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlmodel import Session, create_engine, select
+
+from app.accounts.repo import AccountRepository
+from app.core.settings import settings
+from app.models.account import Account
+from app.models.enums import AccountType, Provider, TransactionType
+from app.models.user import User
+from app.transactions.exceptions import InsufficientBalance
+from app.transactions.repo import TransactionRepo
+from app.transactions.service import TransactionsService
+
+service = TransactionsService(TransactionRepo(), AccountRepository())
+
+
+def _setup(engine, opening: Decimal):
+    with Session(engine) as session:
+        user = User(email=f"bench-{uuid4()}@example.com", provider=Provider.LOCAL)
+        session.add(user)
+        session.flush()
+        account = Account(
+            user_id=user.id, name="bench", type=AccountType.BANK, currency="USD", balance=opening
+        )
+        session.add(account)
+        session.commit()
+        return user.id, account.id
+
+
+def _worker(engine, user_id, account_id, deadline, seed, out):
+    rng = random.Random(seed)
+    applied, rejected, latencies = Decimal(0), 0, []
+    while time.perf_counter() < deadline:
+        # expenses outweigh income so the guard actually gets exercised
+        is_expense = rng.random() < 0.6
+        amount = Decimal(rng.randint(1, 50))
+        data = {
+            "account_id": account_id,
+            "amount": amount,
+            "currency": "USD",
+            "type": TransactionType.EXPENSE if is_expense else TransactionType.INCOME,
+        }
+        start = time.perf_counter()
+        with Session(engine) as session:
+            try:
+                service.create_income_expense_transaction(session, data, user_id)
+                applied += -amount if is_expense else amount
+            except InsufficientBalance:
+                rejected += 1
+        latencies.append(time.perf_counter() - start)
+    out.append((applied, rejected, latencies))
+
+
+def run(url: str, workers: int, seconds: float, opening: Decimal) -> dict:
+    engine = create_engine(url, pool_size=workers, max_overflow=0)
+    user_id, account_id = _setup(engine, opening)
+    results = []
+    try:
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(
+                target=_worker, args=(engine, user_id, account_id, deadline, i, results)
+            )
+            for i in range(workers)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with Session(engine) as session:
+            balance = session.exec(
+                select(Account.balance).where(Account.id == account_id)
+            ).one()
+    finally:
+        with Session(engine) as session:
+            session.delete(session.get(User, user_id))
+            session.commit()
+        engine.dispose()
+
+    latencies = sorted(l for _, _, ls in results for l in ls)
+    expected = opening + sum(applied for applied, _, _ in results)
+    return {
+        "workers": workers,
+        "writes_per_s": len(latencies) / seconds,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        "rejected": sum(r for _, r, _ in results),
+        "lost_updates": balance != expected,
+        "negative": balance < 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--opening-balance", type=Decimal, default=Decimal("500"))
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'rejected':>10}  consistent")
+    for workers in args.workers:
+        r = run(args.url, workers, args.seconds, args.opening_balance)
+        consistent = not (r["lost_updates"] or r["negative"])
+        print(
+            f"{r['workers']:>8}{r['writes_per_s']:>10.0f}{r['p50_ms']:>9.2f}"
+            f"{r['p99_ms']:>9.2f}{r['rejected']:>10}  {'yes' if consistent else 'NO'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""CPU and memory per 1000-row page of GET /v1/transactions, old path vs new.
+
+    python -m benchmarks.bench_list_serialization [--rows 1000] [--rounds 50]
+
+orm:  select(Transaction) -> TransactionOut.model_validate per row -> the
+      response model validated again and dumped by FastAPI's json encoder
+core: select(*LIST_COLUMNS) -> dicts -> orjson bytes
+
+Both read the same page from the database, so the difference is hydration and
+serialization. Runs against DATABASE_URL unless --url is given; the user it
+creates is deleted afterwards.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlmodel import Session, create_engine, select
+
+from app.core.responses import dumps, rows_as_dicts
+from app.core.settings import settings
+from app.models.account import Account
+from app.models.enums import AccountType, Provider, TransactionType
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.transactions.repo import LIST_COLUMNS
+from app.transactions.schemas import TransactionOut, TransactionsOut
+
+FIELDS = tuple(TransactionOut.model_fields)
+
+
+def _seed(engine, rows: int):
+    with Session(engine) as session:
+        user = User(email=f"bench-{uuid4()}@example.com", provider=Provider.LOCAL)
+        session.add(user)
+        session.flush()
+        account = Account(user_id=user.id, name="bench", type=AccountType.BANK, currency="USD")
+        session.add(account)
+        session.flush()
+        start = datetime(2025, 1, 1)
+        session.add_all(
+            Transaction(
+                user_id=user.id,
+                account_id=account.id,
+                amount=Decimal(i % 500) + Decimal("0.25"),
+                currency="USD",
+                type=TransactionType.EXPENSE,
+                merchant=f"merchant {i % 40}",
+                description="benchmark row",
+                occurred_at=start + timedelta(minutes=i),
+            )
+            for i in range(rows)
+        )
+        session.commit()
+        return user.id
+
+
+def orm_page(session, user_id, limit) -> bytes:
+    transactions = session.exec(
+        select(Transaction).where(Transaction.user_id == user_id).limit(limit)
+    ).all()
+    out = TransactionsOut(
+        transactions=[TransactionOut.model_validate(t) for t in transactions],
+        total=len(transactions),
+    )
+    # what FastAPI does with a response_model: validate, dump to JSON-able, encode
+    content = TransactionsOut.model_validate(out).model_dump(mode="json")
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+def core_page(session, user_id, limit) -> bytes:
+    rows = session.exec(
+        select(*LIST_COLUMNS).where(Transaction.user_id == user_id).limit(limit)
+    ).all()
+    return dumps({"transactions": rows_as_dicts(rows, FIELDS), "total": len(rows)})
+
+
+def measure(engine, fn, user_id, limit, rounds):
+    with Session(engine) as session:
+        fn(session, user_id, limit)  # warm up compiled statement caches
+        cpu = []
+        for _ in range(rounds):
+            session.expunge_all()
+            start = time.process_time()
+            fn(session, user_id, limit)
+            cpu.append(time.process_time() - start)
+
+        session.expunge_all()
+        tracemalloc.start()
+        body = fn(session, user_id, limit)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    cpu.sort()
+    return cpu[len(cpu) // 2] * 1000, peak / 1024, len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    user_id = _seed(engine, args.rows)
+    try:
+        print(f"{'path':<6}{'cpu ms':>10}{'peak KiB':>11}{'body KiB':>11}")
+        for name, fn in (("orm", orm_page), ("core", core_page)):
+            cpu_ms, peak_kib, body = measure(engine, fn, user_id, args.rows, args.rounds)
+            print(f"{name:<6}{cpu_ms:>10.2f}{peak_kib:>11.0f}{body / 1024:>11.0f}")
+    finally:
+        with Session(engine) as session:
+            session.delete(session.get(User, user_id))
+            session.commit()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
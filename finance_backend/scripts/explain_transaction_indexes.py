@@ -0,0 +1,325 @@
+"""Check which index each hot transactions query actually uses.
+
+    python -m scripts.explain_transaction_indexes [--rows 500000] [--users 50] [--keep]
+
+Fills DATABASE_URL (or --url) with a synthetic dataset spread over `--users`
+users, then runs the real TransactionRepo methods for one of them and
+EXPLAIN ANALYZEs every statement they send. Each check names the index it is
+meant to hit; the script exits non-zero when a plan uses something else,
+sorts, or falls back to a sequential scan of transactions. The synthetic
+users are deleted afterwards unless --keep is given.
+"""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from app.core.settings import settings
+from app.db.explain import explain
+from app.db.partitions import ensure_transaction_partitions
+from app.models.enums import TransactionType
+from app.transactions.repo import TransactionRepo
+
+repo = TransactionRepo()
+
+ACCOUNTS_PER_USER = 3
+CATEGORIES_PER_USER = 8
+RANGE_START = date(2024, 1, 1)
+RANGE_DAYS = 730
+
+
+class RecordingSession:
+    """Passes everything through to a real session, keeping each statement."""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.statements = []
+
+    def exec(self, statement, *args, **kwargs):
+        self.statements.append(statement)
+        return self.session.exec(statement, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+def populate(engine, users: int, rows: int):
+    tag = f"explain-{uuid4().hex[:8]}"
+    # empty months are left behind, the maintenance job would create them anyway
+    with Session(engine) as session:
+        ensure_transaction_partitions(
+            session, RANGE_START, RANGE_START + timedelta(days=RANGE_DAYS)
+        )
+        session.commit()
+    with engine.begin() as conn:
+        user_ids = [
+            conn.execute(
+                text(
+                    "INSERT INTO users (id, email, provider, is_verified, created_at, data_version)"
+                    " VALUES (:id, :email, 'LOCAL', true, now(), 0) RETURNING id"
+                ),
+                {"id": uuid4(), "email": f"{tag}-{i}@example.com"},
+            ).scalar_one()
+            for i in range(users)
+        ]
+        conn.execute(
+            text(
+                """
+                INSERT INTO accounts (user_id, name, type, currency, balance, active, created_at)
+                SELECT u, 'acct-' || n, 'BANK', 'USD', 0, true, now()
+                FROM unnest(CAST(:users AS uuid[])) u, generate_series(1, :n) n
+                """
+            ),
+            {"users": user_ids, "n": ACCOUNTS_PER_USER},
+        )
+        conn.execute(
+            text(
+                """
+                INSERT INTO categories (user_id, name, type, active, created_at)
+                SELECT u, 'cat-' || n, 'EXPENSE', true, now()
+                FROM unnest(CAST(:users AS uuid[])) u, generate_series(1, :n) n
+                """
+            ),
+            {"users": user_ids, "n": CATEGORIES_PER_USER},
+        )
+        # g picks the user, k = g / users numbers that user's rows, and the
+        # account, category, type and time all come from k, so every user gets
+        # the same spread and each run the same layout
+        conn.execute(
+            text(
+                """
+                WITH u AS (
+                    SELECT id, row_number() OVER (ORDER BY id) - 1 AS i
+                    FROM unnest(CAST(:users AS uuid[])) id
+                ),
+                a AS (
+                    SELECT user_id, array_agg(id ORDER BY id) AS ids FROM accounts
+                    WHERE user_id = ANY(CAST(:users AS uuid[])) GROUP BY user_id
+                ),
+                c AS (
+                    SELECT user_id, array_agg(id ORDER BY id) AS ids FROM categories
+                    WHERE user_id = ANY(CAST(:users AS uuid[])) GROUP BY user_id
+                )
+                INSERT INTO transactions
+                    (user_id, account_id, category_id, amount, currency, type,
+                     occurred_at, created_at)
+                SELECT u.id,
+                       a.ids[1 + k % :accounts],
+                       CASE WHEN k % 5 = 0 THEN NULL ELSE c.ids[1 + (k / 5) % :categories] END,
+                       1 + (k * 7919) % 50000 / 100.0,
+                       'USD',
+                       CAST(CASE WHEN k % 4 = 1 THEN 'INCOME' ELSE 'EXPENSE' END AS transactiontype),
+                       CAST(:start AS timestamp) + ((k * 104729) % (:days * 86400)) * interval '1 second',
+                       now()
+                FROM generate_series(CAST(0 AS bigint), :rows - 1) g
+                CROSS JOIN LATERAL (SELECT g / :user_count AS k) per_user
+                JOIN u ON u.i = g % :user_count
+                JOIN a ON a.user_id = u.id
+                JOIN c ON c.user_id = u.id
+                """
+            ),
+            {
+                "users": user_ids, "accounts": ACCOUNTS_PER_USER,
+                "categories": CATEGORIES_PER_USER, "start": RANGE_START,
+                "days": RANGE_DAYS, "rows": rows, "user_count": users,
+            },
+        )
+        conn.execute(
+            text(
+                """
+                INSERT INTO transaction_daily_rollups
+                    (user_id, day, account_id, category_id, type, total, count)
+                SELECT user_id, occurred_at::date, account_id, category_id, type,
+                       sum(amount), count(*)
+                FROM transactions WHERE user_id = ANY(CAST(:users AS uuid[]))
+                GROUP BY user_id, occurred_at::date, account_id, category_id, type
+                """
+            ),
+            {"users": user_ids},
+        )
+    # fresh statistics, and a visibility map so index-only scans skip the heap
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE transactions"))
+        conn.execute(text("VACUUM ANALYZE transaction_daily_rollups"))
+    return tag, user_ids
+
+
+def cleanup(engine, tag: str):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM users WHERE email LIKE :tag"), {"tag": f"{tag}-%"})
+
+
+def checks(user_id, account_id, category_id):
+    """(name, index it should use, whether the plan may sort, repo call)
+
+    Paged lists must come straight off an index in order, so they stop after
+    `limit` rows; range reads that aggregate or return a bounded slice may
+    sort what they found.
+    """
+    start = datetime.combine(RANGE_START, datetime.min.time()) + timedelta(days=400)
+    end = start + timedelta(days=30)
+    list_args = dict(limit=50, offset=0, start=None, end=None, count="none")
+    return [
+        (
+            "list, newest first",
+            "ix_transactions_user_occurred_at_id",
+            False,
+            lambda s: repo.list_user_transactions(
+                s, user_id, account_id=None, category_id=None, type=None, **list_args
+            ),
+        ),
+        (
+            "list, one account",
+            "ix_transactions_user_account_occurred_at_id",
+            False,
+            lambda s: repo.list_user_transactions(
+                s, user_id, account_id=account_id, category_id=None, type=None, **list_args
+            ),
+        ),
+        (
+            "list, one category",
+            "ix_transactions_user_category_occurred_at_id",
+            False,
+            lambda s: repo.list_user_transactions(
+                s, user_id, account_id=None, category_id=category_id, type=None, **list_args
+            ),
+        ),
+        (
+            "list, income only",
+            "ix_transactions_user_type_occurred_at_id",
+            False,
+            lambda s: repo.list_user_transactions(
+                s, user_id, account_id=None, category_id=None,
+                type=TransactionType.INCOME, **list_args,
+            ),
+        ),
+        (
+            "report, a month",
+            "ix_transactions_user_occurred_at_id",
+            True,
+            lambda s: repo.list_user_transactions_for_report(
+                s, None, None, None, start, end, 1, 1000, user_id
+            ),
+        ),
+        (
+            "rollup summary, a year",
+            "ix_transaction_daily_rollups_user_day",
+            True,
+            lambda s: repo.get_rollup_summary(
+                s, start.date(), start.date() + timedelta(days=365), user_id
+            ),
+        ),
+        (
+            "rollup series by category, a year",
+            "ix_transaction_daily_rollups_user_day",
+            True,
+            lambda s: repo.get_rollup_series(
+                s, "month", start.date(), start.date() + timedelta(days=365), user_id, "category"
+            ),
+        ),
+    ]
+
+
+def walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def parent_indexes(session) -> dict:
+    """Each partition's index name -> the partitioned index it belongs to."""
+    return dict(
+        session.exec(
+            text(
+                """
+                SELECT c.relname, p.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                JOIN pg_class p ON p.oid = i.inhparent
+                WHERE c.relkind = 'i'
+                """
+            )
+        ).all()
+    )
+
+
+def inspect(plan, parents):
+    nodes = list(walk(plan[0]["Plan"]))
+    return {
+        "ms": plan[0]["Execution Time"],
+        "indexes": {
+            parents.get(n["Index Name"], n["Index Name"]) for n in nodes if "Index Name" in n
+        },
+        "index_only": any(n["Node Type"] == "Index Only Scan" for n in nodes),
+        "sort": any(n["Node Type"] in ("Sort", "Incremental Sort") for n in nodes),
+        "bitmap_and": any(n["Node Type"] == "BitmapAnd" for n in nodes),
+        "seq_scan": any(
+            # the parent or any of its partitions
+            n["Node Type"] == "Seq Scan" and n.get("Relation Name", "").startswith("transactions")
+            for n in nodes
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic users in place")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    print(f"populating {args.rows} transactions over {args.users} users ...")
+    tag, user_ids = populate(engine, args.users, args.rows)
+    failures = 0
+    try:
+        with Session(engine) as session:
+            user_id = user_ids[0]
+            account_id, category_id = session.exec(
+                text(
+                    "SELECT (SELECT min(id) FROM accounts WHERE user_id = :u),"
+                    " (SELECT min(id) FROM categories WHERE user_id = :u)"
+                ),
+                params={"u": user_id},
+            ).one()
+
+            parents = parent_indexes(session)
+            print(f"{'check':<38} {'ms':>8}  index-only  index")
+            for name, expected, may_sort, run in checks(user_id, account_id, category_id):
+                recorder = RecordingSession(session)
+                run(recorder)
+                for statement in recorder.statements:
+                    result = inspect(
+                        session.exec(explain(statement, analyze=True)).scalar_one(), parents
+                    )
+                    problems = []
+                    if expected not in result["indexes"]:
+                        problems.append(f"expected {expected}")
+                    if result["sort"] and not may_sort:
+                        problems.append("sorts")
+                    if result["bitmap_and"]:
+                        problems.append("bitmap-ANDs")
+                    if result["seq_scan"]:
+                        problems.append("seq scans transactions")
+                    failures += bool(problems)
+                    print(
+                        f"{name:<38} {result['ms']:>8.2f}  "
+                        f"{'yes' if result['index_only'] else 'no':<10}  "
+                        f"{', '.join(sorted(result['indexes'])) or '-'}"
+                        + (f"   <-- {'; '.join(problems)}" if problems else "")
+                    )
+            session.rollback()
+    finally:
+        if not args.keep:
+            cleanup(engine, tag)
+        engine.dispose()
+
+    print("ok" if not failures else f"{failures} statement(s) off plan")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Create the monthly transactions partitions ahead of time.
+
+    python -m scripts.maintain_transaction_partitions [--ahead 3] [--from 2023-01]
+
+Run it daily (cron, a k8s CronJob, ...). It creates every missing month from
+--from (default: the current month) to --ahead months after the current one,
+so writes never fall through to transactions_default. Safe to rerun and to
+run from several hosts, a second run finds nothing to create.
+"""
+import argparse
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from app.core.settings import settings
+from app.db.partitions import add_months, ensure_transaction_partitions, month_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    parser.add_argument("--ahead", type=int, default=settings.TRANSACTION_PARTITIONS_AHEAD)
+    parser.add_argument(
+        "--from", dest="first", type=lambda s: datetime.strptime(s, "%Y-%m").date(),
+        help="first month to make sure of, YYYY-MM",
+    )
+    args = parser.parse_args()
+
+    this_month = month_start(date.today())
+    engine = create_engine(args.url)
+    try:
+        with Session(engine) as session:
+            # the DDL needs short exclusive locks, give up rather than queue
+            # every query behind a long-running one
+            session.exec(text("SET lock_timeout = '5s'"))
+            # one transaction: two concurrent runs serialize on the advisory lock
+            session.exec(text("SELECT pg_advisory_xact_lock(hashtext('transactions partitions'))"))
+            created = ensure_transaction_partitions(
+                session, args.first or this_month, add_months(this_month, args.ahead)
+            )
+            session.commit()
+    finally:
+        engine.dispose()
+    print("created " + ", ".join(created) if created else "nothing to create")
+
+
+if __name__ == "__main__":
+    main()
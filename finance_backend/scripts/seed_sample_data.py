@@ -1,17 +1,392 @@
-# Simple seed script for dev only.
-from sqlmodel import Session, select
-from app.db.session import engine
-from app.models.user import User
-
-def seed():
-    from sqlmodel import SQLModel
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as s:
-        if not s.exec(select(User)).first():
-            u = User(email='demo@example.com', password_hash='pbkdf2:...')
-            s.add(u)
-            s.commit()
-            print('seeded demo user')
-
-if __name__ == '__main__':
-    seed()
+"""Fill a database with a large, production-like synthetic dataset.
+
+    python -m scripts.seed_sample_data [--users 1000] [--transactions 1000000]
+        [--seed 1] [--days 730] [--end 2026-06-30] [--password secret]
+        [--replace] [--jobs 4] [--defer-indexes]
+
+Creates --users verified LOCAL users (seed<seed>-user<n>@example.com, all with
+--password), each with a few accounts and categories and a transaction history
+over the --days before --end: monthly salaries, expenses with merchants and
+SMS-style message ids on bank, wallet and card accounts, transfers written as
+two matching legs, and an opening balance where an account would otherwise
+end up negative. Volumes are Pareto-skewed, a handful of users own a large
+share of the rows, like real usage.
+
+Everything is drawn from random.Random seeded per user, so the same --seed,
+counts and --end (a fixed date unless given) produce the same rows; their ids
+come from the sequences and only repeat on a fresh database. --jobs worker
+processes render each user's transactions, message ids and rollups as CSV,
+which is COPYed in one transaction. With --defer-indexes the secondary indexes
+of transactions are dropped for the load and rebuilt at the end, several times
+faster at 10M rows but it locks the table throughout, for a database nothing
+else is using.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import time
+from collections import defaultdict
+from itertools import chain
+from multiprocessing import Pool
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex, DropIndex
+from sqlmodel import Session, create_engine
+
+from app.auth.passwords import crypt_context
+from app.core.settings import settings
+from app.db.partitions import ensure_transaction_partitions
+from app.models.transaction import Transaction
+from app.transactions.importer import CopyStream
+
+
+CURRENCY = "ETB"
+PARETO_ALPHA = 1.16  # roughly 80% of the rows with 20% of the users
+MAX_WEIGHT = 200.0  # keeps one user from owning a small dataset outright
+# fixed rather than today, so a rerun next week reproduces the same rows
+DEFAULT_END = date(2026, 6, 30)
+TRANSFER_SHARE = 0.04
+OTHER_INCOME_SHARE = 0.03
+
+# (name, type, chance a user has it, share of expenses, SMS reference prefix)
+ACCOUNT_KINDS = [
+    ("Main Bank", "BANK", 1.0, 0.45, "FT"),
+    ("Mobile Wallet", "WALLET", 0.7, 0.30, "MW"),
+    ("Cash", "CASH", 0.6, 0.20, None),
+    ("Credit Card", "CREDIT_CARD", 0.25, 0.15, "CC"),
+    ("Savings", "BANK", 0.4, 0.0, "FT"),
+]
+
+# (name, share of expenses, median amount, spread, merchants)
+EXPENSE_CATEGORIES = [
+    ("Groceries", 0.24, 450, 0.8, ["Bole Fresh Market", "Kazanchis Grocery", "Piassa Mini Mart", "Sunrise Supermarket", "Green Basket"]),
+    ("Dining", 0.15, 320, 0.7, ["Habesha Kitchen", "Cafe Lucy", "Tomoca Corner", "Yod Lounge", "Kategna House"]),
+    ("Transport", 0.15, 120, 0.9, ["City Ride", "Blue Taxi", "Anbessa Bus", "Fuel Station 12", "Metro Cab"]),
+    ("Airtime", 0.10, 50, 0.6, ["Telecom Airtime", "Data Bundle"]),
+    ("Utilities", 0.05, 900, 0.5, ["Electric Utility", "Water Authority", "Fiber Internet"]),
+    ("Rent", 0.02, 12000, 0.4, ["Landlord"]),
+    ("Health", 0.04, 700, 1.0, ["Hayat Pharmacy", "Family Clinic", "Lab Diagnostics"]),
+    ("Shopping", 0.12, 1500, 1.1, ["Edna Mall", "Shoe Gallery", "Mobile Shop", "Book World", "Fashion House"]),
+    ("Entertainment", 0.07, 400, 0.9, ["Cinema Hall", "Game Zone", "Music Club", "Streaming Service"]),
+    ("Education", 0.03, 2500, 0.7, ["School Fees", "Online Course", "Stationery Store"]),
+    (None, 0.03, 200, 1.0, ["POS Purchase", "ATM Withdrawal"]),  # left uncategorized
+]
+INCOME_CATEGORIES = ["Salary", "Freelance", "Gifts"]
+
+
+@dataclass
+class UserPlan:
+    index: int
+    id: UUID
+    email: str
+    transactions: int
+    accounts: List[Tuple] = field(default_factory=list)  # (id, name, type, expense share, prefix)
+    categories: Dict[str, int] = field(default_factory=dict)  # name -> id
+
+
+def plan_users(seed: int, users: int, transactions: int) -> List[UserPlan]:
+    rng = random.Random(seed)
+    weights = [min(rng.paretovariate(PARETO_ALPHA), MAX_WEIGHT) for _ in range(users)]
+    scale = transactions / sum(weights)
+    return [
+        UserPlan(
+            index=i,
+            id=UUID(int=rng.getrandbits(128), version=4),
+            email=f"seed{seed}-user{i}@example.com",
+            transactions=max(1, round(w * scale)),
+        )
+        for i, w in enumerate(weights)
+    ]
+
+
+def allocate_ids(session: Session, table: str, count: int) -> Iterator[int]:
+    """Take `count` ids from the table's own sequence, so COPY can set them."""
+    return iter(
+        session.exec(
+            text(
+                "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                "FROM generate_series(1, :count)"
+            ),
+            params={"table": table, "count": count},
+        ).scalars().all()
+    )
+
+
+def copy(session: Session, table: str, columns: Tuple[str, ...], stream) -> int:
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", stream
+        )
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def money(cents: int) -> str:
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+class HistoryGenerator:
+    """One user's transactions, with the message ids, daily rollups and
+    per-account nets they add up to."""
+
+    def __init__(self, seed: int, user: UserPlan, start: datetime, end: datetime):
+        self.rng = random.Random(f"{seed}:{user.index}")
+        self.user = user
+        self.start = start
+        self.span = int((end - start).total_seconds())
+        self.nets: Dict[int, int] = {account[0]: 0 for account in user.accounts}
+        self.rollups: Dict[Tuple, List[int]] = defaultdict(lambda: [0, 0])
+        self.messages: List[str] = []
+
+    def timestamp(self) -> datetime:
+        # mostly daytime, like card payments and mobile transfers
+        day = self.start + timedelta(seconds=self.rng.randrange(self.span))
+        hour = min(23, max(0, int(self.rng.gauss(14, 4))))
+        return day.replace(hour=hour, minute=self.rng.randrange(60), second=self.rng.randrange(60))
+
+    def message_id(self, prefix: Optional[str], when: datetime) -> Optional[str]:
+        # the bank reference an SMS carries, unique per user by the running number
+        if prefix is None:
+            return None
+        message_id = f"{prefix}{when:%y%j}{len(self.messages):07d}{self.rng.randrange(36 ** 3):03X}"
+        self.messages.append(message_id)
+        return message_id
+
+    def row(self, account, category, cents, merchant, type, when, description=None,
+            transfer_group_id=None, is_outgoing=None, sms=True):
+        account_id, _, _, _, prefix = account
+        if type == "EXPENSE" or is_outgoing:
+            self.nets[account_id] -= cents
+        else:
+            self.nets[account_id] += cents
+        bucket = self.rollups[(when.date(), account_id, category, type)]
+        bucket[0] += cents
+        bucket[1] += 1
+        return (
+            self.user.id, account_id, category, money(cents), merchant, CURRENCY, type,
+            description, transfer_group_id, is_outgoing, when,
+            when + timedelta(seconds=self.rng.randrange(5, 600)),
+            self.message_id(prefix, when) if sms else None,
+        )
+
+    def rows(self) -> Iterator[Tuple]:
+        rng, user = self.rng, self.user
+        accounts = user.accounts
+        bank = accounts[0]
+        end = self.start + timedelta(seconds=self.span)
+        remaining = user.transactions
+
+        # salary on a fixed day each month
+        salary = int(rng.lognormvariate(10.1, 0.5) * 100)
+        payday = rng.randint(24, 28)
+        month = date(self.start.year, self.start.month, 1)
+        while remaining:
+            when = datetime(month.year, month.month, payday, 9, rng.randrange(60))
+            if when >= end:
+                break
+            if when >= self.start:
+                remaining -= 1
+                yield self.row(bank, user.categories["Salary"], salary, "Payroll", "INCOME", when,
+                               description="Salary credit")
+            month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+        transfers = int(remaining * TRANSFER_SHARE / 2) if len(accounts) > 1 else 0
+        for _ in range(transfers):
+            source, target = rng.sample(accounts, 2)
+            when = self.timestamp()
+            cents = int(rng.lognormvariate(7.5, 0.9) * 100)
+            group = UUID(int=rng.getrandbits(128), version=4)
+            yield self.row(source, None, cents, None, "TRANSFER", when, transfer_group_id=group,
+                           is_outgoing=True, sms=False)
+            yield self.row(target, None, cents, None, "TRANSFER", when, transfer_group_id=group,
+                           is_outgoing=False, sms=False)
+        remaining -= 2 * transfers
+
+        other_income = int(remaining * OTHER_INCOME_SHARE)
+        for _ in range(other_income):
+            category = rng.choice(INCOME_CATEGORIES[1:])
+            yield self.row(rng.choice(accounts), user.categories[category],
+                           int(rng.lognormvariate(8.0, 1.0) * 100), None, "INCOME", self.timestamp())
+        remaining -= other_income
+
+        spending = [a for a in accounts if a[3] > 0]
+        picks_account = rng.choices(spending, weights=[a[3] for a in spending], k=remaining)
+        picks_category = rng.choices(
+            EXPENSE_CATEGORIES, weights=[c[1] for c in EXPENSE_CATEGORIES], k=remaining
+        )
+        for account, (name, _, median, spread, merchants) in zip(picks_account, picks_category):
+            cents = max(100, int(rng.lognormvariate(0, spread) * median * 100))
+            merchant = rng.choice(merchants)
+            yield self.row(account, user.categories.get(name), cents, merchant, "EXPENSE",
+                           self.timestamp(), description=f"Payment to {merchant}")
+
+    def openings(self) -> Iterator[Tuple]:
+        """An opening balance at the start for every account left below zero."""
+        for account in self.user.accounts:
+            net = self.nets[account[0]]
+            if net < 0:
+                cents = -net + int(self.rng.lognormvariate(8.0, 1.0) * 100)
+                yield self.row(account, None, cents, None, "INCOME", self.start,
+                               description="Opening balance", sms=False)
+
+
+TRANSACTION_COLUMNS = (
+    "user_id", "account_id", "category_id", "amount", "merchant", "currency", "type",
+    "description", "transfer_group_id", "is_outgoing", "occurred_at", "created_at", "message_id",
+)
+ROLLUP_COLUMNS = ("user_id", "day", "account_id", "category_id", "type", "total", "count")
+SEEDED_TABLES = ("users", "accounts", "categories", "transactions",
+                 "transaction_messages", "transaction_daily_rollups")
+
+
+def render_user(job) -> Tuple[bytes, bytes, bytes, Dict[int, int]]:
+    """CSV for one user's transactions, message ids and rollups, plus the
+    accounts' final balances. Runs in the worker processes."""
+    seed, user, start, end = job
+    generator = HistoryGenerator(seed, user, start, end)
+
+    def render(rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode()
+
+    # openings() runs once rows() is exhausted and the nets are final
+    transactions = render(chain(generator.rows(), generator.openings()))
+    messages = render((user.id, message_id) for message_id in generator.messages)
+    rollups = render(
+        (user.id, day, account_id, category_id, type, money(total), count)
+        for (day, account_id, category_id, type), (total, count) in generator.rollups.items()
+    )
+    return transactions, messages, rollups, generator.nets
+
+
+def rendered_users(jobs: int, work: list):
+    """render_user over `work` in order, at most a few users ahead of the loader."""
+    if jobs <= 1:
+        yield from map(render_user, work)
+        return
+    with Pool(jobs) as pool:
+        for i in range(0, len(work), jobs * 2):
+            yield from pool.map(render_user, work[i : i + jobs * 2])
+
+
+def seed(session: Session, args) -> Dict[str, int]:
+    end = datetime.combine(args.end, datetime.min.time())
+    start = end - timedelta(days=args.days)
+    users = plan_users(args.seed, args.users, args.transactions)
+    rng = random.Random(f"{args.seed}:accounts")
+    password_hash = crypt_context(settings.BCRYPT_ROUNDS).hash(args.password)
+
+    if args.replace:
+        # the bulk of it by user first, so the cascades have little left to find
+        seeded = "SELECT id FROM users WHERE email LIKE :pattern"
+        for table in ("transaction_daily_rollups", "transactions", "users"):
+            column = "id" if table == "users" else "user_id"
+            session.exec(
+                text(f"DELETE FROM {table} WHERE {column} IN ({seeded})"),
+                params={"pattern": f"seed{args.seed}-user%@example.com"},
+            )
+    ensure_transaction_partitions(session, start.date(), end.date())
+
+    copy(session, "users", ("id", "email", "password_hash", "provider", "is_verified", "created_at", "data_version", "updated_at"), CopyStream(
+        (u.id, u.email, password_hash, "LOCAL", True, start, 0, start) for u in users
+    ))
+
+    kinds = [[kind for kind in ACCOUNT_KINDS if rng.random() < kind[2]] for _ in users]
+    account_ids = allocate_ids(session, "accounts", sum(len(k) for k in kinds))
+    for user, user_kinds in zip(users, kinds):
+        user.accounts = [(next(account_ids), name, type, share, prefix)
+                         for name, type, _, share, prefix in user_kinds]
+
+    categories = [(c[0], "EXPENSE") for c in EXPENSE_CATEGORIES if c[0]] + [
+        (name, "INCOME") for name in INCOME_CATEGORIES
+    ]
+    category_ids = allocate_ids(session, "categories", len(users) * len(categories))
+    for user in users:
+        user.categories = {name: next(category_ids) for name, _ in categories}
+    copy(session, "categories", ("id", "user_id", "name", "active", "type", "created_at"), CopyStream(
+        (u.categories[name], u.id, name, True, type, start) for u in users for name, type in categories
+    ))
+
+    indexes = list(Transaction.__table__.indexes) if args.defer_indexes else []
+    for index in indexes:
+        session.connection().execute(DropIndex(index, if_exists=True))
+
+    # balances are only known once every history is rendered, accounts go in
+    # at zero and are set at the end
+    copy(session, "accounts", ("id", "user_id", "balance", "name", "type", "currency", "active", "created_at", "updated_at"), CopyStream(
+        (a[0], u.id, 0, a[1], a[2], CURRENCY, True, start, start) for u in users for a in u.accounts
+    ))
+    inserted = 0
+    balances = {}
+    for transactions, messages, rollups, nets in rendered_users(
+        args.jobs, [(args.seed, user, start, end) for user in users]
+    ):
+        inserted += copy(session, "transactions", TRANSACTION_COLUMNS, io.BytesIO(transactions))
+        copy(session, "transaction_messages", ("user_id", "message_id"), io.BytesIO(messages))
+        copy(session, "transaction_daily_rollups", ROLLUP_COLUMNS, io.BytesIO(rollups))
+        balances.update(nets)
+
+    session.exec(text("CREATE TEMP TABLE seed_balances (account_id integer, balance numeric) ON COMMIT DROP"))
+    copy(session, "seed_balances", ("account_id", "balance"), CopyStream(
+        (account_id, money(net)) for account_id, net in balances.items()
+    ))
+    session.exec(text(
+        "UPDATE accounts a SET balance = b.balance FROM seed_balances b WHERE a.id = b.account_id"
+    ))
+
+    for index in indexes:
+        session.connection().execute(CreateIndex(index))
+    return {"users": len(users), "transactions": inserted}
+
+
+def vacuum_analyze(engine) -> None:
+    # fresh statistics, and a visibility map so index-only scans skip the heap
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in SEEDED_TABLES:
+            conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--transactions", type=int, default=1_000_000, help="roughly, before opening balances")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--end", type=date.fromisoformat, default=DEFAULT_END, help="last day of the history")
+    parser.add_argument("--password", default="synthetic-password")
+    parser.add_argument("--replace", action="store_true", help="delete this seed's users first")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="rendering processes")
+    parser.add_argument(
+        "--defer-indexes", action="store_true",
+        help="drop the transactions indexes during the load, rebuild them after",
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    started = time.perf_counter()
+    try:
+        with Session(engine) as session:
+            counts = seed(session, args)
+            session.commit()
+        vacuum_analyze(engine)
+    finally:
+        engine.dispose()
+    elapsed = time.perf_counter() - started
+    print(
+        f"seeded {counts['users']} users and {counts['transactions']} transactions "
+        f"in {elapsed:.1f}s ({counts['transactions'] / elapsed:,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()